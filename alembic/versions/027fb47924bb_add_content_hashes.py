@@ -0,0 +1,33 @@
+"""Add content hashes of datasets and estimators
+
+Revision ID: 027fb47924bb
+Revises: 5a36a50d0271
+Create Date: 2026-10-17 17:29:53.869217+00:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "027fb47924bb"
+down_revision: str | None = "5a36a50d0271"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("dataset", sa.Column("content_hash", sa.String(), nullable=True))
+    op.create_index(op.f("ix_dataset_content_hash"), "dataset", ["content_hash"], unique=False)
+    op.add_column("estimator", sa.Column("content_hash", sa.String(), nullable=True))
+    op.create_index(op.f("ix_estimator_content_hash"), "estimator", ["content_hash"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_estimator_content_hash"), table_name="estimator")
+    op.drop_column("estimator", "content_hash")
+    op.drop_index(op.f("ix_dataset_content_hash"), table_name="dataset")
+    op.drop_column("dataset", "content_hash")
@@ -0,0 +1,49 @@
+"""Add request status
+
+Status of existing requests is derived from their timestamps.
+
+Revision ID: 496dcdd93073
+Revises: c93088d86e26
+Create Date: 2026-10-17 15:57:09.729373+00:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "496dcdd93073"
+down_revision: str | None = "c93088d86e26"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+request_status = sa.Enum("queued", "running", "done", "failed", "cancelled", name="request_status")
+
+
+def upgrade() -> None:
+    # Enum types are not created by add_column
+    request_status.create(op.get_bind(), checkfirst=True)
+    op.add_column(
+        "request",
+        sa.Column("status", request_status, server_default="queued", nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE request SET status = CASE
+            WHEN time_finished IS NOT NULL AND qp_file_path IS NOT NULL THEN 'done'
+            WHEN time_finished IS NOT NULL THEN 'failed'
+            WHEN time_started IS NOT NULL THEN 'running'
+            ELSE 'queued'
+        END
+        """
+    )
+    op.create_index("ix_request_status_time_created", "request", ["status", "time_created"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_request_status_time_created", table_name="request")
+    op.drop_column("request", "status")
+    request_status.drop(op.get_bind(), checkfirst=True)
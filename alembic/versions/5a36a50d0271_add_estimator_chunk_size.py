@@ -0,0 +1,27 @@
+"""Add the chunk size of estimators
+
+Revision ID: 5a36a50d0271
+Revises: c43ff4ef1225
+Create Date: 2026-10-17 17:29:53.860074+00:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5a36a50d0271"
+down_revision: str | None = "c43ff4ef1225"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("estimator", sa.Column("chunk_size", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("estimator", "chunk_size")
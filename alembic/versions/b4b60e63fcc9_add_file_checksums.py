@@ -0,0 +1,29 @@
+"""Add the checksums of model and output files
+
+Revision ID: b4b60e63fcc9
+Revises: ec69f7dcf1df
+Create Date: 2026-10-17 17:29:53.889587+00:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b4b60e63fcc9"
+down_revision: str | None = "ec69f7dcf1df"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("model", sa.Column("content_hash", sa.String(), nullable=True))
+    op.add_column("request", sa.Column("qp_file_checksum", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("request", "qp_file_checksum")
+    op.drop_column("model", "content_hash")
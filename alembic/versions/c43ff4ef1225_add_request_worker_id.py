@@ -0,0 +1,27 @@
+"""Add the worker that claimed a request
+
+Revision ID: c43ff4ef1225
+Revises: f4c1e6b7a763
+Create Date: 2026-10-17 17:29:53.849377+00:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c43ff4ef1225"
+down_revision: str | None = "f4c1e6b7a763"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("request", sa.Column("worker_id", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("request", "worker_id")
@@ -0,0 +1,27 @@
+"""Index requests on their creation time
+
+Revision ID: c93088d86e26
+Revises: b4b60e63fcc9
+Create Date: 2026-10-17 17:29:53.898964+00:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c93088d86e26"
+down_revision: str | None = "b4b60e63fcc9"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_request_time_created"), "request", ["time_created"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_request_time_created"), table_name="request")
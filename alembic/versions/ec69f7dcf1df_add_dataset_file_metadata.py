@@ -0,0 +1,27 @@
+"""Add the file metadata of datasets
+
+Revision ID: ec69f7dcf1df
+Revises: 027fb47924bb
+Create Date: 2026-10-17 17:29:53.878992+00:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "ec69f7dcf1df"
+down_revision: str | None = "027fb47924bb"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("dataset", sa.Column("file_metadata", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("dataset", "file_metadata")
@@ -1,17 +1,26 @@
 """Database table definitions and utility functions"""
 
-from .algorithm import PZRailAlgorithmClient
-from .catalog_tag import PZRailCatalogTagClient
+from .algorithm import AsyncPZRailAlgorithmClient, PZRailAlgorithmClient
+from .async_client import AsyncPZRailClient
+from .catalog_tag import AsyncPZRailCatalogTagClient, PZRailCatalogTagClient
 from .clientconfig import ClientConfiguration, client_config
 from .client import PZRailClient
-from .dataset import PZRailDatasetClient
-from .estimator import PZRailEstimatorClient
-from .load import PZRailLoadClient
-from .model import PZRailModelClient
-from .request import PZRailRequestClient
+from .dataset import AsyncPZRailDatasetClient, PZRailDatasetClient
+from .estimator import AsyncPZRailEstimatorClient, PZRailEstimatorClient
+from .load import AsyncPZRailLoadClient, PZRailLoadClient
+from .model import AsyncPZRailModelClient, PZRailModelClient
+from .request import AsyncPZRailRequestClient, PZRailRequestClient
 
 
 __all__ = [
+    "AsyncPZRailAlgorithmClient",
+    "AsyncPZRailCatalogTagClient",
+    "AsyncPZRailClient",
+    "AsyncPZRailDatasetClient",
+    "AsyncPZRailEstimatorClient",
+    "AsyncPZRailLoadClient",
+    "AsyncPZRailModelClient",
+    "AsyncPZRailRequestClient",
     "PZRailAlgorithmClient",
     "PZRailCatalogTagClient",
     "PZRailClient",
@@ -0,0 +1,78 @@
+"""Top level for async python client API"""
+
+from __future__ import annotations
+
+from types import TracebackType
+from typing import Any
+
+import httpx
+
+from .algorithm import AsyncPZRailAlgorithmClient
+from .catalog_tag import AsyncPZRailCatalogTagClient
+from .client import extra_client_kwargs
+from .clientconfig import client_config
+from .dataset import AsyncPZRailDatasetClient
+from .estimate import AsyncPZRailEstimateClient
+from .estimator import AsyncPZRailEstimatorClient
+from .load import AsyncPZRailLoadClient
+from .model import AsyncPZRailModelClient
+from .request import AsyncPZRailRequestClient
+
+__all__ = ["AsyncPZRailClient"]
+
+
+class AsyncPZRailClient:
+    """Async interface for accessing remote pz-rail-service.
+
+    This mirrors `PZRailClient`, but all the calls are coroutines,
+    so many of them can run at once, e.g., with the `get_many`,
+    `create_many` and `run_many` helpers.
+
+    Example
+    -------
+
+    .. code-block:: python
+
+        async with AsyncPZRailClient() as client:
+            requests = await client.request.get_many(request_ids, concurrency=16)
+    """
+
+    def __init__(self) -> None:
+        client_kwargs: dict[str, Any] = {}
+        client_kwargs["base_url"] = client_config.service_url
+        client_kwargs.update(**extra_client_kwargs())
+        # Enough connections for the bulk helpers not to queue on the pool
+        client_kwargs["limits"] = httpx.Limits(
+            max_connections=max(client_config.max_concurrency, 10),
+        )
+        self._client = httpx.AsyncClient(**client_kwargs)
+
+        self.algorithm = AsyncPZRailAlgorithmClient(self)
+        self.catalog_tag = AsyncPZRailCatalogTagClient(self)
+        self.dataset = AsyncPZRailDatasetClient(self)
+        self.estimator = AsyncPZRailEstimatorClient(self)
+        self.model = AsyncPZRailModelClient(self)
+        self.request = AsyncPZRailRequestClient(self)
+
+        self.load = AsyncPZRailLoadClient(self)
+        self.estimate = AsyncPZRailEstimateClient(self)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the httpx.AsyncClient"""
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the connections to the server"""
+        await self._client.aclose()
+
+    async def __aenter__(self) -> AsyncPZRailClient:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.aclose()
@@ -0,0 +1,495 @@
+"""Wrappers to create functions for the various parts of the async client
+
+These mirror the functions in `wrappers`, but use a `httpx.AsyncClient`,
+and add helpers to run many calls concurrently.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, TypeAlias, TypeVar
+
+import httpx
+from anyio import open_file
+from httpx import Response
+from pydantic import BaseModel, TypeAdapter
+
+from .. import models
+from .clientconfig import client_config
+from .wrappers import (
+    _discard_download,
+    _download_paths,
+    _finish_download,
+    _resume_headers,
+    _start_download,
+)
+
+if TYPE_CHECKING:
+    from .async_client import AsyncPZRailClient
+
+T = TypeVar("T")
+
+
+async def gather_limited(
+    awaitables: Iterable[Awaitable[T]],
+    concurrency: int | None = None,
+) -> list[T]:
+    """Await many things, with at most `concurrency` of them running at once
+
+    Parameters
+    ----------
+    awaitables
+        Things to await, e.g., calls to the async client
+
+    concurrency
+        Maximum number running at once, defaults to `client_config.max_concurrency`
+
+    Returns
+    -------
+    list[T]
+        Results, in the same order as `awaitables`
+    """
+    semaphore = asyncio.Semaphore(concurrency or client_config.max_concurrency)
+
+    async def _limited(awaitable: Awaitable[T]) -> T:
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*(_limited(awaitable) for awaitable in awaitables))
+
+
+def iter_rows_function(
+    response_model_class: TypeAlias = BaseModel,
+    query: str = "",
+) -> Callable:
+    """Return a function that iterates over the rows from a table
+    and attaches that function to an async client.
+
+    Parameters
+    ----------
+    response_model_class: TypeAlias = BaseModel,
+        Pydantic class used to serialize the return value
+
+    query: str
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Async generator that yields the rows for the table in question
+    """
+
+    async def iter_rows(
+        obj: AsyncPZRailClient,
+        *,
+        page_size: int = 100,
+        descending: bool = False,
+        **filters: Any,
+    ) -> AsyncIterator[response_model_class]:
+        params: dict[str, Any] = {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in filters.items()
+            if value is not None
+        }
+        params.update(limit=page_size, order="desc" if descending else "asc")
+        adapter = TypeAdapter(list[response_model_class])
+        while paged_results := (await obj.client.get(f"{query}", params=params)).raise_for_status().json():
+            rows = adapter.validate_python(paged_results)
+            for row in rows:
+                yield row
+            params["after"] = rows[-1].id
+
+    return iter_rows
+
+
+def get_rows_function(
+    response_model_class: TypeAlias = BaseModel,
+    query: str = "",
+) -> Callable:
+    """Return a function that gets all the rows from a table
+    and attaches that function to an async client.
+
+    Parameters
+    ----------
+    response_model_class: TypeAlias = BaseModel,
+        Pydantic class used to serialize the return value
+
+    query: str
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that return all the rows for the table in question
+    """
+    iter_rows = iter_rows_function(response_model_class, query)
+
+    async def get_rows(
+        obj: AsyncPZRailClient,
+        **filters: Any,
+    ) -> list[response_model_class]:
+        return [row async for row in iter_rows(obj, **filters)]
+
+    return get_rows
+
+
+def get_row_function(
+    response_model_class: TypeAlias = BaseModel,
+    query: str = "",
+) -> Callable:
+    """Return a function that gets a single row from a table (by ID)
+    and attaches that function to an async client.
+
+    Parameters
+    ----------
+    response_model_class: TypeAlias = BaseModel,
+        Pydantic class used to serialize the return value
+
+    query: str
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that returns a single row from a table by ID
+    """
+
+    async def row_get(
+        obj: AsyncPZRailClient,
+        row_id: int,
+    ) -> response_model_class:
+        full_query = f"{query}/{row_id}"
+        results = (await obj.client.get(full_query)).raise_for_status().json()
+        return TypeAdapter(response_model_class).validate_python(results)
+
+    return row_get
+
+
+def get_many_function(
+    response_model_class: TypeAlias = BaseModel,
+    query: str = "",
+) -> Callable:
+    """Return a function that gets many rows from a table (by ID) concurrently
+    and attaches that function to an async client.
+
+    Parameters
+    ----------
+    response_model_class: TypeAlias = BaseModel,
+        Pydantic class used to serialize the return value
+
+    query: str
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that returns the rows from a table by ID
+    """
+    row_get = get_row_function(response_model_class, query)
+
+    async def get_many(
+        obj: AsyncPZRailClient,
+        row_ids: Iterable[int],
+        *,
+        concurrency: int | None = None,
+    ) -> list[response_model_class]:
+        return await gather_limited((row_get(obj, row_id) for row_id in row_ids), concurrency)
+
+    return get_many
+
+
+def delete_row_function(
+    query: str = "",
+) -> Callable:
+    """Return a function that deletes a single row in a table
+    and attaches that function to an async client.
+
+    Parameters
+    ----------
+    query: str
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that delete a single row from a table by ID
+    """
+
+    async def row_delete(
+        obj: AsyncPZRailClient,
+        row_id: int,
+    ) -> None:
+        full_query = f"{query}/{row_id}"
+        (await obj.client.delete(full_query)).raise_for_status()
+
+    return row_delete
+
+
+def get_row_by_name_function(
+    response_model_class: TypeAlias = BaseModel,
+    query: str = "",
+) -> Callable:
+    """Return a function that gets a single row from a table (by name)
+    and attaches that function to an async client.
+
+    Parameters
+    ----------
+    response_model_class: TypeAlias = BaseModel,
+        Pydantic class used to serialize the return value
+
+    query: str
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that returns a single row from a table by name
+    """
+
+    async def get_row_by_name(
+        obj: AsyncPZRailClient,
+        name: str,
+    ) -> response_model_class | None:
+        params = models.NameQuery(name=name).model_dump()
+        response = await obj.client.get(query, params=params)
+        results = response.raise_for_status().json()
+        return TypeAdapter(response_model_class).validate_python(results)
+
+    return get_row_by_name
+
+
+def get_row_attribute_list_function(
+    response_model_class: TypeAlias,
+    query: str = "",
+    query_suffix: str = "",
+) -> Callable:
+    """Return a function that gets a property of a single row of a table
+    and attaches that function to an async client.
+
+    Parameters
+    ----------
+    response_model_class: TypeAlias = BaseModel,
+        Pydantic class used to serialize the return value
+
+    query
+        http query
+
+    query_suffix
+        Rest of the query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that returns a property of a single row from a table by name
+    """
+
+    async def get_row_attribute_list(
+        obj: AsyncPZRailClient,
+        row_id: int,
+    ) -> response_model_class:
+        full_query = f"{query}/{row_id}/{query_suffix}"
+        results = (await obj.client.get(full_query)).raise_for_status().json()
+        return TypeAdapter(response_model_class).validate_python(results)
+
+    return get_row_attribute_list
+
+
+def create_row_function(
+    response_model_class: TypeAlias = BaseModel,
+    create_model_class: TypeAlias = BaseModel,
+    query: str = "",
+) -> Callable:
+    """Return a function that creates a single row in a table
+    and attaches that function to an async client.
+
+    Parameters
+    ----------
+    response_model_class
+        Pydantic class used to serialize the return value
+
+    create_model_class
+        Pydantic class used to serialize the inputs value
+
+    query
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that returns a single row from a table by ID
+    """
+
+    async def row_create(obj: AsyncPZRailClient, **kwargs: Any) -> response_model_class:
+        content = create_model_class(**kwargs).model_dump_json()
+        results = (await obj.client.post(query, content=content)).raise_for_status().json()
+        return TypeAdapter(response_model_class).validate_python(results)
+
+    return row_create
+
+
+def create_bulk_function(
+    response_model_class: TypeAlias = BaseModel,
+    create_model_class: TypeAlias = BaseModel,
+    query: str = "",
+) -> Callable:
+    """Return a function that creates many rows in a table with a single call
+    and attaches that function to an async client.
+
+    Parameters
+    ----------
+    response_model_class
+        Pydantic class used to serialize the return value,
+        i.e., the bulk result listing the created rows and the errors
+
+    create_model_class
+        Pydantic class used to serialize the inputs value
+
+    query
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that creates the rows and returns the bulk result
+    """
+
+    async def create_bulk(
+        obj: AsyncPZRailClient,
+        rows: Iterable[dict[str, Any]],
+    ) -> response_model_class:
+        items = [create_model_class(**kwargs) for kwargs in rows]
+        content = TypeAdapter(list[create_model_class]).dump_json(items)
+        results = (await obj.client.post(query, content=content)).raise_for_status().json()
+        return TypeAdapter(response_model_class).validate_python(results)
+
+    return create_bulk
+
+
+def create_many_function(
+    response_model_class: TypeAlias = BaseModel,
+    create_model_class: TypeAlias = BaseModel,
+    query: str = "",
+) -> Callable:
+    """Return a function that creates many rows in a table concurrently
+    and attaches that function to an async client.
+
+    Parameters
+    ----------
+    response_model_class
+        Pydantic class used to serialize the return value
+
+    create_model_class
+        Pydantic class used to serialize the inputs value
+
+    query
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that returns the newly created rows
+    """
+    row_create = create_row_function(response_model_class, create_model_class, query)
+
+    async def create_many(
+        obj: AsyncPZRailClient,
+        rows: Iterable[dict[str, Any]],
+        *,
+        concurrency: int | None = None,
+    ) -> list[response_model_class]:
+        return await gather_limited((row_create(obj, **kwargs) for kwargs in rows), concurrency)
+
+    return create_many
+
+
+def download_file_function(
+    query: str = "",
+) -> Callable:
+    """Download a file associated to DB object.
+
+    As `wrappers.download_file_function`, the file is streamed to disk
+    in chunks and interrupted downloads are resumed.
+
+    Parameters
+    ----------
+    query
+        http query
+
+    Returns
+    -------
+    Callable
+        Function that downloads a file associated to DB object
+    """
+
+    async def download_file(
+        obj: AsyncPZRailClient,
+        row_id: int,
+        filename: str,
+        *,
+        output_dir: str | None = None,
+        chunk_size: int | None = None,
+        progress: Callable[[int, int | None], None] | None = None,
+        max_retries: int = 3,
+    ) -> Response:
+        full_query = f"{query}/{row_id}"
+        params = models.DownloadQuery(filename=filename).model_dump()
+        chunk_size = chunk_size or client_config.download_chunk_size
+
+        n_failures = 0
+        while True:
+            try:
+                results = await _stream_download(
+                    obj.client, full_query, params, output_dir, chunk_size, progress
+                )
+                if results is not None:
+                    return results
+                # The partial download could not be resumed, start over
+            except httpx.TransportError:
+                # Dropped connection, carry on from what we have
+                n_failures += 1
+                if n_failures > max_retries:
+                    raise
+
+    return download_file
+
+
+async def _stream_download(
+    client: httpx.AsyncClient,
+    full_query: str,
+    params: dict,
+    output_dir: str | None,
+    chunk_size: int,
+    progress: Callable[[int, int | None], None] | None,
+) -> Response | None:
+    """As `wrappers._stream_download`, return None if the partial download
+    has to be thrown away and the download started over
+    """
+    # All the file handling happens off of the event loop
+    filename, part_filename, validator_filename = await asyncio.to_thread(
+        _download_paths, params["filename"], output_dir
+    )
+    offset, headers = await asyncio.to_thread(_resume_headers, part_filename, validator_filename)
+
+    async with client.stream("GET", full_query, params=params, headers=headers) as results:
+        # The partial download is longer than the file
+        restart = results.status_code == 416 and "range" in headers
+        if not restart:
+            results.raise_for_status()
+            offset, total, mode = await asyncio.to_thread(
+                _start_download, results, offset, validator_filename
+            )
+            async with await open_file(part_filename, mode) as fout:
+                async for chunk in results.aiter_bytes(chunk_size):
+                    await fout.write(chunk)
+                    offset += len(chunk)
+                    if progress is not None:
+                        progress(offset, total)
+
+    if restart:
+        await asyncio.to_thread(_discard_download, part_filename, validator_filename)
+        return None
+
+    await asyncio.to_thread(_finish_download, results, filename, part_filename, validator_filename)
+    return results
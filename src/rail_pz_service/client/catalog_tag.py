@@ -7,9 +7,10 @@ from typing import TYPE_CHECKING
 import httpx
 
 from .. import models
-from . import wrappers
+from . import async_wrappers, wrappers
 
 if TYPE_CHECKING:
+    from .async_client import AsyncPZRailClient
     from .client import PZRailClient
 
 # Template specialization
@@ -36,6 +37,8 @@ class PZRailCatalogTagClient:
     # Add functions to the client class
     get_rows = wrappers.get_rows_function(ResponseModelClass, f"{router_string}/list")
 
+    iter_rows = wrappers.iter_rows_function(ResponseModelClass, f"{router_string}/list")
+
     get_row = wrappers.get_row_function(ResponseModelClass, f"{router_string}/get")
 
     get_row_by_name = wrappers.get_row_by_name_function(
@@ -55,3 +58,44 @@ class PZRailCatalogTagClient:
     get_datasets = wrappers.get_row_attribute_list_function(
         list[models.Dataset], f"{router_string}/get", "datasets"
     )
+
+
+class AsyncPZRailCatalogTagClient:
+    """Async interface for accessing remote pz-rail-service to manipulate
+    CatalogTag Tables
+    """
+
+    def __init__(self, parent: AsyncPZRailClient) -> None:
+        self._client = parent.client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the httpx.AsyncClient"""
+        return self._client
+
+    # Add functions to the client class
+    get_rows = async_wrappers.get_rows_function(ResponseModelClass, f"{router_string}/list")
+
+    iter_rows = async_wrappers.iter_rows_function(ResponseModelClass, f"{router_string}/list")
+
+    get_row = async_wrappers.get_row_function(ResponseModelClass, f"{router_string}/get")
+
+    get_many = async_wrappers.get_many_function(ResponseModelClass, f"{router_string}/get")
+
+    get_row_by_name = async_wrappers.get_row_by_name_function(
+        ResponseModelClass, f"{router_string}/get_row_by_name"
+    )
+
+    get_estimators = async_wrappers.get_row_attribute_list_function(
+        list[models.Estimator],
+        f"{router_string}/get",
+        "estimators",
+    )
+
+    get_models = async_wrappers.get_row_attribute_list_function(
+        list[models.Model], f"{router_string}/get", "models"
+    )
+
+    get_datasets = async_wrappers.get_row_attribute_list_function(
+        list[models.Dataset], f"{router_string}/get", "datasets"
+    )
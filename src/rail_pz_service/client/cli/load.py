@@ -18,30 +18,55 @@ def load_group() -> None:
 @common_options.name()
 @common_options.path()
 @common_options.catalog_tag_name()
+@common_options.upload()
 @common_options.output()
 def dataset_command(
     pz_client: PZRailClient,
     name: str,
     path: click.Path,
     catalog_tag_name: str,
+    *,
+    upload: bool,
     output: common_options.OutputEnum | None,
 ) -> None:
     """Load CatalogTags from RailEnv"""
 
-    result = pz_client.load.dataset(
-        name=name,
-        path=path,
-        catalog_tag_name=catalog_tag_name,
-    )
+    if upload:
+        result = pz_client.load.upload_dataset(
+            str(path),
+            name=name,
+            catalog_tag_name=catalog_tag_name,
+        )
+    else:
+        result = pz_client.load.dataset(
+            name=name,
+            path=path,
+            catalog_tag_name=catalog_tag_name,
+        )
     wrappers.output_pydantic_object(result, output, models.Dataset.col_names_for_table)
 
 
+@load_group.command(name="datasets")
+@client_options.pz_client()
+@common_options.input_file()
+@common_options.output()
+def datasets_command(
+    pz_client: PZRailClient,
+    input_file: str,
+    output: common_options.OutputEnum | None,
+) -> None:
+    """Load many Datasets, listed in a yaml file, in one go"""
+    result = pz_client.load.datasets(wrappers.read_input_file(input_file))
+    wrappers.output_bulk_result(result, output, models.Dataset.col_names_for_table)
+
+
 @load_group.command(name="model")
 @client_options.pz_client()
 @common_options.name()
 @common_options.path()
 @common_options.algo_name()
 @common_options.catalog_tag_name()
+@common_options.upload()
 @common_options.output()
 def model_command(
     pz_client: PZRailClient,
@@ -49,15 +74,25 @@ def model_command(
     path: click.Path,
     algo_name: str,
     catalog_tag_name: str,
+    *,
+    upload: bool,
     output: common_options.OutputEnum | None,
 ) -> None:
     """Load CatalogTags from RailEnv"""
-    result = pz_client.load.model(
-        name=name,
-        path=path,
-        algo_name=algo_name,
-        catalog_tag_name=catalog_tag_name,
-    )
+    if upload:
+        result = pz_client.load.upload_model(
+            str(path),
+            name=name,
+            algo_name=algo_name,
+            catalog_tag_name=catalog_tag_name,
+        )
+    else:
+        result = pz_client.load.model(
+            name=name,
+            path=path,
+            algo_name=algo_name,
+            catalog_tag_name=catalog_tag_name,
+        )
     wrappers.output_pydantic_object(result, output, models.Dataset.col_names_for_table)
 
 
@@ -66,12 +101,14 @@ def model_command(
 @common_options.name()
 @common_options.model_name()
 @common_options.config()
+@common_options.chunk_size()
 @common_options.output()
 def estimator_command(
     pz_client: PZRailClient,
     name: str,
     model_name: str,
     config: dict | None,
+    chunk_size: int | None,
     output: common_options.OutputEnum | None,
 ) -> None:
     """Load CatalogTags from RailEnv"""
@@ -79,5 +116,6 @@ def estimator_command(
         name=name,
         model_name=model_name,
         config=config,
+        chunk_size=chunk_size,
     )
     wrappers.output_pydantic_object(result, output, models.Dataset.col_names_for_table)
@@ -71,3 +71,17 @@ def run(
     """Get the data_dict parameters for a partiuclar node"""
     result = pz_client.request.run(row_id)
     wrappers.output_pydantic_object(result, output, ModelClass.col_names_for_table)
+
+
+@group_command(name="create-bulk")
+@client_options.pz_client()
+@common_options.input_file()
+@common_options.output()
+def create_bulk(
+    pz_client: PZRailClient,
+    input_file: str,
+    output: common_options.OutputEnum | None,
+) -> None:
+    """Create many requests, listed in a yaml file, in one go"""
+    result = pz_client.request.create_bulk(wrappers.read_input_file(input_file))
+    wrappers.output_bulk_result(result, output, ModelClass.col_names_for_table)
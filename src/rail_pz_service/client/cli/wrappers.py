@@ -99,6 +99,58 @@ def output_pydantic_list(
             click.echo(tabulate(the_table, headers=col_names, tablefmt="plain"))
 
 
+def read_input_file(input_file: str | Path) -> list[dict[str, Any]]:
+    """Read the list of items to create from a yaml file
+
+    Parameters
+    ----------
+    input_file
+        yaml file with a list of dicts, one per item
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        Items to create
+    """
+    with open(input_file, encoding="utf-8") as fin:
+        items = yaml.safe_load(fin)
+    if not isinstance(items, list):
+        raise click.BadParameter(f"{input_file} should contain a list of items")
+    return items
+
+
+def output_bulk_result(
+    result: BaseModel,
+    output: common_options.OutputEnum | None,
+    col_names: list[str],
+) -> None:
+    """Render the outcome of a bulk create as requested
+
+    json and yaml output render the whole result, in the summary table
+    the items that failed are reported on stderr
+
+    Parameters
+    ----------
+    result
+        Bulk result in question, with `created` and `errors`
+
+    output
+        Output format
+
+    col_names: list[str]
+        Names for columns in tabular representation
+    """
+    match output:
+        case common_options.OutputEnum.json:
+            click.echo(json.dumps(result.model_dump(), cls=CustomJSONEncoder, indent=4))
+        case common_options.OutputEnum.yaml:
+            click.echo(yaml.dump(result.model_dump()))
+        case _:
+            output_pydantic_list(result.created, output, col_names)  # type: ignore[attr-defined]
+            for error in result.errors:  # type: ignore[attr-defined]
+                click.echo(f"Failed to create item {error.index}: {error.detail}", err=True)
+
+
 def get_list_command(
     group_command: Callable,
     sub_client_name: str,
@@ -372,13 +424,15 @@ def download_command(
     @client_options.pz_client()
     @common_options.row_id()
     @common_options.filename()
+    @common_options.output_dir()
     def download(
         pz_client: PZRailClient,
         row_id: int,
         filename: Path,
+        output_dir: Path | None,
     ) -> None:
         """Get the data_dict parameters for a partiuclar node"""
         sub_client = getattr(pz_client, sub_client_name)
-        _result = sub_client.download(row_id, filename)
+        _result = sub_client.download(row_id, filename, output_dir=output_dir)
 
     return download
@@ -10,6 +10,7 @@ from .algorithm import PZRailAlgorithmClient
 from .catalog_tag import PZRailCatalogTagClient
 from .clientconfig import client_config
 from .dataset import PZRailDatasetClient
+from .estimate import PZRailEstimateClient
 from .estimator import PZRailEstimatorClient
 from .load import PZRailLoadClient
 from .model import PZRailModelClient
@@ -35,6 +36,7 @@ class PZRailClient:
         self.request = PZRailRequestClient(self)
 
         self.load = PZRailLoadClient(self)
+        self.estimate = PZRailEstimateClient(self)
 
     @property
     def client(self) -> httpx.Client:
@@ -42,15 +44,20 @@ class PZRailClient:
         return self._client
 
     def _extra_client_kwargs(self) -> dict:  # pragma: no cover
-        client_kwargs: dict[str, Any] = {}
-        if "auth_token" in client_config.model_fields_set:
-            client_kwargs["headers"] = {"Authorization": f"Bearer {client_config.auth_token}"}
-        if "timeout" in client_config.model_fields_set:
-            client_kwargs["timeout"] = client_config.timeout
-        if "cookies" in client_config.model_fields_set:
-            cookies = httpx.Cookies()
-            if client_config.cookies:
-                for cookie in client_config.cookies:
-                    cookies.set(name=cookie.name, value=cookie.value)
-            client_kwargs["cookies"] = cookies
-        return client_kwargs
+        return extra_client_kwargs()
+
+
+def extra_client_kwargs() -> dict:  # pragma: no cover
+    """Return the options for the httpx clients set in `client_config`"""
+    client_kwargs: dict[str, Any] = {}
+    if "auth_token" in client_config.model_fields_set:
+        client_kwargs["headers"] = {"Authorization": f"Bearer {client_config.auth_token}"}
+    if "timeout" in client_config.model_fields_set:
+        client_kwargs["timeout"] = client_config.timeout
+    if "cookies" in client_config.model_fields_set:
+        cookies = httpx.Cookies()
+        if client_config.cookies:
+            for cookie in client_config.cookies:
+                cookies.set(name=cookie.name, value=cookie.value)
+        client_kwargs["cookies"] = cookies
+    return client_kwargs
@@ -41,6 +41,24 @@ class ClientConfiguration(BaseSettings):
         validation_alias="PZ_RAIL_TIMEOUT",
     )
 
+    upload_chunk_size: int = Field(
+        default=8 * 1024**2,
+        description="Number of bytes sent per request when uploading files",
+        validation_alias="PZ_RAIL_UPLOAD_CHUNK_SIZE",
+    )
+
+    download_chunk_size: int = Field(
+        default=8 * 1024**2,
+        description="Number of bytes read at a time when downloading files",
+        validation_alias="PZ_RAIL_DOWNLOAD_CHUNK_SIZE",
+    )
+
+    max_concurrency: int = Field(
+        default=8,
+        description="Maximum number of calls the async client runs at once in bulk operations",
+        validation_alias="PZ_RAIL_MAX_CONCURRENCY",
+    )
+
     # Field validator to convert empty string, 'null', or 'None' to actual None
     @field_validator("timeout", mode="before", check_fields=True)
     @classmethod
@@ -0,0 +1,129 @@
+"""python for client API for running estimators directly on input values"""
+
+from __future__ import annotations
+
+import io
+from typing import TYPE_CHECKING, Any
+
+import httpx
+import numpy as np
+from pydantic import TypeAdapter
+
+from .. import models
+
+if TYPE_CHECKING:
+    from .async_client import AsyncPZRailClient
+    from .client import PZRailClient
+
+
+class PZRailEstimateClient:
+    """Interface for accessing remote pz-rail-service to get p(z) estimates"""
+
+    def __init__(self, parent: PZRailClient) -> None:
+        self._client = parent.client
+
+    @property
+    def client(self) -> httpx.Client:
+        """Return the httpx.Client"""
+        return self._client
+
+    def run(self, **kwargs: Any) -> models.EstimateResult:
+        """Run an estimator on some values, without making a `Dataset`
+
+        Parameters
+        ----------
+        **kwargs
+            Input parameter.  Must match `EstimateQuery`
+
+        Returns
+        -------
+        models.EstimateResult
+            Point estimates and gridded PDFs
+
+        Example
+        -------
+
+        .. code-block:: python
+
+            client = RZRailClient()
+            result = client.estimate.run(
+                estimator_name='my_gpz_com_cam_estimator',
+                data=dict(u_cModelMag=[24.4, 23.1], ...),
+            )
+        """
+        full_query = "estimate"
+        content = models.EstimateQuery(**kwargs).model_dump_json()
+        results = self.client.post(full_query, content=content).raise_for_status().json()
+        return TypeAdapter(models.EstimateResult).validate_python(results)
+
+    def run_arrays(self, **kwargs: Any) -> dict[str, np.ndarray]:
+        """Run an estimator on some values, and get the results
+        back as numpy arrays, using the compact binary encoding
+
+        Parameters
+        ----------
+        **kwargs
+            Input parameter.  Must match `EstimateQuery`
+
+        Returns
+        -------
+        dict[str, np.ndarray]
+            Arrays with the same names as the fields of `EstimateResult`
+        """
+        full_query = "estimate"
+        kwargs["output_format"] = "npz"
+        content = models.EstimateQuery(**kwargs).model_dump_json()
+        response = self.client.post(full_query, content=content).raise_for_status()
+        with np.load(io.BytesIO(response.content)) as arrays:
+            return {key: arrays[key] for key in arrays.files}
+
+
+class AsyncPZRailEstimateClient:
+    """Async interface for accessing remote pz-rail-service to get p(z) estimates"""
+
+    def __init__(self, parent: AsyncPZRailClient) -> None:
+        self._client = parent.client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the httpx.AsyncClient"""
+        return self._client
+
+    async def run(self, **kwargs: Any) -> models.EstimateResult:
+        """Run an estimator on some values, without making a `Dataset`
+
+        Parameters
+        ----------
+        **kwargs
+            Input parameter.  Must match `EstimateQuery`
+
+        Returns
+        -------
+        models.EstimateResult
+            Point estimates and gridded PDFs
+        """
+        full_query = "estimate"
+        content = models.EstimateQuery(**kwargs).model_dump_json()
+        results = (await self.client.post(full_query, content=content)).raise_for_status().json()
+        return TypeAdapter(models.EstimateResult).validate_python(results)
+
+    async def run_arrays(self, **kwargs: Any) -> dict[str, np.ndarray]:
+        """Run an estimator on some values, and get the results
+        back as numpy arrays, using the compact binary encoding
+
+        Parameters
+        ----------
+        **kwargs
+            Input parameter.  Must match `EstimateQuery`
+
+        Returns
+        -------
+        dict[str, np.ndarray]
+            Arrays with the same names as the fields of `EstimateResult`
+        """
+        full_query = "estimate"
+        kwargs["output_format"] = "npz"
+        content = models.EstimateQuery(**kwargs).model_dump_json()
+        response = (await self.client.post(full_query, content=content)).raise_for_status()
+        with np.load(io.BytesIO(response.content)) as arrays:
+            return {key: arrays[key] for key in arrays.files}
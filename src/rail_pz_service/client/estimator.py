@@ -7,9 +7,10 @@ from typing import TYPE_CHECKING
 import httpx
 
 from .. import models
-from . import wrappers
+from . import async_wrappers, wrappers
 
 if TYPE_CHECKING:
+    from .async_client import AsyncPZRailClient
     from .client import PZRailClient
 
 # Template specialization
@@ -36,6 +37,8 @@ class PZRailEstimatorClient:
     # Add functions to the client class
     get_rows = wrappers.get_rows_function(ResponseModelClass, f"{router_string}/list")
 
+    iter_rows = wrappers.iter_rows_function(ResponseModelClass, f"{router_string}/list")
+
     get_row = wrappers.get_row_function(ResponseModelClass, f"{router_string}/get")
 
     get_row_by_name = wrappers.get_row_by_name_function(
@@ -45,3 +48,34 @@ class PZRailEstimatorClient:
     get_requests = wrappers.get_row_attribute_list_function(
         ResponseModelClass, f"{router_string}/get", "requests"
     )
+
+
+class AsyncPZRailEstimatorClient:
+    """Async interface for accessing remote pz-rail-service to manipulate
+    Estimator Tables
+    """
+
+    def __init__(self, parent: AsyncPZRailClient) -> None:
+        self._client = parent.client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the httpx.AsyncClient"""
+        return self._client
+
+    # Add functions to the client class
+    get_rows = async_wrappers.get_rows_function(ResponseModelClass, f"{router_string}/list")
+
+    iter_rows = async_wrappers.iter_rows_function(ResponseModelClass, f"{router_string}/list")
+
+    get_row = async_wrappers.get_row_function(ResponseModelClass, f"{router_string}/get")
+
+    get_many = async_wrappers.get_many_function(ResponseModelClass, f"{router_string}/get")
+
+    get_row_by_name = async_wrappers.get_row_by_name_function(
+        ResponseModelClass, f"{router_string}/get_row_by_name"
+    )
+
+    get_requests = async_wrappers.get_row_attribute_list_function(
+        ResponseModelClass, f"{router_string}/get", "requests"
+    )
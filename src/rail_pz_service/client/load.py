@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import os
+from collections.abc import Callable, Iterable
 from typing import TYPE_CHECKING, Any
 
 import httpx
 from pydantic import TypeAdapter
 
 from .. import models
+from .clientconfig import client_config
 
 if TYPE_CHECKING:
+    from .async_client import AsyncPZRailClient
     from .client import PZRailClient
 
 
@@ -79,6 +85,40 @@ class PZRailLoadClient:
         results = self.client.post(full_query, content=content).raise_for_status().json()
         return TypeAdapter(models.Dataset).validate_python(results)
 
+    def datasets(self, rows: Iterable[dict[str, Any]]) -> models.DatasetBulkResult:
+        """Load many `Dataset` into the database with a single call
+
+        Parameters
+        ----------
+        rows
+            Input parameters for each dataset.  Each must match `LoadDatasetQuery`
+
+        Returns
+        -------
+        models.DatasetBulkResult
+            Newly created and loaded datasets, and the ones that failed
+
+        Example
+        -------
+
+        .. code-block:: python
+
+            client = RZRailClient()
+            result = client.load.datasets(
+                [
+                    dict(name='data_1', path='data_1.hdf5', catalog_tag_name='com_cam'),
+                    dict(name='data_2', path='data_2.hdf5', catalog_tag_name='com_cam'),
+                ]
+            )
+            for error in result.errors:
+                print(f"Failed to load {error.index}: {error.detail}")
+        """
+        full_query = "load/datasets"
+        items = [models.LoadDatasetQuery(**kwargs) for kwargs in rows]
+        content = TypeAdapter(list[models.LoadDatasetQuery]).dump_json(items)
+        results = self.client.post(full_query, content=content).raise_for_status().json()
+        return TypeAdapter(models.DatasetBulkResult).validate_python(results)
+
     def model(self, **kwargs: Any) -> models.Model:
         """Load a `Model` into the database
 
@@ -138,3 +178,492 @@ class PZRailLoadClient:
         content = models.LoadEstimatorQuery(**kwargs).model_dump_json()
         results = self.client.post(full_query, content=content).raise_for_status().json()
         return TypeAdapter(models.Estimator).validate_python(results)
+
+    def upload_status(self, upload_id: str) -> models.UploadStatus:
+        """Get the state of an upload
+
+        Parameters
+        ----------
+        upload_id
+            Id of the upload
+
+        Returns
+        -------
+        models.UploadStatus
+            State of the upload, including how many bytes the server has
+        """
+        results = self.client.get(f"load/upload/{upload_id}").raise_for_status().json()
+        return TypeAdapter(models.UploadStatus).validate_python(results)
+
+    def upload_file(
+        self,
+        path: str | os.PathLike,
+        *,
+        upload_id: str | None = None,
+        chunk_size: int | None = None,
+        progress: Callable[[int, int], None] | None = None,
+        max_retries: int = 3,
+    ) -> tuple[models.UploadStatus, str]:
+        """Send a local file to the server in chunks
+
+        If a chunk fails to go through, this asks the server how much it
+        has and carries on from there, up to `max_retries` times in a row.
+
+        Parameters
+        ----------
+        path
+            Local file to upload
+
+        upload_id
+            Id of an earlier upload of the same file to resume, None to start anew
+
+        chunk_size
+            Number of bytes per request, defaults to `client_config.upload_chunk_size`
+
+        progress
+            Called after each chunk with the number of bytes sent and the file size
+
+        max_retries
+            Number of times to retry a failed chunk
+
+        Returns
+        -------
+        tuple[models.UploadStatus, str]
+            State of the finished upload, and the sha256 hex digest of the file
+
+        Notes
+        -----
+        If the upload still fails, the `upload_id` is in the notes of the
+        exception, and can be passed back in to resume.
+        """
+        chunk_size = chunk_size or client_config.upload_chunk_size
+        n_bytes = os.path.getsize(path)
+        if upload_id is None:
+            content = models.UploadStart(filename=os.path.basename(path)).model_dump_json()
+            results = self.client.post("load/upload", content=content).raise_for_status().json()
+            status = TypeAdapter(models.UploadStatus).validate_python(results)
+        else:
+            status = self.upload_status(upload_id)
+
+        digest = hashlib.sha256()
+        n_failures = 0
+        with open(path, "rb") as fin:
+            # Bytes the server already has still count towards the checksum
+            while fin.tell() < status.offset:
+                digest.update(fin.read(min(chunk_size, status.offset - fin.tell())))
+            while status.offset < n_bytes:
+                chunk = fin.read(chunk_size)
+                try:
+                    results = (
+                        self.client.put(
+                            f"load/upload/{status.upload_id}",
+                            params={"offset": status.offset},
+                            content=chunk,
+                        )
+                        .raise_for_status()
+                        .json()
+                    )
+                except httpx.HTTPError as msg:
+                    n_failures += 1
+                    # On 409 we are out of step with the server, other 4xx won't change
+                    refused = (
+                        isinstance(msg, httpx.HTTPStatusError)
+                        and msg.response.status_code < 500
+                        and msg.response.status_code != 409
+                    )
+                    if refused or n_failures > max_retries:
+                        msg.add_note(f"Resume the upload with upload_id={status.upload_id}")
+                        raise
+                    # Pick up from wherever the server got to
+                    offset = self.upload_status(status.upload_id).offset
+                    fin.seek(status.offset)
+                    chunk = fin.read(offset - status.offset)
+                    digest.update(chunk)
+                    status.offset = offset
+                    continue
+                n_failures = 0
+                digest.update(chunk)
+                status = TypeAdapter(models.UploadStatus).validate_python(results)
+                if progress is not None:
+                    progress(status.offset, n_bytes)
+        return status, digest.hexdigest()
+
+    def upload_dataset(
+        self,
+        path: str | os.PathLike,
+        name: str,
+        catalog_tag_name: str,
+        **kwargs: Any,
+    ) -> models.Dataset:
+        """Upload a local file and load it as a `Dataset`
+
+        Unlike `dataset`, this works when the client and server
+        do not share a filesystem.
+
+        Parameters
+        ----------
+        path
+            Local file to upload
+
+        name
+            Name for new Dataset
+
+        catalog_tag_name
+            Name of CatalogTag that described contents of file
+
+        **kwargs
+            Passed to `upload_file`, e.g., `progress` or `upload_id`
+
+        Returns
+        -------
+        models.Dataset
+            Newly created and loaded dataset
+
+        Example
+        -------
+
+        .. code-block:: python
+
+            client = RZRailClient()
+            new_dataset = client.load.upload_dataset(
+                'local_version_of_data_file.hdf5',
+                name='my_com_cam_dataset',
+                catalog_tag_name='com_cam',
+                progress=lambda sent, total: print(f"{sent} / {total}"),
+            )
+        """
+        status, checksum = self.upload_file(path, **kwargs)
+        content = models.UploadDatasetQuery(
+            name=name,
+            catalog_tag_name=catalog_tag_name,
+            checksum=checksum,
+        ).model_dump_json()
+        full_query = f"load/upload/{status.upload_id}/dataset"
+        results = self.client.post(full_query, content=content).raise_for_status().json()
+        return TypeAdapter(models.Dataset).validate_python(results)
+
+    def upload_model(
+        self,
+        path: str | os.PathLike,
+        name: str,
+        algo_name: str,
+        catalog_tag_name: str,
+        **kwargs: Any,
+    ) -> models.Model:
+        """Upload a local file and load it as a `Model`
+
+        Unlike `model`, this works when the client and server
+        do not share a filesystem.
+
+        Parameters
+        ----------
+        path
+            Local file to upload
+
+        name
+            Name for new Model
+
+        algo_name
+            Name of Algorithm that uses the model
+
+        catalog_tag_name
+            Name of CatalogTag that described contents of file
+
+        **kwargs
+            Passed to `upload_file`, e.g., `progress` or `upload_id`
+
+        Returns
+        -------
+        models.Model
+            Newly created and loaded model
+        """
+        status, checksum = self.upload_file(path, **kwargs)
+        content = models.UploadModelQuery(
+            name=name,
+            algo_name=algo_name,
+            catalog_tag_name=catalog_tag_name,
+            checksum=checksum,
+        ).model_dump_json()
+        full_query = f"load/upload/{status.upload_id}/model"
+        results = self.client.post(full_query, content=content).raise_for_status().json()
+        return TypeAdapter(models.Model).validate_python(results)
+
+
+def _hash_prefix(path: str | os.PathLike, n_bytes: int, chunk_size: int) -> Any:
+    """Return a sha256 digest of the first `n_bytes` bytes of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fin:
+        while fin.tell() < n_bytes:
+            digest.update(fin.read(min(chunk_size, n_bytes - fin.tell())))
+    return digest
+
+
+def _read_chunk(path: str | os.PathLike, offset: int, size: int) -> bytes:
+    """Read `size` bytes of a file, starting at `offset`"""
+    with open(path, "rb") as fin:
+        fin.seek(offset)
+        return fin.read(size)
+
+
+class AsyncPZRailLoadClient:
+    """Async interface for accessing remote pz-rail-service to load data"""
+
+    def __init__(self, parent: AsyncPZRailClient) -> None:
+        self._client = parent.client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the httpx.AsyncClient"""
+        return self._client
+
+    async def dataset(self, **kwargs: Any) -> models.Dataset:
+        """Load a `Dataset` into the database
+
+        Parameters
+        ----------
+        **kwargs
+            Input parameter.  Must match `LoadDatasetQuery`
+
+        Returns
+        -------
+        models.Dataset
+            Newly created and loaded dataset
+        """
+        full_query = "load/dataset"
+        content = models.LoadDatasetQuery(**kwargs).model_dump_json()
+        results = (await self.client.post(full_query, content=content)).raise_for_status().json()
+        return TypeAdapter(models.Dataset).validate_python(results)
+
+    async def datasets(self, rows: Iterable[dict[str, Any]]) -> models.DatasetBulkResult:
+        """Load many `Dataset` into the database with a single call
+
+        Parameters
+        ----------
+        rows
+            Input parameters for each dataset.  Each must match `LoadDatasetQuery`
+
+        Returns
+        -------
+        models.DatasetBulkResult
+            Newly created and loaded datasets, and the ones that failed
+        """
+        full_query = "load/datasets"
+        items = [models.LoadDatasetQuery(**kwargs) for kwargs in rows]
+        content = TypeAdapter(list[models.LoadDatasetQuery]).dump_json(items)
+        results = (await self.client.post(full_query, content=content)).raise_for_status().json()
+        return TypeAdapter(models.DatasetBulkResult).validate_python(results)
+
+    async def model(self, **kwargs: Any) -> models.Model:
+        """Load a `Model` into the database
+
+        Parameters
+        ----------
+        **kwargs
+            Input parameter.  Must match `LoadModelQuery`
+
+        Returns
+        -------
+        models.Model
+            Newly created and loaded model
+        """
+        full_query = "load/model"
+        content = models.LoadModelQuery(**kwargs).model_dump_json()
+        results = (await self.client.post(full_query, content=content)).raise_for_status().json()
+        return TypeAdapter(models.Model).validate_python(results)
+
+    async def estimator(self, **kwargs: Any) -> models.Estimator:
+        """Load a `Estimator` into the database
+
+        Parameters
+        ----------
+        **kwargs
+            Input parameter.  Must match `LoadEstimatorQuery`
+
+        Returns
+        -------
+        models.Estimator
+            Newly created and loaded estimator
+        """
+        full_query = "load/estimator"
+        content = models.LoadEstimatorQuery(**kwargs).model_dump_json()
+        results = (await self.client.post(full_query, content=content)).raise_for_status().json()
+        return TypeAdapter(models.Estimator).validate_python(results)
+
+    async def upload_status(self, upload_id: str) -> models.UploadStatus:
+        """Get the state of an upload
+
+        Parameters
+        ----------
+        upload_id
+            Id of the upload
+
+        Returns
+        -------
+        models.UploadStatus
+            State of the upload, including how many bytes the server has
+        """
+        results = (await self.client.get(f"load/upload/{upload_id}")).raise_for_status().json()
+        return TypeAdapter(models.UploadStatus).validate_python(results)
+
+    async def upload_file(
+        self,
+        path: str | os.PathLike,
+        *,
+        upload_id: str | None = None,
+        chunk_size: int | None = None,
+        progress: Callable[[int, int], None] | None = None,
+        max_retries: int = 3,
+    ) -> tuple[models.UploadStatus, str]:
+        """Send a local file to the server in chunks
+
+        See `PZRailLoadClient.upload_file`, the file is read in a thread
+        so that other uploads can carry on at the same time.
+
+        Parameters
+        ----------
+        path
+            Local file to upload
+
+        upload_id
+            Id of an earlier upload of the same file to resume, None to start anew
+
+        chunk_size
+            Number of bytes per request, defaults to `client_config.upload_chunk_size`
+
+        progress
+            Called after each chunk with the number of bytes sent and the file size
+
+        max_retries
+            Number of times to retry a failed chunk
+
+        Returns
+        -------
+        tuple[models.UploadStatus, str]
+            State of the finished upload, and the sha256 hex digest of the file
+        """
+        chunk_size = chunk_size or client_config.upload_chunk_size
+        n_bytes = os.path.getsize(path)
+        if upload_id is None:
+            content = models.UploadStart(filename=os.path.basename(path)).model_dump_json()
+            results = (await self.client.post("load/upload", content=content)).raise_for_status().json()
+            status = TypeAdapter(models.UploadStatus).validate_python(results)
+        else:
+            status = await self.upload_status(upload_id)
+
+        # Bytes the server already has still count towards the checksum
+        digest = await asyncio.to_thread(_hash_prefix, path, status.offset, chunk_size)
+        n_failures = 0
+        while status.offset < n_bytes:
+            chunk = await asyncio.to_thread(_read_chunk, path, status.offset, chunk_size)
+            try:
+                response = await self.client.put(
+                    f"load/upload/{status.upload_id}",
+                    params={"offset": status.offset},
+                    content=chunk,
+                )
+                results = response.raise_for_status().json()
+            except httpx.HTTPError as msg:
+                n_failures += 1
+                # On 409 we are out of step with the server, other 4xx won't change
+                refused = (
+                    isinstance(msg, httpx.HTTPStatusError)
+                    and msg.response.status_code < 500
+                    and msg.response.status_code != 409
+                )
+                if refused or n_failures > max_retries:
+                    msg.add_note(f"Resume the upload with upload_id={status.upload_id}")
+                    raise
+                # Pick up from wherever the server got to
+                offset = (await self.upload_status(status.upload_id)).offset
+                digest.update(
+                    await asyncio.to_thread(_read_chunk, path, status.offset, offset - status.offset)
+                )
+                status.offset = offset
+                continue
+            n_failures = 0
+            digest.update(chunk)
+            status = TypeAdapter(models.UploadStatus).validate_python(results)
+            if progress is not None:
+                progress(status.offset, n_bytes)
+        return status, digest.hexdigest()
+
+    async def upload_dataset(
+        self,
+        path: str | os.PathLike,
+        name: str,
+        catalog_tag_name: str,
+        **kwargs: Any,
+    ) -> models.Dataset:
+        """Upload a local file and load it as a `Dataset`
+
+        Parameters
+        ----------
+        path
+            Local file to upload
+
+        name
+            Name for new Dataset
+
+        catalog_tag_name
+            Name of CatalogTag that described contents of file
+
+        **kwargs
+            Passed to `upload_file`, e.g., `progress` or `upload_id`
+
+        Returns
+        -------
+        models.Dataset
+            Newly created and loaded dataset
+        """
+        status, checksum = await self.upload_file(path, **kwargs)
+        content = models.UploadDatasetQuery(
+            name=name,
+            catalog_tag_name=catalog_tag_name,
+            checksum=checksum,
+        ).model_dump_json()
+        full_query = f"load/upload/{status.upload_id}/dataset"
+        results = (await self.client.post(full_query, content=content)).raise_for_status().json()
+        return TypeAdapter(models.Dataset).validate_python(results)
+
+    async def upload_model(
+        self,
+        path: str | os.PathLike,
+        name: str,
+        algo_name: str,
+        catalog_tag_name: str,
+        **kwargs: Any,
+    ) -> models.Model:
+        """Upload a local file and load it as a `Model`
+
+        Parameters
+        ----------
+        path
+            Local file to upload
+
+        name
+            Name for new Model
+
+        algo_name
+            Name of Algorithm that uses the model
+
+        catalog_tag_name
+            Name of CatalogTag that described contents of file
+
+        **kwargs
+            Passed to `upload_file`, e.g., `progress` or `upload_id`
+
+        Returns
+        -------
+        models.Model
+            Newly created and loaded model
+        """
+        status, checksum = await self.upload_file(path, **kwargs)
+        content = models.UploadModelQuery(
+            name=name,
+            algo_name=algo_name,
+            catalog_tag_name=catalog_tag_name,
+            checksum=checksum,
+        ).model_dump_json()
+        full_query = f"load/upload/{status.upload_id}/model"
+        results = (await self.client.post(full_query, content=content)).raise_for_status().json()
+        return TypeAdapter(models.Model).validate_python(results)
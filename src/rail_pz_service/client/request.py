@@ -2,15 +2,17 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any
 
 import httpx
 from pydantic import TypeAdapter
 
 from .. import models
-from . import wrappers
+from . import async_wrappers, wrappers
 
 if TYPE_CHECKING:
+    from .async_client import AsyncPZRailClient
     from .client import PZRailClient
 
 # Template specialization
@@ -37,6 +39,8 @@ class PZRailRequestClient:
     # Add functions to the client class
     get_rows = wrappers.get_rows_function(ResponseModelClass, f"{router_string}/list")
 
+    iter_rows = wrappers.iter_rows_function(ResponseModelClass, f"{router_string}/list")
+
     get_row = wrappers.get_row_function(ResponseModelClass, f"{router_string}/get")
 
     get_row_by_name = wrappers.get_row_by_name_function(
@@ -44,6 +48,11 @@ class PZRailRequestClient:
     )
 
     create = wrappers.create_row_function(ResponseModelClass, models.RequestCreate, f"{router_string}/create")
+
+    create_bulk = wrappers.create_bulk_function(
+        models.RequestBulkResult, models.RequestCreate, f"{router_string}/create_many"
+    )
+
     delete = wrappers.delete_row_function(f"{router_string}")
 
     download = wrappers.download_file_function(f"{router_string}/download")
@@ -81,3 +90,173 @@ class PZRailRequestClient:
         full_query = f"{router_string}/run/{row_id}"
         results = self.client.post(full_query).raise_for_status().json()
         return TypeAdapter(ResponseModelClass).validate_python(results)
+
+    def get_output_rows(
+        self,
+        row_id: int,
+        **kwargs: Any,
+    ) -> models.RequestRows:
+        """Read some of the rows of the output of a request,
+        without downloading the whole file
+
+        Parameters
+        ----------
+        row_id
+            Id of the request in the Request table
+
+        **kwargs
+            Passed to `models.RequestRowsQuery`, i.e., `start`, `stop`
+            or `indices` to pick the rows and `content` to pick what to read
+
+        Returns
+        -------
+        RequestRows
+            Rows in question
+
+        Example
+        -------
+
+        .. code-block:: python
+
+            client = RZRailClient()
+
+            first_rows = client.request.get_output_rows(
+                request_id,
+                start=0,
+                stop=10,
+            )
+            zmode = first_rows.columns['zmode']
+        """
+        query = models.RequestRowsQuery(output_format="json", **kwargs)
+        full_query = f"{router_string}/rows/{row_id}"
+        results = self.client.post(full_query, content=query.model_dump_json()).raise_for_status().json()
+        return TypeAdapter(models.RequestRows).validate_python(results)
+
+
+class AsyncPZRailRequestClient:
+    """Async interface for accessing remote pz-rail-service to manipulate
+    Request Tables
+    """
+
+    def __init__(self, parent: AsyncPZRailClient) -> None:
+        self._client = parent.client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the httpx.AsyncClient"""
+        return self._client
+
+    # Add functions to the client class
+    get_rows = async_wrappers.get_rows_function(ResponseModelClass, f"{router_string}/list")
+
+    iter_rows = async_wrappers.iter_rows_function(ResponseModelClass, f"{router_string}/list")
+
+    get_row = async_wrappers.get_row_function(ResponseModelClass, f"{router_string}/get")
+
+    get_many = async_wrappers.get_many_function(ResponseModelClass, f"{router_string}/get")
+
+    get_row_by_name = async_wrappers.get_row_by_name_function(
+        ResponseModelClass, f"{router_string}/get_row_by_name"
+    )
+
+    create = async_wrappers.create_row_function(
+        ResponseModelClass, models.RequestCreate, f"{router_string}/create"
+    )
+
+    create_many = async_wrappers.create_many_function(
+        ResponseModelClass, models.RequestCreate, f"{router_string}/create"
+    )
+
+    create_bulk = async_wrappers.create_bulk_function(
+        models.RequestBulkResult, models.RequestCreate, f"{router_string}/create_many"
+    )
+
+    delete = async_wrappers.delete_row_function(f"{router_string}")
+
+    download = async_wrappers.download_file_function(f"{router_string}/download")
+
+    async def run(self, row_id: int) -> models.Request:
+        """Run a request
+
+        Parameters
+        ----------
+        row_id
+            Id of the request in the Request table
+
+        Returns
+        -------
+        Request
+            Request in question
+        """
+        full_query = f"{router_string}/run/{row_id}"
+        results = (await self.client.post(full_query)).raise_for_status().json()
+        return TypeAdapter(ResponseModelClass).validate_python(results)
+
+    async def run_many(
+        self,
+        row_ids: Iterable[int],
+        *,
+        concurrency: int | None = None,
+    ) -> list[models.Request]:
+        """Run many requests concurrently
+
+        Parameters
+        ----------
+        row_ids
+            Ids of the requests in the Request table
+
+        concurrency
+            Maximum number of requests running at once,
+            defaults to `client_config.max_concurrency`
+
+        Returns
+        -------
+        list[Request]
+            Requests in question, in the same order as `row_ids`
+
+        Example
+        -------
+
+        .. code-block:: python
+
+            async with AsyncPZRailClient() as client:
+                new_requests = await client.request.create_many(
+                    [
+                        dict(dataset_name=name, estimator_name='my_gpz_estimator')
+                        for name in dataset_names
+                    ]
+                )
+                updated_requests = await client.request.run_many(
+                    [new_request.id for new_request in new_requests],
+                    concurrency=4,
+                )
+        """
+        return await async_wrappers.gather_limited((self.run(row_id) for row_id in row_ids), concurrency)
+
+    async def get_output_rows(
+        self,
+        row_id: int,
+        **kwargs: Any,
+    ) -> models.RequestRows:
+        """Read some of the rows of the output of a request,
+        without downloading the whole file
+
+        Parameters
+        ----------
+        row_id
+            Id of the request in the Request table
+
+        **kwargs
+            Passed to `models.RequestRowsQuery`
+
+        Returns
+        -------
+        RequestRows
+            Rows in question
+        """
+        query = models.RequestRowsQuery(output_format="json", **kwargs)
+        full_query = f"{router_string}/rows/{row_id}"
+        results = (
+            (await self.client.post(full_query, content=query.model_dump_json())).raise_for_status().json()
+        )
+        return TypeAdapter(models.RequestRows).validate_python(results)
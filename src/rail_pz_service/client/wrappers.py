@@ -1,17 +1,69 @@
 from __future__ import annotations
 
-from collections.abc import Callable
-from typing import TYPE_CHECKING, Any, TypeAlias
+import os
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Literal, TypeAlias
 
+import httpx
 from httpx import Response
 from pydantic import BaseModel, TypeAdapter
 
 from .. import models
+from ..common.errors import RAILChecksumError
+from ..common.hashing import file_content_hash
+from .clientconfig import client_config
 
 if TYPE_CHECKING:
     from .client import PZRailClient
 
 
+def iter_rows_function(
+    response_model_class: TypeAlias = BaseModel,
+    query: str = "",
+) -> Callable:
+    """Return a function that iterates over the rows from a table
+    and attaches that function to a client.
+
+    The rows are fetched one page at a time, using the id of the last
+    row of each page as the cursor for the next one.
+
+    Parameters
+    ----------
+    response_model_class: TypeAlias = BaseModel,
+        Pydantic class used to serialize the return value
+
+    query: str
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that yields the rows for the table in question
+    """
+
+    def iter_rows(
+        obj: PZRailClient,
+        *,
+        page_size: int = 100,
+        descending: bool = False,
+        **filters: Any,
+    ) -> Iterator[response_model_class]:
+        params: dict[str, Any] = {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in filters.items()
+            if value is not None
+        }
+        params.update(limit=page_size, order="desc" if descending else "asc")
+        adapter = TypeAdapter(list[response_model_class])
+        while paged_results := obj.client.get(f"{query}", params=params).raise_for_status().json():
+            rows = adapter.validate_python(paged_results)
+            yield from rows
+            params["after"] = rows[-1].id
+
+    return iter_rows
+
+
 def get_rows_function(
     response_model_class: TypeAlias = BaseModel,
     query: str = "",
@@ -20,9 +72,8 @@ def get_rows_function(
     and attaches that function to a client.
 
     This version will provide a function which can be filtered
-    based on the id of the parent node.
-
-    FIXME: we aren't using this version, but might want to
+    on the columns of the table, see the `ListQuery` model for
+    the table for the available filters.
 
     Parameters
     ----------
@@ -37,17 +88,13 @@ def get_rows_function(
     the_function: Callable
         Function that return all the rows for the table in question
     """
+    iter_rows = iter_rows_function(response_model_class, query)
 
     def get_rows(
         obj: PZRailClient,
+        **filters: Any,
     ) -> list[response_model_class]:
-        results: list[response_model_class] = []
-        params: dict[str, Any] = {"skip": 0}
-        adapter = TypeAdapter(list[response_model_class])
-        while (paged_results := obj.client.get(f"{query}", params=params).raise_for_status().json()) != []:
-            results.extend(adapter.validate_python(paged_results))
-            params["skip"] += len(paged_results)
-        return results
+        return list(iter_rows(obj, **filters))
 
     return get_rows
 
@@ -213,11 +260,54 @@ def create_row_function(
     return row_create
 
 
+def create_bulk_function(
+    response_model_class: TypeAlias = BaseModel,
+    create_model_class: TypeAlias = BaseModel,
+    query: str = "",
+) -> Callable:
+    """Return a function that creates many rows in a table with a single call
+    and attaches that function to a client.
+
+    Parameters
+    ----------
+    response_model_class
+        Pydantic class used to serialize the return value,
+        i.e., the bulk result listing the created rows and the errors
+
+    create_model_class
+        Pydantic class used to serialize the inputs value
+
+    query
+        http query
+
+    Returns
+    -------
+    the_function: Callable
+        Function that creates the rows and returns the bulk result
+    """
+
+    def create_bulk(
+        obj: PZRailClient,
+        rows: Iterable[dict[str, Any]],
+    ) -> response_model_class:
+        items = [create_model_class(**kwargs) for kwargs in rows]
+        content = TypeAdapter(list[create_model_class]).dump_json(items)
+        results = obj.client.post(query, content=content).raise_for_status().json()
+        return TypeAdapter(response_model_class).validate_python(results)
+
+    return create_bulk
+
+
 def download_file_function(
     query: str = "",
 ) -> Callable:
     """Download a file associated to DB object.
 
+    The file is streamed to disk in chunks.  It is first written to
+    `<filename>.part`, so that an interrupted download can be resumed
+    with an HTTP Range request, and only renamed once it is complete
+    and, if the server sent a checksum, verified.
+
     Parameters
     ----------
     query
@@ -233,13 +323,121 @@ def download_file_function(
         obj: PZRailClient,
         row_id: int,
         filename: str,
+        *,
+        output_dir: str | None = None,
+        chunk_size: int | None = None,
+        progress: Callable[[int, int | None], None] | None = None,
+        max_retries: int = 3,
     ) -> Response:
         full_query = f"{query}/{row_id}"
         params = models.DownloadQuery(filename=filename).model_dump()
-        results = obj.client.get(full_query, params=params).raise_for_status()
-        filename = results.headers["content-disposition"].split("=")[1].replace('"', "")
-        with open(filename, mode="wb") as fout:
-            fout.write(results.content)
-        return results
+        chunk_size = chunk_size or client_config.download_chunk_size
+
+        n_failures = 0
+        while True:
+            try:
+                results = _stream_download(obj.client, full_query, params, output_dir, chunk_size, progress)
+                if results is not None:
+                    return results
+                # The partial download could not be resumed, start over
+            except httpx.TransportError:
+                # Dropped connection, carry on from what we have
+                n_failures += 1
+                if n_failures > max_retries:
+                    raise
 
     return download_file
+
+
+def _download_paths(filename: str, output_dir: str | None) -> tuple[str, str, str]:
+    """Return the final, partial and validator file names for a download"""
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        filename = os.path.join(output_dir, os.path.basename(filename))
+    part_filename = f"{filename}.part"
+    # ETag or Last-Modified of the file the partial download came from
+    return filename, part_filename, f"{part_filename}.validator"
+
+
+def _resume_headers(part_filename: str, validator_filename: str) -> tuple[int, dict[str, str]]:
+    """Return the offset and headers to pick up a partial download"""
+    if not (os.path.exists(part_filename) and os.path.exists(validator_filename)):
+        return 0, {}
+    offset = os.path.getsize(part_filename)
+    with open(validator_filename) as fin:
+        # Only get the rest if the file has not changed, otherwise the whole thing
+        return offset, {"if-range": fin.read(), "range": f"bytes={offset}-"}
+
+
+def _start_download(
+    results: Response, offset: int, validator_filename: str
+) -> tuple[int, int | None, Literal["ab", "wb"]]:
+    """Return the offset, total size and file mode for a download response"""
+    mode: Literal["ab", "wb"]
+    if results.status_code == 206:
+        total: int | None = int(results.headers["content-range"].split("/")[-1])
+        mode = "ab"
+    else:
+        total = int(results.headers["content-length"]) if "content-length" in results.headers else None
+        offset = 0
+        mode = "wb"
+
+    validator = results.headers.get("etag") or results.headers.get("last-modified")
+    if validator is not None:
+        with open(validator_filename, "w") as fout:
+            fout.write(validator)
+    return offset, total, mode
+
+
+def _discard_download(part_filename: str, validator_filename: str) -> None:
+    """Remove a partial download, so that the next attempt starts over"""
+    for stale_filename in (part_filename, validator_filename):
+        if os.path.exists(stale_filename):
+            os.unlink(stale_filename)
+
+
+def _finish_download(results: Response, filename: str, part_filename: str, validator_filename: str) -> None:
+    """Check a completed download against the server checksum and move it in place"""
+    checksum = results.headers.get("x-checksum-sha256")
+    if checksum is not None and file_content_hash(part_filename) != checksum:
+        _discard_download(part_filename, validator_filename)
+        raise RAILChecksumError(f"Download of {filename} does not match checksum {checksum}")
+
+    os.replace(part_filename, filename)
+    if os.path.exists(validator_filename):
+        os.unlink(validator_filename)
+
+
+def _stream_download(
+    client: httpx.Client,
+    full_query: str,
+    params: dict,
+    output_dir: str | None,
+    chunk_size: int,
+    progress: Callable[[int, int | None], None] | None,
+) -> Response | None:
+    """Stream a download to disk, return None if the partial download
+    has to be thrown away and the download started over
+    """
+    filename, part_filename, validator_filename = _download_paths(params["filename"], output_dir)
+    offset, headers = _resume_headers(part_filename, validator_filename)
+
+    with client.stream("GET", full_query, params=params, headers=headers) as results:
+        # The partial download is longer than the file
+        restart = results.status_code == 416 and "range" in headers
+        if not restart:
+            results.raise_for_status()
+            offset, total, mode = _start_download(results, offset, validator_filename)
+            with open(part_filename, mode) as fout:
+                for chunk in results.iter_bytes(chunk_size):
+                    fout.write(chunk)
+                    offset += len(chunk)
+                    if progress is not None:
+                        progress(offset, total)
+
+    if restart:
+        _discard_download(part_filename, validator_filename)
+        return None
+
+    _finish_download(results, filename, part_filename, validator_filename)
+    return results
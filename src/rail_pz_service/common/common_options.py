@@ -125,6 +125,14 @@ config = PartialOption(
 )
 
 
+chunk_size = PartialOption(
+    "--chunk-size",
+    type=int,
+    default=None,
+    help="Number of rows per chunk when running on large files",
+)
+
+
 data = PartialOption(
     "--data",
     type=DictParamType(),
@@ -196,6 +204,14 @@ filename = PartialOption(
 )
 
 
+output_dir = PartialOption(
+    "--output-dir",
+    type=click.Path(),
+    default=None,
+    help="Directory to write downloaded files to",
+)
+
+
 model_name = PartialOption(
     "--model-name",
     type=str,
@@ -229,3 +245,16 @@ validate_file = PartialOption(
     default=False,
     help="Validate files when uploading",
 )
+
+upload = PartialOption(
+    "--upload",
+    is_flag=True,
+    default=False,
+    help="Send the file to the server in chunks, rather than just its path",
+)
+
+input_file = PartialOption(
+    "--input-file",
+    type=click.Path(exists=True),
+    help="yaml file with a list of items to create",
+)
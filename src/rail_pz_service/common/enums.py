@@ -0,0 +1,25 @@
+"""Enumerations shared by the client and the server"""
+
+from enum import StrEnum
+
+
+class RequestStatusEnum(StrEnum):
+    """Where a `Request` is in its processing
+
+    queued:
+        Waiting for a worker to claim it
+    running:
+        Claimed by a worker, or run directly
+    done:
+        Finished, the output file is available
+    failed:
+        Finished, but no output was produced
+    cancelled:
+        Will not be run
+    """
+
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+    cancelled = "cancelled"
@@ -33,6 +33,10 @@ class RAILRequestError(RuntimeError):
     """Raised when a RAIL request failed"""
 
 
+class RAILRequestNotDoneError(RuntimeError):
+    """Raised when the output of a RAIL request is asked for before it is done"""
+
+
 class RAILFileNotFoundError(FileNotFoundError):
     """Raised when a requested input file is not found"""
 
@@ -51,3 +55,7 @@ class RAILMissingInputError(FileNotFoundError):
 
 class RAILBadInputError(FileNotFoundError):
     """Raised when a functions input is not what is expected"""
+
+
+class RAILChecksumError(RuntimeError):
+    """Raised when a file does not match its expected checksum"""
@@ -0,0 +1,48 @@
+"""Content hashes used to recognize identical inputs"""
+
+import hashlib
+import json
+import os
+from typing import Any
+
+#: Number of bytes read at a time when hashing files
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_content_hash(path: str | os.PathLike) -> str:
+    """Compute the sha256 hash of the contents of a file
+
+    Parameters
+    ----------
+    path
+        File in question
+
+    Returns
+    -------
+    str
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fin:
+        while block := fin.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def values_content_hash(values: Any) -> str:
+    """Compute the sha256 hash of some JSON serializable values
+
+    Dict keys are sorted, so the hash does not depend on insertion order.
+
+    Parameters
+    ----------
+    values
+        Values in question
+
+    Returns
+    -------
+    str
+        Hex digest of the canonical JSON form of the values
+    """
+    canonical = json.dumps(values, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
@@ -1,5 +1,7 @@
 """Common configuration parameters for pz-rail-service related packages"""
 
+from typing import Literal
+
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -42,6 +44,21 @@ class AsgiConfiguration(BaseModel):
         default=True,
     )
 
+    estimate_max_objects: int = Field(
+        description="The maximum number of objects in a single call to the estimate endpoint",
+        default=1000,
+    )
+
+    rows_max_objects: int = Field(
+        description="The maximum number of rows in a single call to read part of a Request output",
+        default=100_000,
+    )
+
+    max_upload_size: int = Field(
+        description="The maximum size in bytes of a file uploaded to the server",
+        default=32 * 1024**3,
+    )
+
 
 class LoggingConfiguration(BaseModel):
     """Configuration for the application's logging facility."""
@@ -77,6 +94,65 @@ class DaemonConfiguration(BaseModel):
         ),
     )
 
+    notify_channel: str = Field(
+        default="rail_pz_request",
+        description=(
+            "PostgreSQL LISTEN/NOTIFY channel used to wake up workers when "
+            "requests are created, processing_interval is then only a fallback"
+        ),
+    )
+
+    executor_type: Literal["process", "thread"] = Field(
+        default="process",
+        description=(
+            "Type of pool used to run estimation off of the event loop, "
+            "'process' to use multiple cores, 'thread' to stay in a single process, "
+            "where RAIL's global state limits the pool to one estimation at a time"
+        ),
+    )
+
+    executor_pool_size: int | None = Field(
+        default=None,
+        description="Number of workers in the estimation pool, defaults to the number of CPUs",
+    )
+
+    batch_max_wait: float = Field(
+        default=0.01,
+        description=(
+            "The maximum time (seconds) single object estimates wait "
+            "to be batched with others for the same estimator"
+        ),
+    )
+
+    batch_max_size: int = Field(
+        default=1024,
+        description="The maximum number of single object estimates run together",
+    )
+
+    max_concurrent_requests: int | None = Field(
+        default=None,
+        description=(
+            "The maximum number of requests a worker runs at once, "
+            "defaults to the size of the estimation pool"
+        ),
+    )
+
+    worker_id: str | None = Field(
+        default=None,
+        description=(
+            "Id used by a worker to claim requests from the shared queue, "
+            "defaults to the host name and process id"
+        ),
+    )
+
+    shutdown_timeout: int = Field(
+        default=60,
+        description=(
+            "The maximum time (seconds) a worker waits for running requests to finish "
+            "when shutting down, requests still running after that are requeued"
+        ),
+    )
+
 
 class DatabaseConfiguration(BaseModel):
     """Database configuration nested model.
@@ -121,6 +197,84 @@ class StorageConfiguration(BaseModel):
         description="The path for the import area for files for pz-rail-service database",
     )
 
+    ingest_strategy: Literal["auto", "move", "hardlink", "reflink", "copy"] = Field(
+        default="auto",
+        description=(
+            "How files are put in the archive, 'auto' tries a hardlink, then a reflink, "
+            "then falls back to a copy.  'move' takes the file away from its original location"
+        ),
+    )
+
+    ingest_block_size: int = Field(
+        default=8 * 1024 * 1024,
+        description="Number of bytes read at a time when copying files into the archive",
+    )
+
+    upload_ttl: float | None = Field(
+        default=24 * 3600,
+        description=(
+            "Number of seconds after its last chunk an unfinished upload to the load API is removed, "
+            "checked whenever an upload is started, None to keep them forever"
+        ),
+    )
+
+
+class CacheConfiguration(BaseModel):
+    """In-memory cache configuration nested model.
+
+    Set according to CACHE__FIELD environment variables.
+    """
+
+    estimator_max_entries: int | None = Field(
+        default=4,
+        description=(
+            "The maximum number of estimators kept in memory by each process of the estimation pool, "
+            "None for no limit, the estimator in use is always kept"
+        ),
+    )
+
+    estimator_max_bytes: int | None = Field(
+        default=1024**3,
+        description=(
+            "The approximate memory budget (bytes) for the estimators kept in memory by each process "
+            "of the estimation pool, estimated from the size of the model files, None for no limit, "
+            "the estimator in use is always kept"
+        ),
+    )
+
+    pinned_estimators: list[str] = Field(
+        default=[],
+        description="Names of estimators that are never evicted from memory",
+    )
+
+    qp_dist_max_entries: int | None = Field(
+        default=None,
+        description="The maximum number of qp.Ensembles kept in memory, None for no limit",
+    )
+
+    qp_dist_max_bytes: int | None = Field(
+        default=1024**3,
+        description=(
+            "The approximate memory budget (bytes) for the qp.Ensembles kept in memory, None for no limit"
+        ),
+    )
+
+    row_max_entries: int | None = Field(
+        default=10_000,
+        description=(
+            "The maximum number of Algorithm, CatalogTag, Model and Estimator rows kept in memory, "
+            "None for no limit"
+        ),
+    )
+
+    row_ttl: float | None = Field(
+        default=60.0,
+        description=(
+            "Number of seconds Algorithm, CatalogTag, Model and Estimator rows are kept in memory, "
+            "which bounds how long changes made by other processes go unseen, None for no limit"
+        ),
+    )
+
 
 class Configuration(BaseSettings):
     """Configuration for pz-rail-service.
@@ -139,6 +293,7 @@ class Configuration(BaseSettings):
 
     # Nested Models
     asgi: AsgiConfiguration = AsgiConfiguration()
+    cache: CacheConfiguration = CacheConfiguration()
     daemon: DaemonConfiguration = DaemonConfiguration()
     db: DatabaseConfiguration = DatabaseConfiguration()
     logging: LoggingConfiguration = LoggingConfiguration()
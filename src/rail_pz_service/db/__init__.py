@@ -7,8 +7,10 @@ from .cache import Cache
 from .dataset import Dataset
 from .estimator import Estimator
 from .model import Model
+from .notify import RequestNotifier
 from .request import Request
 from .row import RowMixin
+from .row_cache import RowCache
 
 __all__ = [
     "Algorithm",
@@ -19,5 +21,7 @@ __all__ = [
     "Estimator",
     "Model",
     "Request",
+    "RequestNotifier",
+    "RowCache",
     "RowMixin",
 ]
@@ -19,6 +19,7 @@ class Algorithm(Base, RowMixin):
 
     __tablename__ = "algorithm"
     class_string = "algorithm"
+    cache_rows = True
 
     #: primary key
     id: Mapped[int] = mapped_column(primary_key=True)
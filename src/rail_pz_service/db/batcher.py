@@ -0,0 +1,180 @@
+"""Micro-batching of small in-memory estimates"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import numpy as np
+import qp
+
+from ..common.errors import RAILBadInputError
+from .executor import EstimationExecutor, EstimationJob, estimate_values
+
+
+class _Batch:
+    """Estimates waiting to be run together"""
+
+    def __init__(self, job: EstimationJob) -> None:
+        self.job = job
+        self.items: list[tuple[dict[str, np.ndarray], asyncio.Future[qp.Ensemble]]] = []
+        self.n_objects = 0
+        self.timer: asyncio.TimerHandle | None = None
+
+    def add(self, columns: dict[str, np.ndarray], n_objects: int) -> asyncio.Future[qp.Ensemble]:
+        """Add some objects to the batch, and return the future for their estimates"""
+        future: asyncio.Future[qp.Ensemble] = asyncio.get_running_loop().create_future()
+        self.items.append((columns, future))
+        self.n_objects += n_objects
+        return future
+
+
+class EstimateBatcher:
+    """Collects small estimates for the same estimator and
+    runs them as one vectorized call
+
+    A batch is run when it reaches `max_batch_size` objects, or `max_wait`
+    seconds after its first object arrived, whichever comes first.  An
+    estimate with `max_batch_size` objects or more is run on its own, and
+    one that would not fit in the pending batch starts a new batch.
+
+    Parameters
+    ----------
+    executor
+        Pool used to run the estimation
+
+    max_wait
+        Maximum time (seconds) to wait for more objects
+
+    max_batch_size
+        Maximum number of objects in a batch
+    """
+
+    def __init__(
+        self,
+        executor: EstimationExecutor,
+        max_wait: float = 0.01,
+        max_batch_size: int = 1024,
+    ) -> None:
+        self._executor = executor
+        self._max_wait = max_wait
+        self._max_batch_size = max(max_batch_size, 1)
+        self._pending: dict[tuple[int, tuple[str, ...]], _Batch] = {}
+        self._running: set[asyncio.Task] = set()
+        self._n_batches = 0
+
+    @property
+    def max_wait(self) -> float:
+        """Return the maximum time to wait for more objects"""
+        return self._max_wait
+
+    @property
+    def max_batch_size(self) -> int:
+        """Return the maximum number of objects in a batch"""
+        return self._max_batch_size
+
+    @property
+    def n_batches(self) -> int:
+        """Return the number of batches run so far"""
+        return self._n_batches
+
+    async def estimate(
+        self,
+        estimator_id: int,
+        data: dict[str, Any],
+        make_job: Callable[[], Awaitable[EstimationJob]],
+    ) -> qp.Ensemble:
+        """Get the estimate for one or a few objects
+
+        Parameters
+        ----------
+        estimator_id
+            DB id of the estimator to use
+
+        data
+            Input values, either one scalar per column for a single object
+            or one sequence per column, all with the same length
+
+        make_job
+            Called to describe the estimator if a new batch is needed
+
+        Returns
+        -------
+        qp.Ensemble
+            Ensemble with the estimates for these objects
+
+        Raises
+        ------
+        RAILBadInputError
+            Input values do not have a consistent shape
+        """
+        columns = {key: np.atleast_1d(np.asarray(value)) for key, value in data.items()}
+        lengths = {column.shape for column in columns.values()}
+        if len(lengths) != 1 or len(next(iter(lengths))) != 1:
+            raise RAILBadInputError(f"Expected one value or one list of values per column, got {lengths}")
+        n_objects = len(next(iter(columns.values())))
+
+        # Only objects with the same columns can be stacked together
+        batch_key = (estimator_id, tuple(sorted(columns.keys())))
+        batch = self._pending.get(batch_key)
+        job = batch.job if batch is not None else await make_job()
+
+        if n_objects >= self._max_batch_size:
+            # Big enough on its own, don't hold up a shared batch with it
+            batch = _Batch(job)
+            future = batch.add(columns, n_objects)
+            self._start(batch)
+            return await future
+
+        # Someone else might have started a batch while we were waiting
+        batch = self._pending.get(batch_key)
+        if batch is not None and batch.n_objects + n_objects > self._max_batch_size:
+            self._flush(batch_key)
+            batch = None
+        if batch is None:
+            batch = _Batch(job)
+            self._pending[batch_key] = batch
+            batch.timer = asyncio.get_running_loop().call_later(self._max_wait, self._flush, batch_key)
+
+        future = batch.add(columns, n_objects)
+        if batch.n_objects >= self._max_batch_size:
+            self._flush(batch_key)
+        return await future
+
+    def _flush(self, batch_key: tuple[int, tuple[str, ...]]) -> None:
+        batch = self._pending.pop(batch_key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        self._start(batch)
+
+    def _start(self, batch: _Batch) -> None:
+        self._n_batches += 1
+        task = asyncio.create_task(self._run_batch(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: _Batch) -> None:
+        columns = {
+            key: np.concatenate([item_columns[key] for item_columns, _future in batch.items]).tolist()
+            for key in batch.items[0][0]
+        }
+        job = batch.job.model_copy(update=dict(data=columns, n_objects=batch.n_objects))
+        try:
+            tables = await self._executor.run(estimate_values, job, affinity=job.estimator_id)
+            qp_dist = qp.from_tables(tables)
+        except Exception as failure:
+            for _columns, future in batch.items:
+                if not future.done():
+                    future.set_exception(failure)
+            return
+
+        # Scatter the results back to the callers
+        start = 0
+        for item_columns, future in batch.items:
+            stop = start + len(next(iter(item_columns.values())))
+            if not future.done():
+                future.set_result(qp_dist[start:stop])
+            start = stop
@@ -2,35 +2,64 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
 import shutil
+from collections.abc import Awaitable, Callable, Hashable, Sequence
 from datetime import datetime
 from pathlib import Path
+from typing import Any, TypeVar
 
+import numpy as np
 import qp
 import structlog
-from ceci.errors import StageNotFound
-from ceci.stage import PipelineStage
 from rail.core import RailEnv, RailStage
 from rail.estimation.estimator import CatEstimator
-from rail.interfaces.pz_factory import PZFactory
 from rail.utils.catalog_utils import CatalogConfigBase
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import async_scoped_session
 
+from .. import models
+from ..common.enums import RequestStatusEnum
 from ..common.errors import (
+    RAILBadDatasetError,
     RAILBadInputError,
+    RAILFileNotFoundError,
     RAILImportError,
     RAILIntegrityError,
+    RAILMissingRowCreateInputError,
     RAILRequestError,
+    RAILRequestNotDoneError,
 )
+from ..common.hashing import file_content_hash
 from ..config import config as global_config
 from .algorithm import Algorithm
+from .batcher import EstimateBatcher
 from .catalog_tag import CatalogTag
 from .dataset import Dataset
 from .estimator import Estimator
+from .executor import (
+    EstimationExecutor,
+    EstimationJob,
+    get_local_estimator,
+    load_algorithm_class,
+    load_catalog_tag_class,
+    load_estimator,
+    local_estimators,
+    plan_estimation_chunks,
+    read_qp_rows,
+    run_estimation_chunk,
+    run_estimation_job,
+    stitch_qp_files,
+)
+from .ingest import ingest_file, read_file_metadata
+from .lru import CacheStats, LRUCache
 from .model import Model
 from .request import Request
 
+T = TypeVar("T")
+
 
 class Cache:
     """Cache for objects created from specific DB rows"""
@@ -41,17 +70,26 @@ class Cache:
         self._logger = logger
         self._algorithms: dict[int, type[CatEstimator] | None] = {}
         self._catalog_tags: dict[int, type[CatalogConfigBase] | None] = {}
-        self._estimators: dict[int, CatEstimator | None] = {}
+        # Estimators built in this process, shared with the thread pool, if that is used
+        self._estimators: LRUCache[int, tuple[str, CatEstimator]] = local_estimators()
         self._qp_files: dict[int, str | None] = {}
-        self._qp_dists: dict[int, qp.Ensemble | None] = {}
+        # Keyed by Request.id, with the path and mtime of the file they were read from
+        self._qp_dists: LRUCache[int, tuple[tuple[str, int], qp.Ensemble]] = LRUCache(
+            max_entries=global_config.cache.qp_dist_max_entries,
+            max_bytes=global_config.cache.qp_dist_max_bytes,
+        )
+        self._executor: EstimationExecutor | None = None
+        self._batcher: EstimateBatcher | None = None
+        # Builds and runs currently in progress, keyed by (kind, key)
+        self._in_flight: dict[tuple[str, Hashable], asyncio.Future[Any]] = {}
 
     def clear(self) -> None:
         """Clear out the cache"""
         self._algorithms = {}
         self._catalog_tags = {}
-        self._estimators = {}
+        self._estimators.clear()
         self._qp_files = {}
-        self._qp_dists = {}
+        self._qp_dists.clear()
 
     @classmethod
     def shared_cache(cls, logger: structlog.BoundLogger) -> Cache:
@@ -59,6 +97,138 @@ class Cache:
             cls._shared_cache = Cache(logger)
         return cls._shared_cache
 
+    @property
+    def executor(self) -> EstimationExecutor:
+        """Return the pool used to run estimation, creating it if needed"""
+        if self._executor is None:
+            self._executor = EstimationExecutor(
+                executor_type=global_config.daemon.executor_type,
+                pool_size=global_config.daemon.executor_pool_size,
+            )
+        return self._executor
+
+    @property
+    def batcher(self) -> EstimateBatcher:
+        """Return the batcher used for single object estimates, creating it if needed"""
+        if self._batcher is None:
+            self._batcher = EstimateBatcher(
+                self.executor,
+                max_wait=global_config.daemon.batch_max_wait,
+                max_batch_size=global_config.daemon.batch_max_size,
+            )
+        return self._batcher
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        """Shut down the estimation pool
+
+        Parameters
+        ----------
+        wait
+            Wait for running estimations to finish
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+        self._batcher = None
+
+    def abort(self) -> None:
+        """Shut down the estimation pool, stopping the running estimations
+
+        This blocks until they are stopped, so call it off of the event loop
+        """
+        if self._executor is not None:
+            self._executor.abort()
+            self._executor = None
+        self._batcher = None
+
+    async def _single_flight(
+        self,
+        kind: str,
+        key: Hashable,
+        func: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Make sure that only one call to `func` is running per key
+
+        Callers arriving while a call is running wait for it and
+        share its result or exception.
+
+        Parameters
+        ----------
+        kind
+            Type of object being made, e.g., 'estimator'
+
+        key
+            Identifies the object, e.g., the DB id of the row in question
+
+        func
+            Coroutine function to make the object
+
+        Returns
+        -------
+        T
+            Whatever `func` returns
+        """
+        flight_key = (kind, key)
+        in_flight = self._in_flight.get(flight_key)
+        if in_flight is not None:
+            # Shield it, so that a cancelled caller does not cancel the others
+            return await asyncio.shield(in_flight)
+
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._in_flight[flight_key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.set_exception(RAILRequestError(f"Making {kind} {key} was cancelled"))
+            raise
+        except BaseException as failure:
+            future.set_exception(failure)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            # Nobody else may be waiting, don't complain about that
+            if future.done() and not future.cancelled():
+                future.exception()
+            self._in_flight.pop(flight_key, None)
+
+    @property
+    def estimator_stats(self) -> CacheStats:
+        """Return the hit, miss and eviction counters for the estimators
+        built in this process, see `EstimationExecutor.estimator_stats`
+        for the ones in the pool
+        """
+        return self._estimators.stats
+
+    @property
+    def qp_dist_stats(self) -> CacheStats:
+        """Return the hit, miss and eviction counters for the qp.Ensembles"""
+        return self._qp_dists.stats
+
+    def pin_estimator(self, key: int) -> None:
+        """Never evict a particular estimator from memory,
+        in this process or in the estimation pool
+
+        Parameters
+        ----------
+        key
+            DB id of the estimator in question
+        """
+        self._estimators.pin(key)
+        self.executor.pin_estimator(key)
+
+    def unpin_estimator(self, key: int) -> None:
+        """Allow a particular estimator to be evicted from memory again
+
+        Parameters
+        ----------
+        key
+            DB id of the estimator in question
+        """
+        self._estimators.unpin(key)
+        self.executor.unpin_estimator(key)
+
     def _load_algorithm_class(
         self,
         algorithm: Algorithm,
@@ -80,16 +250,7 @@ class Cache:
         RAILImportError
             Python class could not be loaded
         """
-        tokens = algorithm.class_name.split(".")
-        module_name = ".".join(tokens[0:-1])
-        class_name = tokens[-1]
-
-        try:
-            return PipelineStage.get_stage(class_name, module_name)
-        except StageNotFound as missing_stage:
-            raise RAILImportError(
-                f"Failed to load stage {algorithm.class_name} because {missing_stage}"
-            ) from missing_stage
+        return load_algorithm_class(algorithm.class_name)
 
     def _load_catalog_tag_class(
         self,
@@ -112,86 +273,257 @@ class Cache:
         RAILImportError
             Python class could not be loaded
         """
-        tokens = catalog_tag.class_name.split(".")
-        module_name = ".".join(tokens[0:-1])
-        class_name = tokens[-1]
-
-        try:
-            return CatalogConfigBase.get_class(class_name, module_name)
-        except KeyError as missing_key:
-            raise RAILImportError(
-                f"Failed to load catalog_tag {class_name} because {missing_key}"
-            ) from missing_key
-
-    async def _build_estimator(
+        return load_catalog_tag_class(catalog_tag.class_name)
+
+    @staticmethod
+    def _ensemble_size(qp_dist: qp.Ensemble) -> int:
+        """Approximate the memory used by a qp.Ensemble"""
+        data_dicts = [qp_dist.metadata(), qp_dist.objdata()]
+        if isinstance(qp_dist.ancil, dict):
+            data_dicts.append(qp_dist.ancil)
+        n_bytes = 0
+        for data_dict in data_dicts:
+            for value in data_dict.values():
+                n_bytes += getattr(value, "nbytes", 0)
+        return n_bytes
+
+    async def _build_estimator_job(
         self,
         session: async_scoped_session,
-        estimator: Estimator,
-    ) -> CatEstimator:
-        algo_class = await self.get_algo_class(session, estimator.algo_id)
-        catalog_tag_class = await self.get_catalog_tag_class(session, estimator.catalog_tag_id)
-        CatalogConfigBase.apply(catalog_tag_class.tag)
+        estimator_id: int,
+    ) -> EstimationJob:
+        estimator = await Estimator.get_row(session, estimator_id)
         model = await Model.get_row(session, estimator.model_id)
-        if estimator.config is None:
-            the_config = {}
-        else:
-            the_config = estimator.config.copy()
-
-        estimator_instance = PZFactory.build_stage_instance(
-            estimator.name,
-            algo_class,
-            model.path,
-            **the_config,
+        algo = await Algorithm.get_row(session, estimator.algo_id)
+        catalog_tag = await CatalogTag.get_row(session, estimator.catalog_tag_id)
+
+        return EstimationJob(
+            estimator_id=estimator.id,
+            estimator_name=estimator.name,
+            algo_class_name=algo.class_name,
+            catalog_tag_class_name=catalog_tag.class_name,
+            model_path=model.path,
+            config=estimator.config or {},
+            chunk_size=estimator.chunk_size,
         )
-        return estimator_instance
 
-    async def _process_request(
+    async def _request_output_path(
         self,
         session: async_scoped_session,
         request: Request,
     ) -> str:
+        """Return where the output file of a request goes"""
         estimator = await Estimator.get_row(session, request.estimator_id)
-        estimator_instance = await self.get_estimator(session, request.estimator_id)
         dataset = await Dataset.get_row(session, request.dataset_id)
-
         output_path = os.path.join(
             global_config.storage.archive,
             "qp_files",
             dataset.name,
             f"{estimator.name}.hdf5",
         )
+        return os.path.abspath(output_path)
 
-        aliased_tag = estimator_instance.get_aliased_tag("output")
-        estimator_instance._outputs[aliased_tag] = os.path.abspath(output_path)  # pylint: disable=protected-access
+    async def _build_estimation_job(
+        self,
+        session: async_scoped_session,
+        request: Request,
+    ) -> EstimationJob:
+        job = await self._build_estimator_job(session, request.estimator_id)
+        dataset = await Dataset.get_row(session, request.dataset_id)
 
-        if dataset.path is not None:
-            result_handle = PZFactory.run_cat_estimator_stage(estimator_instance, dataset.path)
-        else:
-            _data_out = PZFactory.estimate_single_pz(
-                estimator_instance,
-                dataset.data,
-                dataset.n_objects,
+        return job.model_copy(
+            update=dict(
+                output_path=await self._request_output_path(session, request),
+                dataset_path=dataset.path,
+                data=dataset.data,
+                n_objects=dataset.n_objects,
+                group_lengths=(dataset.file_metadata or {}).get("group_lengths", {}),
             )
-            result_handle = estimator_instance.get_handle("output")
-            result_handle.write()
-            estimator_instance.finalize()
+        )
 
-        aliased_tag = estimator_instance.get_aliased_tag("output")
-        final_name = estimator_instance.get_output(aliased_tag, final_name=True)
+    async def _run_with_estimator(
+        self,
+        func: Callable[[EstimationJob], T],
+        job: EstimationJob,
+        *,
+        spread: bool = False,
+        wait_on_cancel: bool = False,
+    ) -> T:
+        """Run a job in the pool, on a lane where its estimator is loaded
 
-        if not os.path.exists(result_handle.path):
-            raise RuntimeError(f"Output files {output_path}, not created")
+        If the estimator is not loaded in that lane yet it is loaded first,
+        concurrent callers needing it in the same lane share that load.
+
+        Parameters
+        ----------
+        func
+            Function to run on the job
+
+        job
+            Description of the job
+
+        spread
+            Use the least busy lane, rather than the lane of the estimator
+
+        wait_on_cancel
+            Passed to `EstimationExecutor.run`
+
+        Returns
+        -------
+        T
+            Whatever `func` returns
+        """
+        lane = self.executor.lane_for(None if spread else job.estimator_id)
+        if not self.executor.has_estimator(job.estimator_id, lane):
+            await self._single_flight(
+                "estimator",
+                (job.estimator_id, lane),
+                lambda: self.executor.run(load_estimator, job, lane=lane),
+            )
+        return await self.executor.run(func, job, lane=lane, wait_on_cancel=wait_on_cancel)
+
+    async def _run_chunked(
+        self,
+        job: EstimationJob,
+    ) -> str:
+        """Run an estimation job in chunks spread over the pool,
+        then stitch the chunk outputs into the final file
+        """
+        ranges = await self._run_with_estimator(plan_estimation_chunks, job)
+        if len(ranges) <= 1:
+            return await self._run_with_estimator(run_estimation_job, job)
+
+        assert job.output_path is not None
+        chunk_dir = f"{job.output_path}.chunks"
+        await asyncio.to_thread(os.makedirs, chunk_dir, exist_ok=True)
+        n_done = 0
+
+        async def _run_chunk(i: int, start: int, stop: int) -> tuple[str, int, int]:
+            nonlocal n_done
+            chunk_job = job.model_copy(
+                update=dict(
+                    start=start,
+                    stop=stop,
+                    output_path=os.path.join(chunk_dir, f"chunk_{i:06d}.hdf5"),
+                )
+            )
+            # Spread the chunks over all the processes
+            chunk_path = await self._run_with_estimator(
+                run_estimation_chunk,
+                chunk_job,
+                spread=True,
+                wait_on_cancel=True,
+            )
+            n_done += 1
+            if self._logger:
+                self._logger.info(f"Estimator {job.estimator_name}: {n_done} of {len(ranges)} chunks done")
+            return chunk_path, start, stop
+
+        chunk_tasks = [
+            asyncio.create_task(_run_chunk(i, start, stop)) for i, (start, stop) in enumerate(ranges)
+        ]
+        try:
+            chunk_files = await asyncio.gather(*chunk_tasks)
+            return await self.executor.run(
+                stitch_qp_files,
+                list(chunk_files),
+                job.output_path,
+                affinity=job.estimator_id,
+            )
+        finally:
+            # If a chunk failed, stop the others, and wait for the ones
+            # that are still writing before removing their directory
+            for chunk_task in chunk_tasks:
+                chunk_task.cancel()
+            await asyncio.gather(*chunk_tasks, return_exceptions=True)
+            await asyncio.to_thread(shutil.rmtree, chunk_dir, ignore_errors=True)
+
+    async def _run_batched(
+        self,
+        job: EstimationJob,
+    ) -> str:
+        """Run an estimation job on input values together with the other
+        small estimates for the same estimator, then write the output file
+        """
+        if job.data is None or job.output_path is None:
+            raise RAILRequestError(f"Estimator {job.estimator_name} needs input values and an output path")
+        output_path = job.output_path
+
+        async def _make_job() -> EstimationJob:
+            # The batch only needs to know about the estimator
+            return job.model_copy(update=dict(output_path=None, data=None))
+
+        qp_dist = await self.batcher.estimate(job.estimator_id, job.data, _make_job)
+
+        def _write() -> None:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            qp_dist.write_to(output_path)
+
+        await asyncio.to_thread(_write)
+        return output_path
+
+    async def _run_estimation(
+        self,
+        session: async_scoped_session,
+        request: Request,
+    ) -> str:
+        job = await self._build_estimation_job(session, request)
+
+        if job.chunk_size and job.dataset_path is not None:
+            return await self._run_chunked(job)
+
+        if job.dataset_path is None:
+            return await self._run_batched(job)
+
+        # Run the estimation in the pool, so that we don't block the event loop,
+        # and on the same process as other requests for this estimator
+        return await self._run_with_estimator(run_estimation_job, job)
+
+    async def _process_request(
+        self,
+        session: async_scoped_session,
+        request: Request,
+    ) -> str:
+        output_path = await self._request_output_path(session, request)
+
+        # The same data might already have been run through the same estimator
+        computed_path = await Request.find_computed_output(session, request.dataset_id, request.estimator_id)
+        if computed_path is not None:
+            if self._logger:
+                self._logger.info(f"Request {request.id}: reusing existing output {computed_path}")
+            if computed_path != output_path:
+                # Give this request its own link to the file, so that it
+                # does not go away with the other request's output
+                await asyncio.to_thread(os.makedirs, os.path.dirname(output_path), exist_ok=True)
+                await asyncio.to_thread(
+                    ingest_file,
+                    computed_path,
+                    output_path,
+                    block_size=global_config.storage.ingest_block_size,
+                )
+            final_name = output_path
+        else:
+            # Estimators write the file in place, so first break any link
+            # with the output of another request
+            await asyncio.to_thread(Path(output_path).unlink, missing_ok=True)
+            final_name = await self._run_estimation(session, request)
+
+        # Record the checksum now, so downloads are validated without reading the file
+        qp_file_checksum = await asyncio.to_thread(file_content_hash, final_name)
 
         now = datetime.now()
         await request.update_values(
             session,
             qp_file_path=final_name,
+            qp_file_checksum=qp_file_checksum,
+            status=RequestStatusEnum.done,
             time_finished=now,
         )
         await session.commit()
         self._qp_files[request.id] = final_name
+        self._qp_dists.pop(request.id)
 
-        return result_handle.path
+        return final_name
 
     async def get_algo_class(
         self,
@@ -285,6 +617,9 @@ class Cache:
     ) -> CatEstimator:
         """Get a particular CatEstimator
 
+        The estimator is built in this process, estimation itself runs
+        with the estimators built in the pool.
+
         Parameters
         ----------
         session
@@ -306,29 +641,31 @@ class Cache:
         RAILMissingIDError
             ID not found in database
         """
+        job = await self._build_estimator_job(session, key)
 
-        estimator = self._estimators.get(key)
-        if estimator is not None:
-            return estimator
-
-        estimator_ = await Estimator.get_row(session, key)
-        try:
-            estimator = await self._build_estimator(session, estimator_)
-            self._estimators[key] = estimator
-        except RAILImportError as failed_import:
-            # Set the value to None, allowing to retry later
-            self._estimators[key] = None
-            raise RAILImportError(f"Import of Estimator failed because {failed_import}") from failed_import
+        async def _make_estimator() -> CatEstimator:
+            try:
+                return await asyncio.to_thread(get_local_estimator, job)
+            except RAILImportError as failed_import:
+                # Nothing is cached, allowing to retry later
+                raise RAILImportError(
+                    f"Import of Estimator failed because {failed_import}"
+                ) from failed_import
 
-        return estimator
+        # None for this process, rather than a lane of the pool
+        return await self._single_flight("estimator", (key, None), _make_estimator)
 
     async def get_qp_file(
         self,
         session: async_scoped_session,
         key: int,
+        worker_id: str | None = None,
     ) -> str:
         """Get the output file from a particular request
 
+        If the file does not exist yet, this runs the request, unless
+        someone else is already running it.
+
         Parameters
         ----------
         session
@@ -337,6 +674,9 @@ class Cache:
         key
             DB id of the requestion in question
 
+        worker_id
+            Id of the worker that claimed the request, if any
+
         Returns
         -------
         str
@@ -345,29 +685,69 @@ class Cache:
         Raises
         ------
         RAILRequestError
-            Requsts failed for some reason
+            Requsts failed for some reason, or is already running
         """
 
+        # A worker has to see the request through, even if we already know the file
         qp_file = self._qp_files.get(key)
-        if qp_file is not None:
+        if qp_file is not None and worker_id is None:
             return qp_file
 
-        request_ = await Request.get_row(session, key)
+        async def _make_qp_file() -> str:
+            request_ = await Request.get_row(session, key)
+            claimed = (
+                worker_id is not None
+                and request_.status == RequestStatusEnum.running
+                and request_.worker_id == worker_id
+            )
 
-        if request_.qp_file_path is not None:
-            if os.path.exists(request_.qp_file_path):
-                self._qp_files[key] = request_.qp_file_path
-                return request_.qp_file_path
+            if request_.qp_file_path is not None:
+                if await asyncio.to_thread(os.path.exists, request_.qp_file_path):
+                    if claimed:
+                        # Nothing to run, but the claim still has to be closed
+                        await request_.update_values(
+                            session,
+                            status=RequestStatusEnum.done,
+                            time_finished=datetime.now(),
+                        )
+                        await session.commit()
+                    self._qp_files[key] = request_.qp_file_path
+                    return request_.qp_file_path
+
+            if not claimed:
+                if not await Request.start_request(session, key):
+                    raise RAILRequestError(f"Request {key} is already running")
+                await session.commit()
 
-        try:
-            qp_file = await self._process_request(session, request_)
-            self._qp_files[key] = qp_file
-        except RAILRequestError as failed_request:
-            # Set the value to None, allowing to retry later
-            self._qp_files[key] = None
-            raise RAILRequestError(f"Request failed because {failed_request}") from failed_request
+            try:
+                qp_file = await self._process_request(session, request_)
+                self._qp_files[key] = qp_file
+            except RAILRequestError as failed_request:
+                await self._request_failed(session, key)
+                raise RAILRequestError(f"Request failed because {failed_request}") from failed_request
+            except Exception:
+                await self._request_failed(session, key)
+                raise
+            return qp_file
 
-        return qp_file
+        # Concurrent callers share a single run, rather than racing on the output file
+        return await self._single_flight("qp_file", key, _make_qp_file)
+
+    async def _request_failed(
+        self,
+        session: async_scoped_session,
+        key: int,
+    ) -> None:
+        # Set the value to None, allowing to retry later
+        self._qp_files[key] = None
+        await session.rollback()
+        await Request.update_row(
+            session,
+            key,
+            status=RequestStatusEnum.failed,
+            time_finished=datetime.now(),
+        )
+        await session.commit()
 
     async def get_qp_dist(
         self,
@@ -394,14 +774,136 @@ class Cache:
         RAILRequestError
             Requsts failed for some reason
         """
+        request_ = await Request.get_row(session, key)
+        if request_.qp_file_path is not None and request_.qp_file_path != self._qp_files.get(key):
+            # The output was moved or re-made, forget what we had
+            self._qp_files.pop(key, None)
+
         qp_file = await self.get_qp_file(session, key)
 
+        try:
+            file_signature = (qp_file, os.stat(qp_file).st_mtime_ns)
+        except OSError as failed_stat:
+            raise RAILRequestError(f"Request failed because {failed_stat}") from failed_stat
+
+        cached = self._qp_dists.get(key)
+        if cached is not None and cached[0] == file_signature:
+            return cached[1]
+
         try:
             qp_dist = qp.read(qp_file)
         except Exception as failed_read:
+            self._qp_dists.pop(key)
             raise RAILRequestError(f"Request failed because {failed_read}") from failed_read
+        self._qp_dists.put(key, (file_signature, qp_dist), self._ensemble_size(qp_dist))
         return qp_dist
 
+    async def get_qp_rows(
+        self,
+        session: async_scoped_session,
+        key: int,
+        start: int | None = None,
+        stop: int | None = None,
+        indices: list[int] | None = None,
+        max_rows: int | None = None,
+    ) -> tuple[np.ndarray, qp.Ensemble]:
+        """Get some of the rows of the qp.Ensemble from a particular request
+
+        Unlike `get_qp_dist` this only reads the requested rows from the file,
+        and does not keep them in memory.  It also never runs the request.
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        key
+            DB id of the requestion in question
+
+        start
+            First row to read, defaults to the first row
+
+        stop
+            One past the last row to read, defaults to the last row
+
+        indices
+            Specific rows to read, overrides `start` and `stop`
+
+        max_rows
+            Maximum number of rows to read, None for no limit
+
+        Returns
+        -------
+        tuple[np.ndarray, qp.Ensemble]
+            Indices of the rows read and the ensemble with those rows
+
+        Raises
+        ------
+        RAILBadInputError
+            Rows out of range or too many rows requested
+
+        RAILRequestError
+            Requsts failed for some reason
+
+        RAILRequestNotDoneError
+            Request has not been run yet
+        """
+        request_ = await Request.get_row(session, key)
+        qp_file = request_.qp_file_path
+        if request_.status != RequestStatusEnum.done or qp_file is None:
+            raise RAILRequestNotDoneError(f"Request {key} is {request_.status.name}, its output is not ready")
+        self._qp_files[key] = qp_file
+
+        try:
+            return await asyncio.to_thread(read_qp_rows, qp_file, start, stop, indices, max_rows)
+        except RAILBadInputError:
+            raise
+        except Exception as failed_read:
+            raise RAILRequestError(f"Request failed because {failed_read}") from failed_read
+
+    async def estimate_values(
+        self,
+        session: async_scoped_session,
+        estimator_id: int,
+        data: dict[str, Any],
+    ) -> qp.Ensemble:
+        """Get the p(z) estimates for one or a few objects, without making
+        any Dataset or Request rows or files
+
+        Concurrent calls for the same estimator are batched together
+        and run as a single vectorized estimate.
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        estimator_id
+            DB id of the estimator to use
+
+        data
+            Input values, either one scalar per column for a single object
+            or one sequence per column, all with the same length
+
+        Returns
+        -------
+        qp.Ensemble
+            Ensemble with the estimates for these objects
+
+        Raises
+        ------
+        RAILBadInputError
+            Input values do not have a consistent shape
+
+        RAILMissingIDError
+            ID not found in database
+        """
+        return await self.batcher.estimate(
+            estimator_id,
+            data,
+            lambda: self._build_estimator_job(session, estimator_id),
+        )
+
     async def load_algorithms_from_rail_env(
         self,
         session: async_scoped_session,
@@ -515,6 +1017,56 @@ class Cache:
 
         return catalog_tags_
 
+    async def _ingest_file(
+        self,
+        path: Path | str,
+        output_abspath: str,
+        checksum: str | None = None,
+    ) -> str:
+        """Put a file in the archive area, off of the event loop
+
+        Returns the operation used, to pass to `_release_ingested_file`
+        """
+        os.makedirs(os.path.dirname(output_abspath), exist_ok=True)
+        method = await asyncio.to_thread(
+            ingest_file,
+            path,
+            output_abspath,
+            strategy=global_config.storage.ingest_strategy,
+            checksum=checksum,
+            block_size=global_config.storage.ingest_block_size,
+        )
+        if self._logger:
+            self._logger.info(f"Ingested {path} to {output_abspath} using {method}")
+        return method
+
+    @staticmethod
+    def _release_ingested_file(
+        path: Path | str,
+        output_abspath: str,
+        method: str,
+    ) -> None:
+        """Undo `_ingest_file`, putting a moved file back where it came from"""
+        if method == "move":
+            shutil.move(output_abspath, path)
+        else:
+            os.unlink(output_abspath)
+
+    @staticmethod
+    def _dataset_archive_path(
+        name: str,
+        path: Path | str,
+        catalog_tag_name: str,
+    ) -> str:
+        """Return the path a dataset file is put at in the archive area"""
+        suffix = os.path.splitext(path)[1]
+        return os.path.join(
+            global_config.storage.archive,
+            "datasets",
+            catalog_tag_name,
+            f"{name}{suffix}",
+        )
+
     async def load_model_from_file(
         self,
         session: async_scoped_session,
@@ -522,6 +1074,7 @@ class Cache:
         path: Path,
         algo_name: str,
         catalog_tag_name: str,
+        checksum: str | None = None,
     ) -> Model:
         """Import a model file to the archive area and add a Model
 
@@ -534,7 +1087,8 @@ class Cache:
             Name for new Model
 
         path
-            Path to input file.  Note that it will be copied to DB area
+            Path to input file.  Note that it will be put in the DB area
+            according to `config.storage.ingest_strategy`
 
         algo_name
             Name of Algorithm that uses the model
@@ -542,6 +1096,10 @@ class Cache:
         catalog_tag_name
             Name of CatalogTag that described contents of file
 
+        checksum
+            sha256 hex digest of the file, if it was already computed
+            while writing it, e.g., when streaming an upload
+
         Returns
         -------
         Model
@@ -579,7 +1137,11 @@ class Cache:
         catalog_tag = await CatalogTag.get_row_by_name(session, catalog_tag_name)
         algo = await Algorithm.get_row_by_name(session, algo_name)
 
-        Model.validate_model(path, algo, catalog_tag)
+        # Reading the model and hashing it can take a while for large files,
+        # so keep both off of the event loop
+        await asyncio.to_thread(Model.validate_model, path, algo, catalog_tag)
+        if checksum is None:
+            checksum = await asyncio.to_thread(file_content_hash, path)
 
         # File looks ok, move it to the archive area
         suffix = os.path.splitext(path)[1]
@@ -591,9 +1153,7 @@ class Cache:
             f"{name}{suffix}",
         )
         output_abspath = os.path.abspath(output_name)
-        output_dir = os.path.dirname(output_abspath)
-        os.makedirs(output_dir, exist_ok=True)
-        shutil.copy(path, output_abspath)
+        method = await self._ingest_file(path, output_abspath, checksum=checksum)
 
         # Make a new Model row
         try:
@@ -601,6 +1161,8 @@ class Cache:
                 session,
                 name=name,
                 path=output_name,
+                content_hash=checksum,
+                validate_file=False,
                 algo_id=algo.id,
                 catalog_tag_id=catalog_tag.id,
             )
@@ -612,7 +1174,7 @@ class Cache:
                 self._logger.warn(msg_str)
             else:
                 print(msg_str)
-            os.unlink(output_abspath)
+            self._release_ingested_file(path, output_abspath, method)
             raise RAILIntegrityError(msg) from msg
 
     async def load_dataset_from_file(
@@ -622,6 +1184,8 @@ class Cache:
         path: Path,
         catalog_tag_name: str,
         data: dict | None = None,
+        checksum: str | None = None,
+        file_metadata: models.FileMetadata | None = None,
     ) -> Dataset:
         """Import a data file to the archive area and add a Dataset row
 
@@ -634,11 +1198,20 @@ class Cache:
             Name for new Dataset
 
         path
-            Path to input file.  Note that it will be copied to DB area
+            Path to input file.  Note that it will be put in the DB area
+            according to `config.storage.ingest_strategy`
 
         catalog_tag_name
             Name of CatalogTag that described contents of file
 
+        checksum
+            sha256 hex digest of the file, if it was already computed
+            while writing it, e.g., when streaming an upload
+
+        file_metadata
+            Description of the file, if it was already read, e.g., to
+            validate an upload
+
         Returns
         -------
         Dataset
@@ -676,29 +1249,25 @@ class Cache:
 
         # Validate the input file
         catalog_tag = await CatalogTag.get_row_by_name(session, catalog_tag_name)
-        n_objects = Dataset.validate_data_for_path(path, catalog_tag)
+        # Read everything we need to know about the file in one go,
+        # off of the event loop, so that it does not need to be opened again
+        if file_metadata is None:
+            file_metadata = await asyncio.to_thread(read_file_metadata, str(path), checksum)
 
         # File looks ok, move it to the archive area
-        suffix = os.path.splitext(path)[1]
-        output_name = os.path.join(
-            global_config.storage.archive,
-            "datasets",
-            catalog_tag_name,
-            f"{name}{suffix}",
-        )
+        output_name = self._dataset_archive_path(name, path, catalog_tag_name)
         output_abspath = os.path.abspath(output_name)
-        output_dir = os.path.dirname(output_abspath)
-        os.makedirs(output_dir, exist_ok=True)
-        shutil.copy(path, output_abspath)
+        method = await self._ingest_file(path, output_abspath, checksum=file_metadata.checksum)
 
         # Make a new Dataset row
         try:
             new_dataset = await Dataset.create_row(
                 session,
                 name=name,
-                n_objects=n_objects,
                 path=output_name,
                 data=None,
+                file_metadata=file_metadata,
+                validate_file=False,
                 catalog_tag_id=catalog_tag.id,
             )
             await session.refresh(new_dataset)
@@ -709,7 +1278,7 @@ class Cache:
                 self._logger.warn(msg_str)
             else:
                 print(msg_str)
-            os.unlink(output_abspath)
+            self._release_ingested_file(path, output_abspath, method)
             raise RAILIntegrityError(msg) from msg
 
     async def load_dataset_from_values(
@@ -800,12 +1369,124 @@ class Cache:
                 print(msg_str)
             raise RAILIntegrityError(msg) from msg
 
+    async def load_datasets(
+        self,
+        session: async_scoped_session,
+        queries: Sequence[dict[str, Any]],
+    ) -> tuple[list[tuple[int, Dataset]], list[tuple[int, str]]]:
+        """Add many Datasets at once, from files or from values
+
+        The CatalogTag and existing Dataset names are looked up with one
+        query each, and all the valid items are inserted in a single
+        transaction.  Items that can not be loaded are reported rather
+        than failing the whole batch.
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        queries
+            Parameters for each new Dataset, as for `load_dataset_from_file`
+            if `path` is set, or `load_dataset_from_values` otherwise
+
+        Returns
+        -------
+        tuple[list[tuple[int, Dataset]], list[tuple[int, str]]]
+            Index in `queries` and newly created row for the loaded datasets,
+            index in `queries` and reason for the others
+
+        Raises
+        ------
+        RAILIntegrityError
+            Insert failed, e.g., because of a concurrent insert of a dataset
+            with the same name, nothing was loaded
+        """
+        catalog_tags_ = await CatalogTag.get_rows_by_name(
+            session, [query["catalog_tag_name"] for query in queries]
+        )
+        names = [query["name"] for query in queries]
+        existing = set((await session.scalars(select(Dataset.name).where(Dataset.name.in_(names)))).all())
+
+        errors: list[tuple[int, str]] = []
+        to_create: list[tuple[int, Dataset]] = []
+        ingested: list[tuple[Path | str, str, str]] = []
+        # Whatever goes wrong, do not leave the files already moved in the archive
+        try:
+            for idx, query in enumerate(queries):
+                name, path, data = query["name"], query.get("path"), query.get("data")
+                catalog_tag_ = catalog_tags_.get(query["catalog_tag_name"])
+                if catalog_tag_ is None:
+                    errors.append((idx, f"CatalogTag {query['catalog_tag_name']} not found"))
+                    continue
+                if name in existing:
+                    errors.append((idx, f"Dataset {name} already exists"))
+                    continue
+                try:
+                    if path is not None:
+                        if data is not None:
+                            raise RAILBadInputError("Only one of path and data should be set")
+                        file_metadata = await asyncio.to_thread(read_file_metadata, str(path))
+                        output_name = self._dataset_archive_path(name, path, catalog_tag_.name)
+                        create_kwargs = await Dataset.get_create_kwargs(
+                            session,
+                            name=name,
+                            path=output_name,
+                            data=None,
+                            file_metadata=file_metadata,
+                            validate_file=False,
+                            catalog_tag_id=catalog_tag_.id,
+                        )
+                        output_abspath = os.path.abspath(output_name)
+                        method = await self._ingest_file(
+                            path, output_abspath, checksum=file_metadata.checksum
+                        )
+                        ingested.append((path, output_abspath, method))
+                    else:
+                        create_kwargs = await Dataset.get_create_kwargs(
+                            session,
+                            name=name,
+                            path=None,
+                            data=data,
+                            catalog_tag_id=catalog_tag_.id,
+                        )
+                except (
+                    RAILBadDatasetError,
+                    RAILBadInputError,
+                    RAILFileNotFoundError,
+                    RAILMissingRowCreateInputError,
+                ) as msg:
+                    errors.append((idx, str(msg)))
+                    continue
+                existing.add(name)
+                to_create.append((idx, Dataset(**create_kwargs)))
+
+            if to_create:
+                try:
+                    async with session.begin_nested():
+                        session.add_all([row for _, row in to_create])
+                except IntegrityError as msg:
+                    raise RAILIntegrityError(msg) from msg
+        except BaseException as msg:
+            if ingested:
+                msg_str = f"Dataset ingest failed: removing {len(ingested)} files: {str(msg)}"
+                if self._logger:
+                    self._logger.warn(msg_str)
+                else:
+                    print(msg_str)
+                for path, output_abspath, method in ingested:
+                    self._release_ingested_file(path, output_abspath, method)
+            raise
+
+        return to_create, errors
+
     async def load_estimator(
         self,
         session: async_scoped_session,
         name: str,
         model_name: str,
         config: dict | None = None,
+        chunk_size: int | None = None,
     ) -> Estimator:
         """Create a new Estimator
 
@@ -823,6 +1504,10 @@ class Cache:
         config
             Extra paraemeters to use when running estimator
 
+        chunk_size
+            Number of rows per chunk when running on large files,
+            None to run files as one unit
+
         Returns
         -------
         Estimator
@@ -858,6 +1543,7 @@ class Cache:
                 name=name,
                 model_id=model.id,
                 config=config,
+                chunk_size=chunk_size,
             )
             await session.refresh(new_estimator)
             return new_estimator
@@ -915,6 +1601,7 @@ class Cache:
         self,
         session: async_scoped_session,
         request_id: int,
+        worker_id: str | None = None,
     ) -> Request:
         """Run a request
 
@@ -926,6 +1613,9 @@ class Cache:
         request_id
             Id of the request in the Request table
 
+        worker_id
+            Id of the worker that claimed the request, if any
+
         Returns
         -------
         Request
@@ -951,5 +1641,7 @@ class Cache:
 
         """
         request_ = await Request.get_row(session, request_id)
-        await self.get_qp_file(session, request_.id)
+        await self.get_qp_file(session, request_.id, worker_id=worker_id)
+        # The request might have been run by another caller using another session
+        await session.refresh(request_)
         return request_
@@ -20,6 +20,7 @@ class CatalogTag(Base, RowMixin):
 
     __tablename__ = "catalog_tag"
     class_string = "catalog_tag"
+    cache_rows = True
 
     #: primary key
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -64,38 +64,32 @@ get_requests = wrappers.get_row_attribute_list_command(get_command, DbClass, "re
 @group_command(name="run")
 @admin_options.db_engine()
 @common_options.data()
-@common_options.catalog_tag_name()
 @common_options.estimator_name()
-@common_options.output()
+@common_options.filename()
 def run(
     db_engine: Callable[[], AsyncEngine],
     data: dict,
-    catalog_tag_name: str,
     estimator_name: str,
-    output: common_options.OutputEnum | None,
+    filename: str | None,
 ) -> None:
-    """Create a dataset and in using a particular esimator"""
+    """Run a particular estimator on some values, without making a dataset
+
+    The estimate is written to a qp file, by default named after the estimator
+    """
 
     async def _the_func() -> None:
         engine = db_engine()
         session = await create_async_session(engine)
         the_cache = db.cache.Cache()
-        name = str(uuid.uuid1())
-        dataset = await the_cache.load_dataset_from_values(
-            session,
-            name=name,
-            data=data,
-            catalog_tag_name=catalog_tag_name,
-        )
-        the_request = await the_cache.create_request(
-            session,
-            dataset_name=dataset.name,
-            estimator_name=estimator_name,
-        )
-        check_request = await the_cache.run_request(session, request_id=the_request.id)
-        wrappers.output_db_object(check_request, output, db.Request.col_names_for_table)
-        await session.commit()
-        await session.remove()
-        await engine.dispose()
+        try:
+            estimator = await db.Estimator.get_row_by_name(session, estimator_name)
+            qp_dist = await the_cache.estimate_values(session, estimator.id, data)
+            output_path = filename if filename is not None else f"{estimator_name}_{uuid.uuid1()}.hdf5"
+            qp_dist.write_to(output_path)
+            click.echo(output_path)
+        finally:
+            the_cache.shutdown()
+            await session.remove()
+            await engine.dispose()
 
     asyncio.run(_the_func())
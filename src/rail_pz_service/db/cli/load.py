@@ -144,12 +144,14 @@ def model_command(
 @common_options.name()
 @common_options.model_name()
 @common_options.config()
+@common_options.chunk_size()
 @common_options.output()
 def estimator_command(
     db_engine: Callable[[], AsyncEngine],
     name: str,
     model_name: str,
     config: dict | None,
+    chunk_size: int | None,
     output: common_options.OutputEnum | None,
 ) -> None:
     """Load CatalogTags from RailEnv"""
@@ -163,6 +165,7 @@ def estimator_command(
             name,
             model_name=model_name,
             config=config,
+            chunk_size=chunk_size,
         )
         wrappers.output_db_object(new_estimator, output, db.Estimator.col_names_for_table)
         await session.remove()
@@ -1,10 +1,8 @@
 """Database model for Dataset table"""
 
-import os
-from pathlib import Path
+import asyncio
 from typing import TYPE_CHECKING, Any
 
-import tables_io
 from sqlalchemy import JSON
 from sqlalchemy.ext.asyncio import async_scoped_session
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -13,11 +11,12 @@ from sqlalchemy.schema import ForeignKey
 from .. import models
 from ..common.errors import (
     RAILBadDatasetError,
-    RAILFileNotFoundError,
     RAILMissingRowCreateInputError,
 )
+from ..common.hashing import values_content_hash
 from .base import Base
 from .catalog_tag import CatalogTag
+from .ingest import read_file_metadata
 from .row import RowMixin
 
 if TYPE_CHECKING:
@@ -46,6 +45,12 @@ class Dataset(Base, RowMixin):
     #: Data for the dataset (could be None)
     data: Mapped[dict | None] = mapped_column(type_=JSON)
 
+    #: Hash of the contents of the file or data, used to reuse outputs
+    content_hash: Mapped[str | None] = mapped_column(index=True, default=None)
+
+    #: Description of the file, recorded at ingest (could be None)
+    file_metadata: Mapped[dict | None] = mapped_column(type_=JSON, default=None)
+
     #: foreign key into catalog_tag table
     catalog_tag_id: Mapped[int] = mapped_column(
         ForeignKey("catalog_tag.id", ondelete="CASCADE"),
@@ -98,13 +103,25 @@ class Dataset(Base, RowMixin):
         else:
             catalog_tag_ = await CatalogTag.get_row(session, catalog_tag_id)
 
+        content_hash = kwargs.get("content_hash", None)
+        file_metadata = kwargs.get("file_metadata", None)
+        if isinstance(file_metadata, models.FileMetadata):
+            file_metadata = file_metadata.model_dump()
         if path is not None:
-            if validate_file:
-                n_objects = cls.validate_data_for_path(path, catalog_tag_)
+            if validate_file and file_metadata is None:
+                # Hashing and scanning a large file can take a while
+                read_metadata = await asyncio.to_thread(read_file_metadata, str(path))
+                file_metadata = read_metadata.model_dump()
+            if file_metadata is not None:
+                n_objects = file_metadata["n_objects"]
+                if content_hash is None:
+                    content_hash = file_metadata["checksum"]
             else:
                 n_objects = kwargs.get("n_objects", 1)
         elif data is not None:
             n_objects, data = cls.validate_data(data, catalog_tag_)
+            if content_hash is None:
+                content_hash = values_content_hash(data)
         else:
             raise RAILMissingRowCreateInputError(
                 "When creating a Dataset either 'path' to a file must be set or "
@@ -116,39 +133,11 @@ class Dataset(Base, RowMixin):
             path=path,
             n_objects=n_objects,
             data=data,
+            content_hash=content_hash,
+            file_metadata=file_metadata,
             catalog_tag_id=catalog_tag_id,
         )
 
-    @classmethod
-    def validate_data_for_path(
-        cls,
-        path: Path,
-        catalog_tag: CatalogTag,
-    ) -> int:
-        """Validate that these data are appropriate for the CatalogTag
-
-        Parameters
-        ----------
-        path
-            File with the data
-
-        catalog_tag
-            CatalogTag in question
-
-        Returns
-        -------
-        int
-            Size of the datset
-        """
-        assert catalog_tag
-        if not os.path.exists(path):
-            raise RAILFileNotFoundError(f"Input file {path} not found")
-        try:
-            n_objects = tables_io.io.getInputDataLength(path)
-        except Exception as msg:
-            raise RAILBadDatasetError(f"Could not read data from {path} because {msg}") from msg
-        return n_objects
-
     @classmethod
     def validate_data(
         cls,
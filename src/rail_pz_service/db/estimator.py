@@ -1,5 +1,7 @@
 """Database model for Estimator table"""
 
+import asyncio
+import os
 from typing import TYPE_CHECKING, Any
 
 from sqlalchemy import JSON
@@ -9,6 +11,7 @@ from sqlalchemy.schema import ForeignKey
 
 from .. import models
 from ..common.errors import RAILMissingRowCreateInputError
+from ..common.hashing import file_content_hash, values_content_hash
 from .algorithm import Algorithm
 from .base import Base
 from .catalog_tag import CatalogTag
@@ -25,6 +28,7 @@ class Estimator(Base, RowMixin):
 
     __tablename__ = "estimator"
     class_string = "estimator"
+    cache_rows = True
 
     #: primary key
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -53,6 +57,12 @@ class Estimator(Base, RowMixin):
     #: Configuration parameters for this estimator
     config: Mapped[dict | None] = mapped_column(type_=JSON)
 
+    #: Rows per chunk when running on large files, None to run files as one unit
+    chunk_size: Mapped[int | None] = mapped_column(default=None)
+
+    #: Hash of the configuration and model, used to reuse outputs
+    content_hash: Mapped[str | None] = mapped_column(index=True, default=None)
+
     #: Access to associated `Algorithm`
     algo_: Mapped["Algorithm"] = relationship(
         "Algorithm",
@@ -110,10 +120,80 @@ class Estimator(Base, RowMixin):
         else:
             model_ = await Model.get_row(session, model_id)
 
+        algo_ = await Algorithm.get_row(session, model_.algo_id)
+        catalog_tag_ = await CatalogTag.get_row(session, model_.catalog_tag_id)
+
         return dict(
             name=name,
             config=config,
+            chunk_size=kwargs.get("chunk_size", None),
+            content_hash=await cls.compute_content_hash(algo_, catalog_tag_, model_, config),
             algo_id=model_.algo_id,
             catalog_tag_id=model_.catalog_tag_id,
             model_id=model_id,
         )
+
+    @classmethod
+    async def _update_hook(
+        cls,
+        session: async_scoped_session,
+        row: Any,
+    ) -> None:
+        # The hash follows the configuration, otherwise outputs computed
+        # with the old configuration would be reused
+        model_ = await Model.get_row(session, row.model_id)
+        algo_ = await Algorithm.get_row(session, model_.algo_id)
+        catalog_tag_ = await CatalogTag.get_row(session, model_.catalog_tag_id)
+        row.content_hash = await cls.compute_content_hash(algo_, catalog_tag_, model_, row.config)
+        await super()._update_hook(session, row)
+
+    @classmethod
+    async def compute_content_hash(
+        cls,
+        algo: Algorithm,
+        catalog_tag: CatalogTag,
+        model: Model,
+        config: dict | None,
+    ) -> str | None:
+        """Compute the hash that identifies what this estimator computes
+
+        The names of the rows do not enter, so two Estimators built from
+        the same model file with the same configuration get the same hash.
+        The `chunk_size` does not enter either, as it does not change the
+        results.
+
+        If the Model has no recorded hash, the model file is hashed
+        off of the event loop.
+
+        Parameters
+        ----------
+        algo
+            Algorithm the estimator runs
+
+        catalog_tag
+            CatalogTag the estimator expects
+
+        model
+            Model the estimator uses
+
+        config
+            Configuration overrides
+
+        Returns
+        -------
+        str | None
+            Hex digest, None if the model file is not available
+        """
+        model_hash = model.content_hash
+        if model_hash is None:
+            if not await asyncio.to_thread(os.path.exists, model.path):
+                return None
+            model_hash = await asyncio.to_thread(file_content_hash, model.path)
+        return values_content_hash(
+            dict(
+                algo_class_name=algo.class_name,
+                catalog_tag_class_name=catalog_tag.class_name,
+                model_hash=model_hash,
+                config=config or {},
+            )
+        )
@@ -0,0 +1,986 @@
+"""Executors to run RAIL estimation off of the asyncio event loop"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, suppress
+from multiprocessing.sharedctypes import Synchronized
+from typing import Any
+
+import h5py
+import numpy as np
+import pyarrow.parquet as pq
+import qp
+import tables_io
+from ceci.errors import StageNotFound
+from ceci.stage import PipelineStage
+from pydantic import BaseModel
+from rail.estimation.estimator import CatEstimator
+from rail.interfaces.pz_factory import PZFactory
+from rail.utils.catalog_utils import CatalogConfigBase
+
+from ..common.errors import (
+    RAILBadInputError,
+    RAILImportError,
+    RAILRequestError,
+)
+from ..config import config as global_config
+from .ingest import HDF5_SUFFIXES, PARQUET_SUFFIXES
+from .lru import CacheStats, LRUCache
+
+EXECUTOR_TYPES = ["process", "thread"]
+
+# RAIL keeps the DataStore as global state, so we only allow one
+# estimation at a time per process.  In the process pool each worker process
+# has its own lock, in the thread pool this serializes the threads, so that
+# only one estimation runs at a time no matter the size of the thread pool.
+_rail_lock = threading.Lock()
+
+# Estimators built in this process, keyed by Estimator.id.  Each process
+# of the process pool has its own, with the budget given by the executor.
+_local_estimators: LRUCache[int, tuple[str, CatEstimator]] = LRUCache(
+    max_entries=global_config.cache.estimator_max_entries,
+    max_bytes=global_config.cache.estimator_max_bytes,
+)
+
+# Estimators pinned through EstimationExecutor.pin_estimator, rather than
+# by name in the configuration
+_executor_pins: set[int] = set()
+_pins_lock = threading.Lock()
+
+
+class EstimationJob(BaseModel):
+    """Everything needed to run an `Estimator` on a `Dataset`
+    without access to the database
+    """
+
+    #: Id of the Estimator, used to cache the built estimator
+    estimator_id: int
+
+    #: Name of the Estimator, used to name the RAIL stage
+    estimator_name: str
+
+    #: Full python class name of the CatEstimator
+    algo_class_name: str
+
+    #: Full python class name of the CatalogConfigBase
+    catalog_tag_class_name: str
+
+    #: Path to the model file
+    model_path: str
+
+    #: Configuration overrides for the estimator
+    config: dict = {}
+
+    #: Path to write the output qp file to (could be None)
+    output_path: str | None = None
+
+    #: Path to the input data file (could be None)
+    dataset_path: str | None = None
+
+    #: Input data values (could be None)
+    data: dict | None = None
+
+    #: Number of objects in the input data
+    n_objects: int = 1
+
+    #: Number of rows per chunk for input files, None to run the file as one unit
+    chunk_size: int | None = None
+
+    #: Number of rows in each table of the input file, from the ingest metadata
+    group_lengths: dict[str, int] = {}
+
+    #: First row of the input file to run on (could be None)
+    start: int | None = None
+
+    #: One past the last row of the input file to run on (could be None)
+    stop: int | None = None
+
+    def signature(self) -> str:
+        """Return a string identifying how the estimator was built"""
+        return json.dumps(
+            [self.algo_class_name, self.catalog_tag_class_name, self.model_path, self.config],
+            sort_keys=True,
+            default=str,
+        )
+
+
+def load_algorithm_class(class_name: str) -> type[CatEstimator]:
+    """Load a CatEstimator class from its full python name
+
+    Parameters
+    ----------
+    class_name
+        Full name of the class, including the module
+
+    Returns
+    -------
+    type[CatEstimator]
+        Sub-class of CatEstimator
+
+    Raises
+    ------
+    RAILImportError
+        Python class could not be loaded
+    """
+    tokens = class_name.split(".")
+    module_name = ".".join(tokens[0:-1])
+    try:
+        return PipelineStage.get_stage(tokens[-1], module_name)
+    except (StageNotFound, ImportError) as missing_stage:
+        raise RAILImportError(f"Failed to load stage {class_name} because {missing_stage}") from missing_stage
+
+
+def load_catalog_tag_class(class_name: str) -> type[CatalogConfigBase]:
+    """Load a CatalogConfigBase class from its full python name
+
+    Parameters
+    ----------
+    class_name
+        Full name of the class, including the module
+
+    Returns
+    -------
+    type[CatalogConfigBase]
+        Sub-class of CatalogConfigBase
+
+    Raises
+    ------
+    RAILImportError
+        Python class could not be loaded
+    """
+    tokens = class_name.split(".")
+    module_name = ".".join(tokens[0:-1])
+    try:
+        return CatalogConfigBase.get_class(tokens[-1], module_name)
+    except (KeyError, ImportError) as missing_key:
+        raise RAILImportError(
+            f"Failed to load catalog_tag {tokens[-1]} because {missing_key}"
+        ) from missing_key
+
+
+def build_estimator_instance(
+    name: str,
+    algo_class: type[CatEstimator],
+    catalog_tag_class: type[CatalogConfigBase],
+    model_path: str,
+    config: dict | None = None,
+) -> CatEstimator:
+    """Build a CatEstimator configured for a particular CatalogTag
+
+    Parameters
+    ----------
+    name
+        Name for the RAIL stage
+
+    algo_class
+        CatEstimator sub-class to build
+
+    catalog_tag_class
+        CatalogConfigBase used to set the default column names
+
+    model_path
+        Path to the model file
+
+    config
+        Configuration overrides for the estimator
+
+    Returns
+    -------
+    CatEstimator
+        Newly built estimator
+    """
+    CatalogConfigBase.apply(catalog_tag_class.tag)
+    the_config = {} if config is None else config.copy()
+    return PZFactory.build_stage_instance(
+        name,
+        algo_class,
+        model_path,
+        **the_config,
+    )
+
+
+def model_file_size(model_path: str) -> int:
+    """Estimate the memory used by an estimator from its model file
+
+    Parameters
+    ----------
+    model_path
+        Path to the model file
+
+    Returns
+    -------
+    int
+        Size of the model file in bytes, 0 if it can not be found
+    """
+    try:
+        return os.path.getsize(model_path)
+    except OSError:
+        return 0
+
+
+def _get_local_estimator(job: EstimationJob) -> CatEstimator:
+    signature = job.signature()
+    cached = _local_estimators.get(job.estimator_id)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    estimator_instance = build_estimator_instance(
+        job.estimator_name,
+        load_algorithm_class(job.algo_class_name),
+        load_catalog_tag_class(job.catalog_tag_class_name),
+        job.model_path,
+        job.config,
+    )
+    if job.estimator_name in global_config.cache.pinned_estimators:
+        _local_estimators.pin(job.estimator_id)
+    _local_estimators.put(
+        job.estimator_id,
+        (signature, estimator_instance),
+        model_file_size(job.model_path),
+    )
+    return estimator_instance
+
+
+def get_local_estimator(job: EstimationJob) -> CatEstimator:
+    """Get the estimator of a job, building it in this process if needed
+
+    The estimators built in this process are the ones the thread pool uses.
+    This blocks while the model loads, so call it off of the event loop.
+
+    Parameters
+    ----------
+    job
+        Description of the job, only the estimator fields are used
+
+    Returns
+    -------
+    CatEstimator
+        Estimator in question
+
+    Raises
+    ------
+    RAILImportError
+        Python classes could not be loaded
+    """
+    with _rail_lock:
+        return _get_local_estimator(job)
+
+
+def load_estimator(job: EstimationJob) -> None:
+    """Load the estimator of a job in the process that runs this,
+    so that the jobs that follow find it there
+
+    Parameters
+    ----------
+    job
+        Description of the job, only the estimator fields are used
+    """
+    get_local_estimator(job)
+
+
+def local_estimators() -> LRUCache[int, tuple[str, CatEstimator]]:
+    """Return the estimators kept in this process, with how they were built"""
+    return _local_estimators
+
+
+def _init_local_estimators(
+    max_entries: int | None,
+    max_bytes: int | None,
+) -> None:
+    """Give a pool process its estimator memory budget"""
+    global _local_estimators  # pylint: disable=global-statement
+    _local_estimators = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+
+def _init_lane(
+    lane_pid: Synchronized,
+    max_entries: int | None,
+    max_bytes: int | None,
+) -> None:
+    """Set up the process of a pool lane, and report its pid to the executor"""
+    lane_pid.value = os.getpid()
+    _init_local_estimators(max_entries, max_bytes)
+
+
+def _sync_pins(pinned: frozenset[int]) -> None:
+    """Make the pins of this process match those of the executor"""
+    with _pins_lock:
+        for key in _executor_pins - pinned:
+            _local_estimators.unpin(key)
+        for key in pinned - _executor_pins:
+            _local_estimators.pin(key)
+        _executor_pins.clear()
+        _executor_pins.update(pinned)
+
+
+def _run_in_lane(
+    pinned: frozenset[int],
+    func: Callable,
+    *args: Any,
+) -> tuple[Any, CacheStats, frozenset[int]]:
+    """Run a function in a pool lane, and report on the estimators kept there"""
+    _sync_pins(pinned)
+    result = func(*args)
+    return result, _local_estimators.stats, frozenset(_local_estimators.keys())
+
+
+@contextmanager
+def _in_memory_output(estimator_instance: CatEstimator) -> Iterator[CatEstimator]:
+    """Keep the estimator output in memory, rather than writing a file"""
+    output_mode = estimator_instance.config.output_mode
+    estimator_instance.config.output_mode = "return"
+    try:
+        yield estimator_instance
+    finally:
+        estimator_instance.config.output_mode = output_mode
+
+
+def run_estimation_job(job: EstimationJob) -> str:
+    """Run an estimation job, this is what runs inside the pool
+
+    Parameters
+    ----------
+    job
+        Description of the job to run
+
+    Returns
+    -------
+    str
+        Path to the output qp file
+
+    Raises
+    ------
+    RAILImportError
+        Python classes could not be loaded
+
+    RAILRequestError
+        Output file was not created
+    """
+    if job.output_path is None:
+        raise RAILRequestError(f"No output path given for estimator {job.estimator_name}")
+
+    with _rail_lock:
+        estimator_instance = _get_local_estimator(job)
+
+        aliased_tag = estimator_instance.get_aliased_tag("output")
+        estimator_instance._outputs[aliased_tag] = os.path.abspath(job.output_path)  # pylint: disable=protected-access
+
+        if job.dataset_path is not None:
+            result_handle = PZFactory.run_cat_estimator_stage(estimator_instance, job.dataset_path)
+        else:
+            PZFactory.estimate_single_pz(
+                estimator_instance,
+                job.data,
+                job.n_objects,
+            )
+            result_handle = estimator_instance.get_handle("output")
+            result_handle.write()
+            estimator_instance.finalize()
+
+        final_name = estimator_instance.get_output(aliased_tag, final_name=True)
+
+        if not os.path.exists(result_handle.path):
+            raise RAILRequestError(f"Output file {job.output_path} not created")
+
+    return final_name
+
+
+def estimate_values(job: EstimationJob) -> dict:
+    """Run an estimator on input values without writing any files
+
+    Parameters
+    ----------
+    job
+        Description of the job to run, `data` should map
+        column names to lists with `n_objects` values each
+
+    Returns
+    -------
+    dict
+        qp.Ensemble as tables, i.e., from `qp.Ensemble.build_tables`
+    """
+    if job.data is None:
+        raise RAILRequestError(f"No input data given for estimator {job.estimator_name}")
+
+    data_table = {key: np.asarray(value) for key, value in job.data.items()}
+    with _rail_lock:
+        with _in_memory_output(_get_local_estimator(job)) as estimator_instance:
+            qp_dist = PZFactory.estimate_single_pz(
+                estimator_instance,
+                data_table,
+                job.n_objects,
+            )
+        return qp_dist.build_tables()
+
+
+def input_data_length(path: str, groupname: str | None = None) -> int:
+    """Get the number of rows in an input file
+
+    Parameters
+    ----------
+    path
+        Path to the input file
+
+    groupname
+        For hdf5 files, the group with the data
+
+    Returns
+    -------
+    int
+        Number of rows
+    """
+    if path.endswith(PARQUET_SUFFIXES):
+        return pq.ParquetFile(path).metadata.num_rows
+    group, infp = tables_io.ioUtils.readHdf5Group(path, groupname)
+    try:
+        return tables_io.ioUtils.getGroupInputDataLength(group)
+    finally:
+        infp.close()
+
+
+def read_input_chunk(
+    path: str,
+    start: int,
+    stop: int,
+    groupname: str | None = None,
+) -> dict[str, np.ndarray]:
+    """Read a range of rows from an input file
+
+    Parameters
+    ----------
+    path
+        Path to the input file
+
+    start
+        First row to read
+
+    stop
+        One past the last row to read
+
+    groupname
+        For hdf5 files, the group with the data
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        Input data, one array per column
+    """
+    if path.endswith(PARQUET_SUFFIXES):
+        parquet_file = pq.ParquetFile(path)
+        # Only read the row groups that overlap the range
+        row_groups: list[int] = []
+        first_row = 0
+        offset = 0
+        for i in range(parquet_file.num_row_groups):
+            n_rows = parquet_file.metadata.row_group(i).num_rows
+            if offset + n_rows > start and offset < stop:
+                if not row_groups:
+                    first_row = offset
+                row_groups.append(i)
+            offset += n_rows
+        table = parquet_file.read_row_groups(row_groups).slice(start - first_row, stop - start)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+
+    group, infp = tables_io.ioUtils.readHdf5Group(path, groupname)
+    try:
+        return {key: tables_io.ioUtils.readHdf5DatasetToArray(val, start, stop) for key, val in group.items()}
+    finally:
+        infp.close()
+
+
+def plan_estimation_chunks(job: EstimationJob) -> list[tuple[int, int]]:
+    """Split the input file of a job in row ranges of `job.chunk_size` rows
+
+    Parameters
+    ----------
+    job
+        Description of the job to split
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        Start and stop row of each chunk
+    """
+    if job.dataset_path is None or not job.chunk_size:
+        raise RAILRequestError(f"Estimator {job.estimator_name} can not run in chunks without a file")
+
+    with _rail_lock:
+        estimator_instance = _get_local_estimator(job)
+        groupname = estimator_instance.config.hdf5_groupname
+
+    # Use the row count recorded at ingest, rather than re-opening the file
+    n_rows = job.group_lengths.get(groupname or "")
+    if n_rows is None:
+        n_rows = input_data_length(job.dataset_path, groupname)
+    return [(start, min(start + job.chunk_size, n_rows)) for start in range(0, n_rows, job.chunk_size)]
+
+
+def run_estimation_chunk(job: EstimationJob) -> str:
+    """Run an estimation job on a range of rows of its input file
+
+    Parameters
+    ----------
+    job
+        Description of the job to run, with `start` and `stop` set
+
+    Returns
+    -------
+    str
+        Path to the qp file for this chunk
+    """
+    if job.dataset_path is None or job.start is None or job.stop is None or job.output_path is None:
+        raise RAILRequestError(f"Chunk for estimator {job.estimator_name} is not fully specified")
+
+    with _rail_lock:
+        with _in_memory_output(_get_local_estimator(job)) as estimator_instance:
+            data = read_input_chunk(
+                job.dataset_path,
+                job.start,
+                job.stop,
+                estimator_instance.config.hdf5_groupname,
+            )
+            qp_dist = PZFactory.estimate_single_pz(
+                estimator_instance,
+                data,
+                job.stop - job.start,
+            )
+
+    qp_dist.write_to(job.output_path)
+    return job.output_path
+
+
+def stitch_qp_files(
+    chunk_files: list[tuple[str, int, int]],
+    output_path: str,
+) -> str:
+    """Write the qp files from several chunks into a single file
+
+    Only one chunk is held in memory at a time.
+
+    Parameters
+    ----------
+    chunk_files
+        Path, start and stop row of each chunk, in order
+
+    output_path
+        Path to the final qp file
+
+    Returns
+    -------
+    str
+        Path to the final qp file
+    """
+    if not chunk_files:
+        raise RAILRequestError(f"No chunks to write to {output_path}")
+
+    first_dist = qp.read(chunk_files[0][0])
+    group, fout = first_dist.initializeHdf5Write(output_path, chunk_files[-1][2])
+    for i, (chunk_path, start, stop) in enumerate(chunk_files):
+        chunk_dist = first_dist if i == 0 else qp.read(chunk_path)
+        chunk_dist.writeHdf5Chunk(group, start, stop)
+    first_dist.finalizeHdf5Write(fout)
+    return output_path
+
+
+def _select_rows(
+    n_rows: int,
+    start: int | None,
+    stop: int | None,
+    indices: list[int] | None,
+    max_rows: int | None,
+) -> np.ndarray:
+    """Turn a row range or a list of indices into an array of rows, checking bounds"""
+    if indices is not None:
+        rows = np.asarray(indices, dtype=np.int64)
+        if rows.size and (rows.min() < 0 or rows.max() >= n_rows):
+            raise RAILBadInputError(f"Row indices out of range, the file has {n_rows} rows")
+    else:
+        first = 0 if start is None else start
+        last = n_rows if stop is None else min(stop, n_rows)
+        if first < 0 or first >= last:
+            raise RAILBadInputError(f"Bad row range [{start}, {stop}), the file has {n_rows} rows")
+        rows = np.arange(first, last)
+    if not rows.size:
+        raise RAILBadInputError("No rows requested")
+    if max_rows is not None and rows.size > max_rows:
+        raise RAILBadInputError(f"Too many rows {rows.size} > {max_rows}, download the file instead")
+    return rows
+
+
+def read_qp_rows(
+    path: str,
+    start: int | None = None,
+    stop: int | None = None,
+    indices: list[int] | None = None,
+    max_rows: int | None = None,
+) -> tuple[np.ndarray, qp.Ensemble]:
+    """Read some of the rows of a qp file
+
+    For hdf5 files only the requested rows are read from the file,
+    other formats are read in full and then sliced.
+
+    Parameters
+    ----------
+    path
+        Path to the qp file
+
+    start
+        First row to read, defaults to the start of the file
+
+    stop
+        One past the last row to read, defaults to the end of the file
+
+    indices
+        Specific rows to read, in the order they should be returned,
+        overrides `start` and `stop`
+
+    max_rows
+        Maximum number of rows to read, None for no limit
+
+    Returns
+    -------
+    tuple[np.ndarray, qp.Ensemble]
+        Indices of the rows read and the ensemble with those rows
+
+    Raises
+    ------
+    RAILBadInputError
+        Rows out of range or too many rows requested
+    """
+    if not path.endswith(HDF5_SUFFIXES):
+        qp_dist = qp.read(path)
+        rows = _select_rows(qp_dist.npdf, start, stop, indices, max_rows)
+        return rows, qp_dist[rows]
+
+    with h5py.File(path, "r") as hdf5_file:
+        data_group = hdf5_file["data"]
+        n_rows = len(next(iter(data_group.values())))
+        rows = _select_rows(n_rows, start, stop, indices, max_rows)
+        if indices is None:
+            selection: slice | np.ndarray = slice(int(rows[0]), int(rows[-1]) + 1)
+            reorder: np.ndarray | slice = slice(None)
+        else:
+            # h5py only reads strictly increasing indices
+            selection, reorder = np.unique(rows, return_inverse=True)
+        tables: dict[str, dict[str, np.ndarray]] = dict(
+            meta={key: val[()] for key, val in hdf5_file["meta"].items()},
+        )
+        for group_name in ("data", "ancil"):
+            if group_name in hdf5_file:
+                tables[group_name] = {
+                    key: val[selection][reorder] for key, val in hdf5_file[group_name].items()
+                }
+    return rows, qp.from_tables(tables)
+
+
+class EstimationExecutor:
+    """Pool of processes or threads used to run estimation jobs
+
+    The process pool is made of `pool_size` single-process lanes.  Jobs
+    with the same affinity (i.e., the same Estimator) are routed to the same
+    lane, so that they find a warm estimator instance there instead of
+    re-loading the model in another process.  If that lane is busy, jobs
+    only spill over to an idle lane that already has the Estimator, or that
+    has room for it without evicting another one.
+    Threads share the estimators, so the thread pool is a single pool.
+    RAIL keeps global state, so the threads take turns running estimations:
+    the thread pool keeps the event loop free but runs one job at a time, use
+    the process pool to run jobs in parallel.
+
+    Each process keeps its own estimators, within the per process estimator
+    memory budget in `config.cache`, and the hits, misses and pins of the
+    estimators are tracked here across all of them.
+
+    The pools are created on first use, so that simply building a `Cache`
+    does not start any processes.
+    """
+
+    def __init__(
+        self,
+        executor_type: str = "process",
+        pool_size: int | None = None,
+    ) -> None:
+        if executor_type not in EXECUTOR_TYPES:
+            raise ValueError(f"Unknown executor_type {executor_type}, expected one of {EXECUTOR_TYPES}")
+        self._executor_type = executor_type
+        self._pool_size = pool_size if pool_size else os.cpu_count() or 1
+        self._n_lanes = self._pool_size if executor_type == "process" else 1
+        self._lanes: list[Executor | None] = [None] * self._n_lanes
+        # Pid of the process of each lane, set once that process has started
+        self._lane_pids: list[Synchronized | None] = [None] * self._n_lanes
+        self._lane_loads: list[int] = [0] * self._n_lanes
+        self._lane_max_entries = global_config.cache.estimator_max_entries
+        self._lane_max_bytes = global_config.cache.estimator_max_bytes
+        # Only remember as many Estimators as the lanes keep warm
+        self._affinity: LRUCache[int, int] = LRUCache(
+            max_entries=None if self._lane_max_entries is None else self._lane_max_entries * self._n_lanes,
+        )
+        # Estimator cache counters and estimators of each lane, as of its last job
+        self._lane_stats: list[CacheStats] = [CacheStats() for _ in range(self._n_lanes)]
+        self._lane_estimators: list[frozenset[int]] = [frozenset()] * self._n_lanes
+        self._pinned: set[int] = set()
+
+    @property
+    def executor_type(self) -> str:
+        """Return the type of pool, 'process' or 'thread'"""
+        return self._executor_type
+
+    @property
+    def pool_size(self) -> int:
+        """Return the number of workers in the pool"""
+        return self._pool_size
+
+    @property
+    def estimator_stats(self) -> CacheStats:
+        """Return the counters for the estimators kept in the pool,
+        summed over the lanes as of the last job each one ran
+        """
+        return CacheStats(
+            hits=sum(stats.hits for stats in self._lane_stats),
+            misses=sum(stats.misses for stats in self._lane_stats),
+            evictions=sum(stats.evictions for stats in self._lane_stats),
+            n_entries=sum(stats.n_entries for stats in self._lane_stats),
+            n_bytes=sum(stats.n_bytes for stats in self._lane_stats),
+        )
+
+    def has_estimator(self, key: int, lane: int) -> bool:
+        """Return True if a lane had a particular estimator loaded
+        as of the last job it ran
+
+        Parameters
+        ----------
+        key
+            DB id of the estimator in question
+
+        lane
+            Index of the lane, as returned by `lane_for`
+        """
+        return key in self._lane_estimators[lane]
+
+    def pin_estimator(self, key: int) -> None:
+        """Never evict a particular estimator from memory
+
+        This takes effect in each lane with the next job it runs.
+
+        Parameters
+        ----------
+        key
+            DB id of the estimator in question
+        """
+        self._pinned.add(key)
+
+    def unpin_estimator(self, key: int) -> None:
+        """Allow a particular estimator to be evicted from memory again
+
+        This takes effect in each lane with the next job it runs.
+
+        Parameters
+        ----------
+        key
+            DB id of the estimator in question
+        """
+        self._pinned.discard(key)
+
+    def _make_lane(self, lane: int) -> Executor:
+        if self._executor_type == "process":
+            # Use 'spawn' so that the workers do not inherit the
+            # event loop and DB connections of the parent
+            mp_context = multiprocessing.get_context("spawn")
+            lane_pid = mp_context.Value("i", 0)
+            self._lane_pids[lane] = lane_pid
+            return ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=mp_context,
+                initializer=_init_lane,
+                initargs=(lane_pid, self._lane_max_entries, self._lane_max_bytes),
+            )
+        return ThreadPoolExecutor(
+            max_workers=self._pool_size,
+            thread_name_prefix="rail-estimation",
+        )
+
+    def lane_for(self, affinity: int | None = None) -> int:
+        """Return the lane that a job should run on
+
+        Parameters
+        ----------
+        affinity
+            Jobs with the same affinity run on the same lane,
+            None to use the least busy lane
+
+        Returns
+        -------
+        int
+            Index of the lane
+        """
+        least_busy = min(range(self._n_lanes), key=lambda i: self._lane_loads[i])
+        if affinity is None:
+            return least_busy
+        lane = self._affinity.get(affinity)
+        if lane is None:
+            self._affinity.put(affinity, least_busy)
+            return least_busy
+        if self._lane_loads[lane] > 0:
+            # Use an idle lane rather than wait, preferably one that already
+            # has the estimator, as long as that does not push another
+            # estimator out of it
+            idle_lanes = [i for i in range(self._n_lanes) if self._lane_loads[i] == 0]
+            for idle_lane in idle_lanes:
+                if self.has_estimator(affinity, idle_lane):
+                    return idle_lane
+            for idle_lane in idle_lanes:
+                if self._has_room(idle_lane):
+                    return idle_lane
+        return lane
+
+    def _has_room(self, lane: int) -> bool:
+        """Return True if a lane can load another estimator without evicting one"""
+        stats = self._lane_stats[lane]
+        if self._lane_max_entries is not None and stats.n_entries >= self._lane_max_entries:
+            return False
+        if self._lane_max_bytes is not None and stats.n_bytes >= self._lane_max_bytes:
+            return False
+        return True
+
+    def _get_lane(self, lane: int) -> Executor:
+        pool = self._lanes[lane]
+        if pool is None:
+            pool = self._make_lane(lane)
+            self._lanes[lane] = pool
+        return pool
+
+    async def run(
+        self,
+        func: Callable,
+        *args: Any,
+        affinity: int | None = None,
+        lane: int | None = None,
+        wait_on_cancel: bool = False,
+    ) -> Any:
+        """Run a function in the pool without blocking the event loop
+
+        Parameters
+        ----------
+        func
+            Function to run, must be picklable for the process pool
+
+        *args
+            Arguments to pass to the function
+
+        affinity
+            Calls with the same affinity run in the same process
+
+        lane
+            Lane to run on, as returned by `lane_for`, rather than
+            picking one from `affinity`
+
+        wait_on_cancel
+            If the call is cancelled after the function has started,
+            wait for it to finish before re-raising, e.g., so that the
+            caller can safely clean up the files it writes
+
+        Returns
+        -------
+        Any
+            Whatever the function returns
+
+        Raises
+        ------
+        RAILRequestError
+            A pool worker process died while running the function
+        """
+        if lane is None:
+            lane = self.lane_for(affinity)
+        self._lane_loads[lane] += 1
+        pool = self._get_lane(lane)
+        try:
+            future = pool.submit(_run_in_lane, frozenset(self._pinned), func, *args)
+            try:
+                result, stats, estimators = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # Cancelling only stops the function if it has not started yet
+                if wait_on_cancel and not future.cancelled():
+                    await asyncio.wait([asyncio.wrap_future(future)])
+                raise
+            self._lane_stats[lane] = stats
+            self._lane_estimators[lane] = estimators
+            return result
+        except BrokenProcessPool as msg:
+            # Drop the broken lane, we will make a new one on the next call,
+            # unless abort already replaced it
+            if self._lanes[lane] is pool:
+                self._shutdown_lane(lane, wait=False)
+            raise RAILRequestError(f"Estimation worker process failed: {msg}") from msg
+        finally:
+            self._lane_loads[lane] -= 1
+
+    def _shutdown_lane(self, lane: int, *, wait: bool) -> None:
+        pool = self._lanes[lane]
+        if pool is None:
+            return
+        pool.shutdown(wait=wait, cancel_futures=not wait)
+        self._lanes[lane] = None
+        self._lane_pids[lane] = None
+        self._lane_stats[lane] = CacheStats()
+        self._lane_estimators[lane] = frozenset()
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        """Shut down the pool, if it was started
+
+        Parameters
+        ----------
+        wait
+            Wait for running jobs to finish
+        """
+        for lane in range(self._n_lanes):
+            self._shutdown_lane(lane, wait=wait)
+        self._affinity.clear()
+
+    def abort(self, timeout: float | None = None) -> None:
+        """Stop the jobs that are still running, and replace the pool lanes
+
+        Cancelling the task awaiting `run` leaves the job itself running in
+        the pool, this makes sure it is gone, e.g., before its request is
+        given to someone else.  The queued jobs of each lane are cancelled,
+        the process of the lane is terminated to stop the job it is running,
+        and a new lane takes its place.  Threads can not be stopped, so the
+        thread pool is waited for instead.
+
+        This blocks, so call it off of the event loop.
+
+        Parameters
+        ----------
+        timeout
+            Maximum time (seconds) to wait for each lane to shut down
+        """
+        if self._executor_type == "thread":
+            self.shutdown(wait=True)
+            return
+        stopping: list[threading.Thread] = []
+        for lane, pool in enumerate(self._lanes):
+            if pool is None:
+                continue
+            lane_pid = self._lane_pids[lane]
+            pool.shutdown(wait=False, cancel_futures=True)
+            if lane_pid is not None and lane_pid.value:
+                with suppress(ProcessLookupError):
+                    os.kill(lane_pid.value, signal.SIGTERM)
+            # The pool notices that its process is gone and finishes shutting down
+            waiter = threading.Thread(target=pool.shutdown, daemon=True)
+            waiter.start()
+            stopping.append(waiter)
+            self._lanes[lane] = self._make_lane(lane)
+            self._lane_stats[lane] = CacheStats()
+            self._lane_estimators[lane] = frozenset()
+        for waiter in stopping:
+            waiter.join(timeout)
+        self._affinity.clear()
@@ -0,0 +1,265 @@
+"""Functions to describe files and bring them into the archive area"""
+
+from __future__ import annotations
+
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+
+import h5py
+import pyarrow.parquet as pq
+import tables_io
+
+from .. import models
+from ..common.errors import RAILBadDatasetError, RAILChecksumError, RAILFileNotFoundError
+from ..common.hashing import file_content_hash
+
+INGEST_STRATEGIES = ["auto", "move", "hardlink", "reflink", "copy"]
+
+PARQUET_SUFFIXES = (".pq", ".parquet")
+
+HDF5_SUFFIXES = (".hdf5", ".h5", ".hdf")
+
+# From linux/fs.h, clone the extents of one file into another
+_FICLONE = 0x40049409
+
+
+def _hardlink(source: str, dest: str) -> None:
+    os.link(source, dest)
+
+
+def _reflink(source: str, dest: str) -> None:
+    with open(source, "rb") as fin, open(dest, "wb") as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+        except OSError:
+            fout.close()
+            os.unlink(dest)
+            raise
+
+
+def _move(source: str, dest: str) -> None:
+    # Only a rename, moving across filesystems is a copy
+    os.rename(source, dest)
+
+
+def copy_file(
+    source: str,
+    dest: str,
+    checksum: str | None = None,
+    block_size: int = 8 * 1024 * 1024,
+) -> str:
+    """Copy a file in blocks, computing its checksum on the way
+
+    Parameters
+    ----------
+    source
+        File to copy
+
+    dest
+        Where to copy it to
+
+    checksum
+        Expected sha256 hex digest, None to skip the check
+
+    block_size
+        Number of bytes to read at a time
+
+    Returns
+    -------
+    str
+        sha256 hex digest of the copied bytes
+
+    Raises
+    ------
+    RAILChecksumError
+        The copy does not match the expected checksum, it is removed
+    """
+    digest = hashlib.sha256()
+    with open(source, "rb") as fin, open(dest, "wb") as fout:
+        while block := fin.read(block_size):
+            digest.update(block)
+            fout.write(block)
+    shutil.copystat(source, dest)
+    copied_checksum = digest.hexdigest()
+    if checksum is not None and copied_checksum != checksum:
+        os.unlink(dest)
+        raise RAILChecksumError(f"Copy of {source} to {dest} has checksum {copied_checksum} != {checksum}")
+    return copied_checksum
+
+
+def ingest_file(
+    source: str | os.PathLike,
+    dest: str | os.PathLike,
+    strategy: str = "auto",
+    checksum: str | None = None,
+    block_size: int = 8 * 1024 * 1024,
+) -> str:
+    """Put a file in the archive area using the cheapest operation available
+
+    Hardlinks and renames only work within a filesystem, reflinks
+    only on filesystems that support them (e.g., btrfs, xfs), so when
+    they fail this falls back to a block copy, which is checked against
+    `checksum`.
+
+    Note that a hardlink shares the data with the source file, so the
+    source should not be modified in place afterwards.
+
+    Parameters
+    ----------
+    source
+        File to ingest
+
+    dest
+        Path in the archive area, the directory must exist
+
+    strategy
+        One of 'auto', 'move', 'hardlink', 'reflink' or 'copy'.
+        'auto' tries a hardlink then a reflink.
+
+    checksum
+        Expected sha256 hex digest, None to skip the check
+
+    block_size
+        Number of bytes to read at a time when copying
+
+    Returns
+    -------
+    str
+        The operation actually used, 'hardlink', 'reflink' or 'copy',
+        or 'move' if the source file is gone
+
+    Raises
+    ------
+    RAILFileNotFoundError
+        Input file not found
+
+    RAILChecksumError
+        The copy does not match the expected checksum
+    """
+    source, dest = os.fspath(source), os.fspath(dest)
+    if strategy not in INGEST_STRATEGIES:
+        raise ValueError(f"Unknown ingest strategy {strategy}, expected one of {INGEST_STRATEGIES}")
+    if not os.path.exists(source):
+        raise RAILFileNotFoundError(f"Input file {source} not found")
+    if os.path.exists(dest):
+        os.unlink(dest)
+
+    if strategy == "auto":
+        attempts = [("hardlink", _hardlink), ("reflink", _reflink)]
+    elif strategy == "move":
+        attempts = [("move", _move)]
+    elif strategy == "hardlink":
+        attempts = [("hardlink", _hardlink)]
+    elif strategy == "reflink":
+        attempts = [("reflink", _reflink)]
+    else:
+        attempts = []
+
+    for method, func in attempts:
+        try:
+            func(source, dest)
+            return method
+        except OSError as msg:
+            # Not possible here (other device, unsupported), try the next thing
+            if msg.errno not in (
+                errno.EXDEV,
+                errno.EPERM,
+                errno.EACCES,
+                errno.EMLINK,
+                errno.ENOTSUP,
+                errno.EOPNOTSUPP,
+                errno.ENOTTY,
+                errno.EINVAL,
+                errno.EBADF,
+            ):
+                raise
+
+    copy_file(source, dest, checksum=checksum, block_size=block_size)
+    if strategy == "move":
+        os.unlink(source)
+        return "move"
+    return "copy"
+
+
+def _hdf5_tables(hdf5_file: h5py.File) -> dict[str, dict[str, h5py.Dataset]]:
+    """Find the groups of an hdf5 file that hold columns, '' for the top level
+
+    Scalar datasets, e.g., used to store attributes, are not columns
+    """
+    tables: dict[str, dict[str, h5py.Dataset]] = {}
+
+    def _add_columns(name: str, group: h5py.Group) -> None:
+        columns = {key: val for key, val in group.items() if isinstance(val, h5py.Dataset) and val.shape}
+        if columns:
+            tables[name] = columns
+
+    _add_columns("", hdf5_file)
+    hdf5_file.visititems(lambda name, val: _add_columns(name, val) if isinstance(val, h5py.Group) else None)
+    return tables
+
+
+def read_file_metadata(path: str, checksum: str | None = None) -> models.FileMetadata:
+    """Describe an input file, reading only the headers and the bytes for the checksum
+
+    Parameters
+    ----------
+    path
+        Path to the input file
+
+    checksum
+        sha256 hex digest of the file if it is already known, e.g., from
+        streaming an upload, to avoid reading the file again
+
+    Returns
+    -------
+    models.FileMetadata
+        Description of the file
+
+    Raises
+    ------
+    RAILFileNotFoundError
+        Input file not found
+
+    RAILBadDatasetError
+        Input file could not be read
+    """
+    if not os.path.exists(path):
+        raise RAILFileNotFoundError(f"Input file {path} not found")
+
+    columns: dict[str, str] = {}
+    group_lengths: dict[str, int] = {}
+    try:
+        if path.endswith(PARQUET_SUFFIXES):
+            layout = "parquet"
+            parquet_file = pq.ParquetFile(path)
+            n_objects = parquet_file.metadata.num_rows
+            columns = {field.name: str(field.type) for field in parquet_file.schema_arrow}
+        elif path.endswith(HDF5_SUFFIXES):
+            layout = "hdf5"
+            with h5py.File(path, "r") as hdf5_file:
+                tables = _hdf5_tables(hdf5_file)
+                if not tables:
+                    raise RAILBadDatasetError(f"No columns found in {path}")
+                group_lengths = {name: len(next(iter(table.values()))) for name, table in tables.items()}
+                main_table = tables.get("", next(iter(tables.values())))
+                columns = {key: str(val.dtype) for key, val in main_table.items()}
+                n_objects = len(next(iter(main_table.values())))
+        else:
+            layout = os.path.splitext(path)[1].lstrip(".")
+            n_objects = tables_io.io.getInputDataLength(path)
+    except RAILBadDatasetError:
+        raise
+    except Exception as msg:
+        raise RAILBadDatasetError(f"Could not read data from {path} because {msg}") from msg
+
+    return models.FileMetadata(
+        layout=layout,
+        n_bytes=os.path.getsize(path),
+        checksum=checksum or file_content_hash(path),
+        n_objects=n_objects,
+        columns=columns,
+        group_lengths=group_lengths,
+    )
@@ -0,0 +1,190 @@
+"""Size aware least-recently-used cache"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+from pydantic import BaseModel
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class CacheStats(BaseModel):
+    """Counters describing how well a cache is doing"""
+
+    #: Number of lookups that found an entry
+    hits: int = 0
+
+    #: Number of lookups that did not find an entry
+    misses: int = 0
+
+    #: Number of entries dropped to stay within budget
+    evictions: int = 0
+
+    #: Number of entries currently held
+    n_entries: int = 0
+
+    #: Approximate number of bytes currently held
+    n_bytes: int = 0
+
+
+class LRUCache(Generic[K, V]):
+    """Least-recently-used cache bounded by entry count and bytes
+
+    Pinned entries and the most recently used entry are never evicted,
+    so an entry larger than the whole budget is still kept until the next
+    one comes along, and if everything is pinned the cache can grow past
+    its budget.
+
+    Parameters
+    ----------
+    max_entries
+        Maximum number of entries, None for no limit
+
+    max_bytes
+        Approximate maximum number of bytes, None for no limit
+
+    on_evict
+        Called with the key and value of each evicted entry
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        on_evict: Callable[[K, V], None] | None = None,
+    ) -> None:
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._on_evict = on_evict
+        self._entries: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        self._pinned: set[K] = set()
+        self._n_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> list[K]:
+        """Return the keys of the entries, least recently used first"""
+        return list(self._entries.keys())
+
+    @property
+    def stats(self) -> CacheStats:
+        """Return the current counters"""
+        return CacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            n_entries=len(self._entries),
+            n_bytes=self._n_bytes,
+        )
+
+    def get(self, key: K) -> V | None:
+        """Get an entry and mark it as recently used
+
+        Parameters
+        ----------
+        key
+            Key of the entry
+
+        Returns
+        -------
+        V | None
+            The entry, None if it is not in the cache
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: K, value: V, size: int = 0) -> None:
+        """Add an entry, evicting older ones if needed
+
+        The new entry itself is kept, even if it does not fit in the budget.
+
+        Parameters
+        ----------
+        key
+            Key of the entry
+
+        value
+            Entry to add
+
+        size
+            Approximate size of the entry in bytes
+        """
+        self.pop(key)
+        self._entries[key] = (value, size)
+        self._n_bytes += size
+        self._evict()
+
+    def pop(self, key: K) -> V | None:
+        """Remove an entry, this does not count as an eviction
+
+        Parameters
+        ----------
+        key
+            Key of the entry
+
+        Returns
+        -------
+        V | None
+            The removed entry, None if it was not in the cache
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._n_bytes -= entry[1]
+        return entry[0]
+
+    def pin(self, key: K) -> None:
+        """Never evict an entry with this key"""
+        self._pinned.add(key)
+
+    def unpin(self, key: K) -> None:
+        """Allow an entry with this key to be evicted again"""
+        self._pinned.discard(key)
+        self._evict()
+
+    def is_pinned(self, key: K) -> bool:
+        """Return True if the entry with this key is pinned"""
+        return key in self._pinned
+
+    def clear(self) -> None:
+        """Remove all the entries, the pins and counters are kept"""
+        self._entries.clear()
+        self._n_bytes = 0
+
+    def _over_budget(self) -> bool:
+        if self._max_entries is not None and len(self._entries) > self._max_entries:
+            return True
+        if self._max_bytes is not None and self._n_bytes > self._max_bytes:
+            return True
+        return False
+
+    def _evict(self) -> None:
+        if not self._over_budget():
+            return
+        # Oldest entries come first, the newest one is kept
+        for key in list(self._entries.keys())[:-1]:
+            if not self._over_budget():
+                return
+            if key in self._pinned:
+                continue
+            value, size = self._entries.pop(key)
+            self._n_bytes -= size
+            self._evictions += 1
+            if self._on_evict is not None:
+                self._on_evict(key, value)
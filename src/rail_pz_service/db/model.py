@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
@@ -17,6 +18,7 @@ from ..common.errors import (
     RAILFileNotFoundError,
     RAILMissingRowCreateInputError,
 )
+from ..common.hashing import file_content_hash
 from .algorithm import Algorithm
 from .base import Base
 from .catalog_tag import CatalogTag
@@ -32,6 +34,7 @@ class Model(Base, RowMixin):
 
     __tablename__ = "model"
     class_string = "model"
+    cache_rows = True
 
     #: primary key
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -42,6 +45,9 @@ class Model(Base, RowMixin):
     #: Path to the relevant file
     path: Mapped[str] = mapped_column()
 
+    #: sha256 hex digest of the file (could be None)
+    content_hash: Mapped[str | None] = mapped_column(default=None)
+
     #: foreign key into `Algorithm` table
     algo_id: Mapped[int] = mapped_column(
         ForeignKey("algorithm.id", ondelete="CASCADE"),
@@ -117,12 +123,16 @@ class Model(Base, RowMixin):
         else:
             catalog_tag_ = await CatalogTag.get_row(session, catalog_tag_id)
 
+        content_hash = kwargs.get("content_hash", None)
         if validate_file:
-            cls.validate_model(path, algo_, catalog_tag_)
+            await asyncio.to_thread(cls.validate_model, path, algo_, catalog_tag_)
+            if content_hash is None:
+                content_hash = await asyncio.to_thread(file_content_hash, path)
 
         return dict(
             name=name,
             path=path,
+            content_hash=content_hash,
             algo_id=algo_id,
             catalog_tag_id=catalog_tag_id,
         )
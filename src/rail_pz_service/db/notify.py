@@ -0,0 +1,127 @@
+"""Notifications to wake up workers when new requests are created"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import structlog
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_scoped_session
+
+from ..config import config as global_config
+
+
+class RequestNotifier:
+    """Tells workers that new requests are waiting
+
+    In-process subscribers get an `asyncio.Event` that is set once the
+    transaction that created a request is committed.
+
+    On PostgreSQL a NOTIFY is also sent on `config.daemon.notify_channel`,
+    so that workers in other processes or on other nodes can LISTEN for it.
+    """
+
+    _shared_notifier: RequestNotifier | None = None
+
+    def __init__(self, logger: structlog.BoundLogger | None = None) -> None:
+        self._logger = logger
+        self._events: set[asyncio.Event] = set()
+
+    @classmethod
+    def shared_notifier(cls, logger: structlog.BoundLogger | None = None) -> RequestNotifier:
+        if cls._shared_notifier is None:
+            cls._shared_notifier = RequestNotifier(logger)
+        return cls._shared_notifier
+
+    @property
+    def channel(self) -> str:
+        """Return the name of the PostgreSQL notification channel"""
+        return global_config.daemon.notify_channel
+
+    def subscribe(self, wakeup: asyncio.Event | None = None) -> asyncio.Event:
+        """Get an Event that is set when new requests are created
+
+        Parameters
+        ----------
+        wakeup
+            Event to use, if None a new one is made
+
+        Returns
+        -------
+        asyncio.Event
+            Event that will be set
+        """
+        if wakeup is None:
+            wakeup = asyncio.Event()
+        self._events.add(wakeup)
+        return wakeup
+
+    def unsubscribe(self, wakeup: asyncio.Event) -> None:
+        """Stop setting an Event when new requests are created"""
+        self._events.discard(wakeup)
+
+    def wake(self) -> None:
+        """Set all the subscribed Events"""
+        for wakeup in self._events:
+            wakeup.set()
+
+    async def notify(self, session: async_scoped_session | AsyncSession) -> None:
+        """Notify the workers once the current transaction is committed
+
+        Parameters
+        ----------
+        session
+            DB session manager
+        """
+        async_session = session() if isinstance(session, async_scoped_session) else session
+
+        # Only wake the local workers once the new rows are visible
+        event.listen(
+            async_session.sync_session,
+            "after_commit",
+            lambda _sync_session: self.wake(),
+            once=True,
+        )
+
+        if async_session.get_bind().dialect.name == "postgresql":
+            # NOTIFY is transactional, it is only delivered on commit
+            await async_session.execute(text("SELECT pg_notify(:channel, '')"), {"channel": self.channel})
+
+    @asynccontextmanager
+    async def listen(self, engine: AsyncEngine) -> AsyncGenerator[bool, None]:
+        """Forward PostgreSQL notifications to the subscribed Events
+
+        Other databases have no cross-process notifications, so this
+        does nothing and the workers rely on the local Events and polling.
+
+        Parameters
+        ----------
+        engine
+            DB engine used to make a dedicated listening connection
+
+        Yields
+        ------
+        bool
+            True if notifications from other processes will be received
+        """
+        if engine.dialect.name != "postgresql" or engine.dialect.driver != "asyncpg":
+            yield False
+            return
+
+        def _on_notify(*_args: Any) -> None:
+            self.wake()
+
+        async with engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            assert driver_connection is not None
+            await driver_connection.add_listener(self.channel, _on_notify)
+            if self._logger:
+                self._logger.info(f"Listening for new requests on {self.channel}")
+            try:
+                yield True
+            finally:
+                await driver_connection.remove_listener(self.channel, _on_notify)
@@ -3,20 +3,32 @@
 from __future__ import annotations
 
 import os
-from collections.abc import Sequence
+from collections.abc import Collection, Sequence
 from datetime import datetime
-from typing import Any
+from typing import Any, cast
 
-from sqlalchemy import DateTime, UniqueConstraint, select
+from sqlalchemy import (
+    ColumnElement,
+    CursorResult,
+    DateTime,
+    Enum,
+    Index,
+    UniqueConstraint,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import async_scoped_session
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.schema import ForeignKey
 
 from .. import models
-from ..common.errors import RAILMissingRowCreateInputError
+from ..common.enums import RequestStatusEnum
+from ..common.errors import RAILBadInputError, RAILIntegrityError, RAILMissingRowCreateInputError
 from .base import Base
 from .dataset import Dataset
 from .estimator import Estimator
+from .notify import RequestNotifier
 from .row import RowMixin
 
 
@@ -26,7 +38,11 @@ class Request(Base, RowMixin):
 
     __tablename__ = "request"
     class_string = "request"
-    __table_args__ = (UniqueConstraint("estimator_id", "dataset_id", name="request_constraint"),)
+    __table_args__ = (
+        UniqueConstraint("estimator_id", "dataset_id", name="request_constraint"),
+        # Queue scans only touch the open requests, however long the table gets
+        Index("ix_request_status_time_created", "status", "time_created"),
+    )
 
     #: primary key
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -49,8 +65,18 @@ class Request(Base, RowMixin):
     #: path to the output file
     qp_file_path: Mapped[str | None] = mapped_column(default=None)
 
+    #: sha256 hex digest of the output file
+    qp_file_checksum: Mapped[str | None] = mapped_column(default=None)
+
+    #: where the request is in its processing
+    status: Mapped[RequestStatusEnum] = mapped_column(
+        type_=Enum(RequestStatusEnum, name="request_status"),
+        default=RequestStatusEnum.queued,
+        server_default=RequestStatusEnum.queued.name,
+    )
+
     #: timestamp of when the request was created in the DB
-    time_created: Mapped[datetime] = mapped_column(type_=DateTime)
+    time_created: Mapped[datetime] = mapped_column(type_=DateTime, index=True)
 
     #: timestamp of when the request processing started by an `Estimator`
     time_started: Mapped[datetime | None] = mapped_column(type_=DateTime, default=None)
@@ -58,6 +84,9 @@ class Request(Base, RowMixin):
     #: timestamp of when the request processing was finished
     time_finished: Mapped[datetime | None] = mapped_column(type_=DateTime, default=None)
 
+    #: Id of the worker that claimed this request
+    worker_id: Mapped[str | None] = mapped_column(default=None)
+
     #: Access to associated `Estimator`
     estimator_: Mapped[Estimator] = relationship(
         "Estimator",
@@ -76,7 +105,10 @@ class Request(Base, RowMixin):
     col_names_for_table = pydantic_mode_class.col_names_for_table
 
     def __repr__(self) -> str:
-        return f"Request {self.id} {self.user} {self.estimator_id} {self.dataset_id} {self.qp_file_path}"
+        return (
+            f"Request {self.id} {self.user} {self.estimator_id} {self.dataset_id} {self.status} "
+            f"{self.qp_file_path}"
+        )
 
     @classmethod
     async def get_create_kwargs(
@@ -115,12 +147,370 @@ class Request(Base, RowMixin):
             time_created=time_created,
         )
 
+    @classmethod
+    async def create_rows(
+        cls,
+        session: async_scoped_session,
+        items: Sequence[dict[str, Any]],
+    ) -> tuple[list[tuple[int, Request]], list[tuple[int, str]]]:
+        """Create many requests at once
+
+        The Estimator and Dataset names are resolved with one query per
+        table, and all the valid items are inserted in a single transaction.
+        Items that can not be created are reported rather than failing
+        the whole batch.
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        items
+            Columns and associated values for each new row, as for
+            `create_row`
+
+        Returns
+        -------
+        tuple[list[tuple[int, Request]], list[tuple[int, str]]]
+            Index in `items` and newly created row for the created requests,
+            index in `items` and reason for the others
+
+        Raises
+        ------
+        RAILIntegrityError
+            Insert failed, e.g., because of a concurrent insert of the same
+            request, nothing was created
+        """
+        estimators_ = await Estimator.get_rows_by_name(
+            session, [item["estimator_name"] for item in items if "estimator_name" in item]
+        )
+        datasets_ = await Dataset.get_rows_by_name(
+            session, [item["dataset_name"] for item in items if "dataset_name" in item]
+        )
+
+        errors: list[tuple[int, str]] = []
+        resolved: list[tuple[int, dict[str, Any]]] = []
+        for idx, item in enumerate(items):
+            kwargs = dict(item)
+            for key, rows_by_name in (("estimator", estimators_), ("dataset", datasets_)):
+                if kwargs.get(f"{key}_id") is not None:
+                    continue
+                name = kwargs.get(f"{key}_name")
+                if name is None:
+                    errors.append((idx, f"Missing input to create Request: {key}_name"))
+                    break
+                if name not in rows_by_name:
+                    errors.append((idx, f"{key.capitalize()} {name} not found"))
+                    break
+                kwargs[f"{key}_id"] = rows_by_name[name].id
+            else:
+                resolved.append((idx, kwargs))
+
+        # Check for existing requests with one query, rather than one per item
+        existing: set[tuple[int, int]] = set()
+        if resolved:
+            q = select(cls.estimator_id, cls.dataset_id).where(
+                cls.estimator_id.in_({kwargs["estimator_id"] for _, kwargs in resolved}),
+                cls.dataset_id.in_({kwargs["dataset_id"] for _, kwargs in resolved}),
+            )
+            existing = {(row.estimator_id, row.dataset_id) for row in (await session.execute(q)).all()}
+
+        to_create: list[tuple[int, Request]] = []
+        for idx, kwargs in resolved:
+            pair = (kwargs["estimator_id"], kwargs["dataset_id"])
+            if pair in existing:
+                errors.append((idx, f"Request for estimator {pair[0]} and dataset {pair[1]} already exists"))
+                continue
+            existing.add(pair)
+            create_kwargs = await cls.get_create_kwargs(session, **kwargs)
+            to_create.append((idx, cls(**create_kwargs)))
+
+        if to_create:
+            try:
+                async with session.begin_nested():
+                    session.add_all([row for _, row in to_create])
+            except IntegrityError as msg:
+                raise RAILIntegrityError(msg) from msg
+            # One wake up for the whole batch
+            await cls._create_hook(session, to_create[0][1])
+
+        errors.sort()
+        return to_create, errors
+
+    @classmethod
+    async def _create_hook(
+        cls,
+        session: async_scoped_session,
+        row: Any,  # pylint: disable=unused-argument
+    ) -> None:
+        # Wake up the workers instead of waiting for them to poll
+        await RequestNotifier.shared_notifier().notify(session)
+
+    @classmethod
+    def filter_clauses(
+        cls,
+        **filters: Any,
+    ) -> list[ColumnElement[bool]]:
+        """Build the WHERE clauses used to filter rows
+
+        On top of the column filters, this understands `catalog_tag_id`,
+        which is taken from the `Estimator`, and checks that `status` is one
+        of the `RequestStatusEnum` values.
+        """
+        status = filters.pop("status", None)
+        catalog_tag_id = filters.pop("catalog_tag_id", None)
+        clauses = super().filter_clauses(**filters)
+        if status is not None:
+            try:
+                clauses.append(cls.status == RequestStatusEnum(status))
+            except ValueError as msg:
+                raise RAILBadInputError(f"Unknown request status {status}") from msg
+        if catalog_tag_id is not None:
+            clauses.append(
+                cls.estimator_id.in_(select(Estimator.id).where(Estimator.catalog_tag_id == catalog_tag_id))
+            )
+        return clauses
+
+    @classmethod
+    async def find_computed_output(
+        cls,
+        session: async_scoped_session,
+        dataset_id: int,
+        estimator_id: int,
+    ) -> str | None:
+        """Find an existing output for the same data and estimator
+
+        This matches on the `content_hash` of the `Dataset` and `Estimator`,
+        rather than on their ids, so that the same catalog uploaded under
+        another name, or run with an identically configured estimator,
+        can reuse the output.
+
+        Only the outputs of requests that are done are considered, the
+        output of a request that is still running might be incomplete.
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        dataset_id
+            Id of the Dataset in question
+
+        estimator_id
+            Id of the Estimator in question
+
+        Returns
+        -------
+        str | None
+            Path to an existing qp file, None if there is none
+        """
+        dataset_ = await Dataset.get_row(session, dataset_id)
+        estimator_ = await Estimator.get_row(session, estimator_id)
+        if dataset_.content_hash is None or estimator_.content_hash is None:
+            return None
+
+        q = (
+            select(cls.qp_file_path)
+            .join(Dataset, Dataset.id == cls.dataset_id)
+            .join(Estimator, Estimator.id == cls.estimator_id)
+            .where(
+                Dataset.content_hash == dataset_.content_hash,
+                Estimator.content_hash == estimator_.content_hash,
+                cls.qp_file_path.is_not(None),
+                cls.status == RequestStatusEnum.done,
+            )
+            .order_by(cls.time_finished.desc())
+        )
+        for qp_file_path in (await session.scalars(q)).all():
+            # Outputs can be cleaned up behind our back
+            if qp_file_path is not None and os.path.exists(qp_file_path):
+                return qp_file_path
+        return None
+
     @classmethod
     async def get_open_requests(
         cls,
         session: async_scoped_session,
     ) -> Sequence[Request]:
         q = select(cls)
-        q = q.filter(cls.time_started.is_(None)).order_by(cls.time_created.desc())
+        q = q.filter(cls.status == RequestStatusEnum.queued).order_by(cls.time_created.desc())
         results = await session.scalars(q)
         return results.all()
+
+    @classmethod
+    async def claim_open_requests(
+        cls,
+        session: async_scoped_session,
+        worker_id: str,
+        limit: int = 1,
+        exclude_estimator_ids: Collection[int] = (),
+        *,
+        single_estimator: bool = False,
+    ) -> Sequence[Request]:
+        """Atomically claim open requests for a worker
+
+        This marks the claimed requests as running, and stamps `time_started`
+        and `worker_id` on them, so that other workers sharing the same DB
+        will not also claim them.
+
+        On PostgreSQL this uses SELECT ... FOR UPDATE SKIP LOCKED, elsewhere
+        (i.e., SQLite) it falls back to a compare-and-set update on
+        `status`.  In both cases only requests that are still queued when
+        the row is locked or updated are claimed.
+
+        The caller should commit the session to make the claims visible.
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        worker_id
+            Id of the worker claiming the requests
+
+        limit
+            Maximum number of requests to claim
+
+        exclude_estimator_ids
+            Do not claim requests for these Estimators
+
+        single_estimator
+            Only claim requests for the Estimator of the latest open request,
+            so that they can all run with the same warm estimator
+
+        Returns
+        -------
+        Sequence[Request]
+            The claimed requests
+        """
+        if limit <= 0:
+            return []
+
+        now = datetime.now()
+        q = select(cls.id).where(cls.status == RequestStatusEnum.queued).order_by(cls.time_created.desc())
+        if exclude_estimator_ids:
+            q = q.where(cls.estimator_id.not_in(exclude_estimator_ids))
+        if single_estimator:
+            estimator_id = await session.scalar(q.with_only_columns(cls.estimator_id).limit(1))
+            if estimator_id is None:
+                return []
+            q = q.where(cls.estimator_id == estimator_id)
+
+        claimed_ids: list[int] = []
+        if session.get_bind().dialect.name == "postgresql":
+            # The status check is on the locking query itself, so that the
+            # re-check after waiting on a row lock drops rows another
+            # worker has just claimed
+            q = q.limit(limit).with_for_update(skip_locked=True)
+            locked_ids = list((await session.scalars(q)).all())
+            if locked_ids:
+                claimed_ids = list(
+                    (
+                        await session.scalars(
+                            update(cls)
+                            .where(cls.id.in_(locked_ids), cls.status == RequestStatusEnum.queued)
+                            .values(status=RequestStatusEnum.running, time_started=now, worker_id=worker_id)
+                            .returning(cls.id)
+                            .execution_options(synchronize_session=False)
+                        )
+                    ).all()
+                )
+        else:
+            candidate_ids = (await session.scalars(q)).all()
+            for candidate_id in candidate_ids:
+                if len(claimed_ids) >= limit:
+                    break
+                # Only succeeds if no one else has claimed it in the meantime
+                result = cast(
+                    CursorResult,
+                    await session.execute(
+                        update(cls)
+                        .where(cls.id == candidate_id, cls.status == RequestStatusEnum.queued)
+                        .values(status=RequestStatusEnum.running, time_started=now, worker_id=worker_id)
+                        .execution_options(synchronize_session=False)
+                    ),
+                )
+                if result.rowcount == 1:
+                    claimed_ids.append(candidate_id)
+
+        if not claimed_ids:
+            return []
+
+        q_claimed = (
+            select(cls)
+            .where(cls.id.in_(claimed_ids))
+            .order_by(cls.time_created.desc())
+            .execution_options(populate_existing=True)
+        )
+        results = await session.scalars(q_claimed)
+        return results.all()
+
+    @classmethod
+    async def start_request(
+        cls,
+        session: async_scoped_session,
+        request_id: int,
+    ) -> bool:
+        """Mark a request as running, unless it is running already
+
+        This is a compare-and-set on `status`, so that a request run
+        directly is not also claimed by a worker, or the other way around.
+        Finished requests can be run again, e.g., to retry after a failure.
+
+        The caller should commit the session to make the change visible.
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        request_id
+            Id of the request in question
+
+        Returns
+        -------
+        bool
+            True if the request was marked as running
+        """
+        result = cast(
+            CursorResult,
+            await session.execute(
+                update(cls)
+                .where(
+                    cls.id == request_id,
+                    cls.status.in_(
+                        [RequestStatusEnum.queued, RequestStatusEnum.done, RequestStatusEnum.failed]
+                    ),
+                )
+                .values(status=RequestStatusEnum.running, time_started=datetime.now(), worker_id=None)
+                .execution_options(synchronize_session=False)
+            ),
+        )
+        return result.rowcount == 1
+
+    @classmethod
+    async def requeue_requests(
+        cls,
+        session: async_scoped_session,
+        request_ids: list[int],
+    ) -> None:
+        """Put claimed requests back in the queue
+
+        Requests that are not running anymore are left alone
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        request_ids
+            Ids of the requests to requeue
+        """
+        if not request_ids:
+            return
+        await session.execute(
+            update(cls)
+            .where(cls.id.in_(request_ids), cls.status == RequestStatusEnum.running)
+            .values(status=RequestStatusEnum.queued, time_started=None, worker_id=None)
+            .execution_options(synchronize_session="fetch")
+        )
@@ -2,22 +2,25 @@
 
 from __future__ import annotations
 
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence
 from typing import TYPE_CHECKING, Any, TypeVar
 
 from pydantic import BaseModel, TypeAdapter
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, select
 from sqlalchemy.exc import IntegrityError, StatementError
 from sqlalchemy.ext.asyncio import async_scoped_session
+from sqlalchemy.orm.interfaces import ORMOption
 from structlog import get_logger
 
 from ..common.errors import (
+    RAILBadInputError,
     RAILIDMismatchError,
     RAILIntegrityError,
     RAILMissingIDError,
     RAILMissingNameError,
     RAILStatementError,
 )
+from .row_cache import RowCache
 
 logger = get_logger(__name__)
 
@@ -36,6 +39,7 @@ class RowMixin:
     name: Any  # Human-readable name for row
     class_string: str  # Name to use for help functions and descriptions
     pydantic_mode_class: type[BaseModel]  # Pydantic model class
+    cache_rows: bool = False  # Keep rows in the in-process `RowCache`
 
     @classmethod
     async def get_rows(
@@ -43,9 +47,16 @@ class RowMixin:
         session: async_scoped_session,
         skip: int = 0,
         limit: int = 100,
+        after: int | None = None,
+        *,
+        descending: bool = False,
+        **filters: Any,
     ) -> Sequence[T]:
         """Get rows associated to a particular table
 
+        Rows are ordered by id, use `after` rather than `skip` to page
+        through large tables, as it does not need to scan the skipped rows.
+
         Parameters
         ----------
         session
@@ -57,21 +68,87 @@ class RowMixin:
         limit
             Number of row to return
 
+        after
+            Only return rows after this id in the ordering, i.e., the id
+            of the last row of the previous page
+
+        descending
+            Return the rows with the highest ids first
+
+        **filters
+            Only return rows matching these, see `filter_clauses`
+
         Returns
         -------
         Sequence[T]
             All the matching rows
         """
-        q = select(cls)
+        q = select(cls).where(*cls.filter_clauses(**filters))
+        if after is not None:
+            q = q.where(cls.id < after if descending else cls.id > after)
+        q = q.order_by(cls.id.desc() if descending else cls.id)
         q = q.offset(skip).limit(limit)
         results = await session.scalars(q)
         return results.all()
 
+    @classmethod
+    def filter_clauses(
+        cls,
+        **filters: Any,
+    ) -> list[ColumnElement[bool]]:
+        """Build the WHERE clauses used to filter rows
+
+        Filters named after a column select rows with that value,
+        `<column>_after` and `<column>_before` select rows with values
+        at or after, or strictly before, the given value.
+        None values are ignored.
+
+        Sub-classes can override this to add filters that do not map
+        directly to a column.
+
+        Parameters
+        ----------
+        **filters
+            Filters in question
+
+        Returns
+        -------
+        list[ColumnElement[bool]]
+            Clauses to pass to `where`
+
+        Raises
+        ------
+        RAILBadInputError
+            Filter does not match any column
+        """
+        clauses: list[ColumnElement[bool]] = []
+        for key, value in filters.items():
+            if value is None:
+                continue
+            if key.endswith("_after"):
+                column_name, op = key.removesuffix("_after"), "ge"
+            elif key.endswith("_before"):
+                column_name, op = key.removesuffix("_before"), "lt"
+            else:
+                column_name, op = key, "eq"
+            column = cls.__table__.columns.get(column_name)  # type: ignore[attr-defined]
+            if column is None:
+                raise RAILBadInputError(f"Can not filter {cls.class_string} on {key}")
+            if op == "ge":
+                clauses.append(column >= value)
+            elif op == "lt":
+                clauses.append(column < value)
+            else:
+                clauses.append(column == value)
+        return clauses
+
     @classmethod
     async def get_row(
         cls: type[T],
         session: async_scoped_session,
         row_id: int,
+        *,
+        options: Sequence[ORMOption] = (),
     ) -> T:
         """Get a single row, matching row.id == row_id
 
@@ -83,6 +160,11 @@ class RowMixin:
         row_id
             PrimaryKey of the row to return
 
+        options
+            Loader options, e.g., `joinedload` of relationships that will be
+            used, so that they are fetched in the same query.  These do not
+            apply if the row is already in the session.
+
         Returns
         -------
         T
@@ -93,9 +175,15 @@ class RowMixin:
         RAILMissingIDError
              Row with ID does not exist
         """
-        result = await session.get(cls, row_id)
+        if cls.cache_rows and not options:
+            cached = await RowCache.shared_cache().get_row(session, cls, row_id)
+            if cached is not None:
+                return cached
+        result = await session.get(cls, row_id, options=options)
         if result is None:
             raise RAILMissingIDError(f"{cls} {row_id} not found")
+        if cls.cache_rows:
+            RowCache.shared_cache().put(result)
         return result
 
     @classmethod
@@ -124,13 +212,51 @@ class RowMixin:
         RAILMissingNameError
              Row with ID does not exist
         """
+        if cls.cache_rows:
+            row_cache = RowCache.shared_cache()
+            row_id = row_cache.get_id(cls, name)
+            if row_id is not None:
+                cached = await row_cache.get_row(session, cls, row_id)
+                # The row might have been renamed since
+                if cached is not None and cached.name == name:
+                    return cached
         query = select(cls).where(cls.name == name)
         rows = await session.scalars(query)
         row = rows.first()
         if row is None:
             raise RAILMissingNameError(f"{cls} {name} not found")
+        if cls.cache_rows:
+            RowCache.shared_cache().put(row)
         return row
 
+    @classmethod
+    async def get_rows_by_name(
+        cls: type[T],
+        session: async_scoped_session,
+        names: Iterable[str],
+    ) -> dict[str, T]:
+        """Get many rows by name, with a single query
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        names
+            names of the rows to return
+
+        Returns
+        -------
+        dict[str, T]
+            Matching rows, keyed by name, names that are not found are left out
+        """
+        unique_names = set(names)
+        if not unique_names:
+            return {}
+        query = select(cls).where(cls.name.in_(unique_names))
+        rows = await session.scalars(query)
+        return {row.name: row for row in rows.all()}
+
     @classmethod
     async def delete_row(
         cls,
@@ -169,8 +295,8 @@ class RowMixin:
     @classmethod
     async def _delete_hook(
         cls,
-        session: async_scoped_session,  # pylint: disable=unused-argument
-        row_id: int,  # pylint: disable=unused-argument
+        session: async_scoped_session,
+        row_id: int,
     ) -> None:
         """Hook called during delete_row
 
@@ -183,7 +309,9 @@ class RowMixin:
             PrimaryKey of the row to delete
 
         """
-        return
+        if cls.cache_rows:
+            # Deletes cascade to the rows that refer to this one
+            RowCache.shared_cache().invalidate(cls, row_id, session, cascade=True)
 
     @classmethod
     async def update_row(
@@ -241,8 +369,29 @@ class RowMixin:
             if TYPE_CHECKING:
                 assert msg.orig  # for mypy
             raise RAILStatementError(msg) from msg
+        await cls._update_hook(session, row)
         return row
 
+    @classmethod
+    async def _update_hook(
+        cls,
+        session: async_scoped_session,
+        row: Any,
+    ) -> None:
+        """Hook called during update_row
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        row
+            Updated row
+
+        """
+        if cls.cache_rows:
+            RowCache.shared_cache().invalidate(cls, row.id, session)
+
     @classmethod
     async def create_row(
         cls: type[T],
@@ -279,8 +428,29 @@ class RowMixin:
                 assert msg.orig  # for mypy
             raise RAILIntegrityError(msg) from msg
         await session.refresh(row)
+        await cls._create_hook(session, row)
         return row
 
+    @classmethod
+    async def _create_hook(
+        cls,
+        session: async_scoped_session,
+        row: Any,
+    ) -> None:
+        """Hook called during create_row
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        row
+            Newly created row
+
+        """
+        if cls.cache_rows:
+            RowCache.shared_cache().invalidate(cls, row.id, session)
+
     @classmethod
     async def get_create_kwargs(
         cls: type[T],
@@ -0,0 +1,251 @@
+"""In-process cache of rows from the small reference tables"""
+
+from __future__ import annotations
+
+import copy
+import time
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import Table, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_scoped_session
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import instance_state
+from sqlalchemy.orm.util import identity_key
+
+from ..config import config as global_config
+from .lru import CacheStats, LRUCache
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import SessionTransaction
+
+    from .row import RowMixin
+
+
+class RowCache:
+    """Read-through cache of rows, keyed by table and id, and by table and name
+
+    This is meant for tables that are small and rarely change, i.e.,
+    `Algorithm`, `CatalogTag`, `Model` and `Estimator`, which are looked
+    up by name or id on most requests.
+
+    The cache holds a copy of the column values, rather than the rows
+    themselves, which belong to a particular session.  Rows are rebuilt
+    from those values and merged into the asking session without a query.
+
+    Entries are dropped when `RowMixin.create_row`, `update_row` or
+    `delete_row` touch a row, and again once the transaction doing it
+    is committed or rolled back, as other sessions may have read the old
+    values in the meantime.  As deletes cascade, deleting a row also drops
+    all the cached rows of the tables that refer to it.  Changes made by
+    other processes are only seen once the entries expire, after
+    `config.cache.row_ttl` seconds.
+
+    Parameters
+    ----------
+    max_entries
+        Maximum number of rows kept, None for no limit
+
+    ttl
+        Number of seconds rows are kept, None to keep them until they
+        are changed
+    """
+
+    _shared_cache: RowCache | None = None
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        ttl: float | None = None,
+    ) -> None:
+        self._ttl = ttl
+        # Keyed by (table name, id), with the time the values were read
+        self._rows: LRUCache[tuple[str, int], tuple[float, dict[str, Any]]] = LRUCache(
+            max_entries=max_entries,
+            on_evict=self._evicted,
+        )
+        # Ids by name, for each table, only for the rows in _rows
+        self._ids: dict[str, dict[str, int]] = {}
+
+    @classmethod
+    def shared_cache(cls) -> RowCache:
+        if cls._shared_cache is None:
+            cls._shared_cache = RowCache(
+                max_entries=global_config.cache.row_max_entries,
+                ttl=global_config.cache.row_ttl,
+            )
+        return cls._shared_cache
+
+    @property
+    def stats(self) -> CacheStats:
+        """Return the counters for the cached rows"""
+        return self._rows.stats
+
+    def clear(self) -> None:
+        """Clear out the cache"""
+        self._rows.clear()
+        self._ids.clear()
+
+    def get_id(self, row_class: type[RowMixin], name: str) -> int | None:
+        """Get the id of a row from its name
+
+        Parameters
+        ----------
+        row_class
+            Table in question
+
+        name
+            Name of the row
+
+        Returns
+        -------
+        int | None
+            Id of the row, None if it is not known.  This can be out of date,
+            so check the name of the row it points to.
+        """
+        return self._ids.get(row_class.__tablename__, {}).get(name)  # type: ignore[attr-defined]
+
+    async def get_row(
+        self,
+        session: async_scoped_session | AsyncSession,
+        row_class: type[RowMixin],
+        row_id: int,
+    ) -> Any | None:
+        """Get a row in a session, without a query
+
+        Parameters
+        ----------
+        session
+            DB session manager
+
+        row_class
+            Table in question
+
+        row_id
+            PrimaryKey of the row
+
+        Returns
+        -------
+        Any | None
+            The row, attached to the session, None if it is not cached,
+            or if it is already in the session, in which case the session
+            has the more up to date version.
+        """
+        async_session = session() if isinstance(session, async_scoped_session) else session
+        if identity_key(row_class, row_id) in async_session.identity_map:
+            return None
+
+        key = (row_class.__tablename__, row_id)  # type: ignore[attr-defined]
+        entry = self._rows.get(key)
+        if entry is None:
+            return None
+        time_read, values = entry
+        if self._ttl is not None and time.monotonic() - time_read > self._ttl:
+            self._drop(key)
+            return None
+
+        row = row_class(**copy.deepcopy(values))
+        make_transient_to_detached(row)
+        return await async_session.merge(row, load=False)
+
+    def put(self, row: RowMixin) -> None:
+        """Add a row that was just read from the DB
+
+        Parameters
+        ----------
+        row
+            Row in question, rows with columns that are not loaded are skipped
+        """
+        state = instance_state(row)
+        column_keys = [column_attr.key for column_attr in state.mapper.column_attrs]
+        if state.pending or state.deleted or state.unloaded.intersection(column_keys):
+            return
+        table_name = state.class_.__tablename__  # type: ignore[attr-defined]
+        values = {key: copy.deepcopy(state.dict[key]) for key in column_keys}
+        # The row might have been renamed
+        self._drop((table_name, row.id))
+        self._ids.setdefault(table_name, {})[row.name] = row.id
+        self._rows.put((table_name, row.id), (time.monotonic(), values))
+
+    def invalidate(
+        self,
+        row_class: type[RowMixin],
+        row_id: int,
+        session: async_scoped_session | AsyncSession | None = None,
+        *,
+        cascade: bool = False,
+    ) -> None:
+        """Drop a row that is being changed
+
+        Parameters
+        ----------
+        row_class
+            Table in question
+
+        row_id
+            PrimaryKey of the row
+
+        session
+            Session making the change, if given the row is dropped again
+            when its transaction ends
+
+        cascade
+            Also drop the rows of all the tables that refer to this one,
+            i.e., because the row is being deleted
+        """
+        table = row_class.__table__  # type: ignore[attr-defined]
+        self._drop((table.name, row_id))
+        if cascade:
+            for dependent_table in self._dependent_tables(table):
+                self._drop_table(dependent_table.name)
+        if session is None:
+            return
+
+        async_session = session() if isinstance(session, async_scoped_session) else session
+        sync_session = async_session.sync_session
+        if "row_cache_pending" not in sync_session.info:
+            sync_session.info["row_cache_pending"] = set()
+            event.listen(sync_session, "after_commit", self._after_commit)
+            event.listen(sync_session, "after_soft_rollback", self._after_soft_rollback)
+        sync_session.info["row_cache_pending"].add((row_class, row_id, cascade))
+
+    @staticmethod
+    def _dependent_tables(table: Table) -> list[Table]:
+        dependents: list[Table] = []
+        to_check = [table]
+        while to_check:
+            referred = to_check.pop()
+            for other in table.metadata.sorted_tables:
+                if other not in dependents and any(fkey.references(referred) for fkey in other.foreign_keys):
+                    dependents.append(other)
+                    to_check.append(other)
+        return dependents
+
+    def _drop(self, key: tuple[str, int]) -> None:
+        entry = self._rows.pop(key)
+        if entry is not None:
+            self._evicted(key, entry)
+
+    def _drop_table(self, table_name: str) -> None:
+        for row_id in self._ids.pop(table_name, {}).values():
+            self._rows.pop((table_name, row_id))
+
+    def _evicted(self, key: tuple[str, int], entry: tuple[float, dict[str, Any]]) -> None:
+        table_name, row_id = key
+        ids = self._ids.get(table_name, {})
+        name = entry[1]["name"]
+        if ids.get(name) == row_id:
+            del ids[name]
+
+    def _end_transaction(self, sync_session: Session) -> None:
+        pending = sync_session.info["row_cache_pending"]
+        for row_class, row_id, cascade in pending:
+            self.invalidate(row_class, row_id, cascade=cascade)
+        pending.clear()
+
+    def _after_commit(self, sync_session: Session) -> None:
+        self._end_transaction(sync_session)
+
+    def _after_soft_rollback(self, sync_session: Session, previous_transaction: SessionTransaction) -> None:
+        # Rolling back a savepoint leaves the rest of the transaction going
+        if previous_transaction.parent is None:
+            self._end_transaction(sync_session)
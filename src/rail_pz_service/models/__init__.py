@@ -1,25 +1,54 @@
 """Database table definitions and utility functions"""
 
-from .algorithm import Algorithm
-from .catalog_tag import CatalogTag
-from .dataset import Dataset
+from .algorithm import Algorithm, AlgorithmListQuery
+from .bulk import BulkError, DatasetBulkResult, RequestBulkResult
+from .catalog_tag import CatalogTag, CatalogTagListQuery
+from .dataset import Dataset, DatasetListQuery, FileMetadata
 from .download import DownloadQuery
-from .estimator import Estimator
-from .model import Model
-from .request import Request, RequestCreate
-from .load import LoadDatasetQuery, LoadModelQuery, LoadEstimatorQuery, NameQuery
+from .estimate import EstimateQuery, EstimateResult
+from .estimator import Estimator, EstimatorListQuery
+from .model import Model, ModelListQuery
+from .request import Request, RequestCreate, RequestListQuery, RequestRows, RequestRowsQuery
+from .load import (
+    LoadDatasetQuery,
+    LoadModelQuery,
+    LoadEstimatorQuery,
+    NameQuery,
+    UploadDatasetQuery,
+    UploadModelQuery,
+    UploadStart,
+    UploadStatus,
+)
 
 __all__ = [
     "Algorithm",
+    "AlgorithmListQuery",
+    "BulkError",
     "CatalogTag",
+    "CatalogTagListQuery",
     "Dataset",
+    "DatasetBulkResult",
+    "DatasetListQuery",
     "DownloadQuery",
+    "EstimateQuery",
+    "EstimateResult",
     "Estimator",
+    "EstimatorListQuery",
+    "FileMetadata",
     "Model",
+    "ModelListQuery",
     "Request",
+    "RequestBulkResult",
     "RequestCreate",
+    "RequestListQuery",
+    "RequestRows",
+    "RequestRowsQuery",
     "LoadDatasetQuery",
     "LoadModelQuery",
     "LoadEstimatorQuery",
     "NameQuery",
+    "UploadDatasetQuery",
+    "UploadModelQuery",
+    "UploadStart",
+    "UploadStatus",
 ]
@@ -36,3 +36,10 @@ class Algorithm(AlgorithmBase):
 
     #: primary key
     id: int
+
+
+class AlgorithmListQuery(BaseModel):
+    """Filters used to list Algorithm rows"""
+
+    #: Only list algorithms with this python class
+    class_name: str | None = None
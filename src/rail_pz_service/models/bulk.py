@@ -0,0 +1,36 @@
+"""Pydantic models for the bulk create endpoints"""
+
+from pydantic import BaseModel
+
+from .dataset import Dataset
+from .request import Request
+
+
+class BulkError(BaseModel):
+    """An item of a bulk create that could not be created"""
+
+    #: Position of the item in the input list
+    index: int
+
+    #: Why the item could not be created
+    detail: str
+
+
+class DatasetBulkResult(BaseModel):
+    """Outcome of loading many Datasets at once"""
+
+    #: Newly created Datasets, in input order
+    created: list[Dataset]
+
+    #: Items that could not be loaded
+    errors: list[BulkError]
+
+
+class RequestBulkResult(BaseModel):
+    """Outcome of creating many Requests at once"""
+
+    #: Newly created Requests, in input order
+    created: list[Request]
+
+    #: Items that could not be created
+    errors: list[BulkError]
@@ -35,3 +35,10 @@ class CatalogTag(CatalogTagBase):
 
     #: primary key
     id: int
+
+
+class CatalogTagListQuery(BaseModel):
+    """Filters used to list CatalogTag rows"""
+
+    #: Only list catalog tags with this python class
+    class_name: str | None = None
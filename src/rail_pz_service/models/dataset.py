@@ -5,6 +5,30 @@ from typing import ClassVar
 from pydantic import BaseModel, ConfigDict
 
 
+class FileMetadata(BaseModel):
+    """Description of a data file, recorded when it is ingested
+    so that it does not need to be re-opened later
+    """
+
+    #: File layout, e.g., 'hdf5' or 'parquet'
+    layout: str
+
+    #: Size of the file in bytes
+    n_bytes: int
+
+    #: sha256 hex digest of the file contents
+    checksum: str
+
+    #: Number of rows in the main table
+    n_objects: int
+
+    #: Column names and dtypes of the main table
+    columns: dict[str, str] = {}
+
+    #: Number of rows in each table in the file, '' for the top level
+    group_lengths: dict[str, int] = {}
+
+
 class DatasetBase(BaseModel):
     """Dataset parameters that are in DB tables and also used to create new rows"""
 
@@ -59,3 +83,16 @@ class Dataset(DatasetBase):
 
     #: foreign key into catalog_tag table
     catalog_tag_id: int
+
+    #: Description of the file, recorded at ingest (could be None)
+    file_metadata: FileMetadata | None = None
+
+    #: Hash of the contents, used to reuse outputs
+    content_hash: str | None = None
+
+
+class DatasetListQuery(BaseModel):
+    """Filters used to list Dataset rows"""
+
+    #: Only list datasets for this catalog tag
+    catalog_tag_id: int | None = None
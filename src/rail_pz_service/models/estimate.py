@@ -0,0 +1,52 @@
+"""Pydantic model for in-memory estimates"""
+
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class EstimateQuery(BaseModel):
+    """Parameters needed to run an estimator directly on some values"""
+
+    #: Name of the estimator to use
+    estimator_name: str
+
+    #: Input values, one list per column, with one entry per object
+    data: dict[str, list[float]]
+
+    #: Lower edge of the redshift grid for the PDFs
+    zmin: float = 0.0
+
+    #: Upper edge of the redshift grid for the PDFs
+    zmax: float = 3.0
+
+    #: Number of points in the redshift grid for the PDFs
+    nzbins: int = 301
+
+    #: Format of the response, 'json' or 'npz' (binary numpy arrays)
+    output_format: Literal["json", "npz"] = "json"
+
+
+class EstimateResult(BaseModel):
+    """Point estimates and gridded PDFs for a set of objects"""
+
+    #: Name of the estimator used
+    estimator_name: str
+
+    #: Number of objects
+    n_objects: int
+
+    #: Redshift grid the PDFs are evaluated on
+    zgrid: list[float]
+
+    #: Mode of each PDF on the grid
+    zmode: list[float]
+
+    #: Mean of each PDF on the grid
+    zmean: list[float]
+
+    #: Median of each PDF on the grid
+    zmedian: list[float]
+
+    #: PDFs evaluated on the grid, one list per object
+    pdfs: list[list[float]]
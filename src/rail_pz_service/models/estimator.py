@@ -14,6 +14,9 @@ class EstimatorBase(BaseModel):
     #: Configuration parameters for this estimator
     config: dict | None = None
 
+    #: Rows per chunk when running on large files, None to run files as one unit
+    chunk_size: int | None = None
+
 
 class EstimatorCreate(EstimatorBase):
     """Estimator Parameters that are used to create new rows but not in DB tables"""
@@ -49,3 +52,19 @@ class Estimator(EstimatorBase):
 
     #: foreign key into model table
     model_id: int
+
+    #: Hash of the contents, used to reuse outputs
+    content_hash: str | None = None
+
+
+class EstimatorListQuery(BaseModel):
+    """Filters used to list Estimator rows"""
+
+    #: Only list estimators for this algorithm
+    algo_id: int | None = None
+
+    #: Only list estimators for this catalog tag
+    catalog_tag_id: int | None = None
+
+    #: Only list estimators using this model
+    model_id: int | None = None
@@ -53,3 +53,55 @@ class LoadEstimatorQuery(BaseModel):
 
     # configuration paramters
     config: dict | None = None
+
+    # Number of rows per chunk when running on large files
+    chunk_size: int | None = None
+
+
+class UploadStart(BaseModel):
+    """Parameters needed to start uploading a file"""
+
+    #: Name of the file being uploaded, used to keep the suffix
+    filename: str
+
+
+class UploadStatus(BaseModel):
+    """State of a file upload"""
+
+    #: Id of the upload, used to add chunks and to resume
+    upload_id: str
+
+    #: Name of the file being uploaded
+    filename: str
+
+    #: Number of bytes received so far, where the next chunk should start
+    offset: int
+
+
+class UploadDatasetQuery(BaseModel):
+    """Parameters needed to load an uploaded file as a dataset"""
+
+    #: Name for this Dataset, unique
+    name: str
+
+    #: Associated catalog tag name
+    catalog_tag_name: str
+
+    #: sha256 hex digest computed by the client, checked against the server's
+    checksum: str | None = None
+
+
+class UploadModelQuery(BaseModel):
+    """Parameters needed to load an uploaded file as a model"""
+
+    #: Name for this Model, unique
+    name: str
+
+    #: Name of the associated algorithm
+    algo_name: str
+
+    #: Associated catalog tag name
+    catalog_tag_name: str
+
+    #: sha256 hex digest computed by the client, checked against the server's
+    checksum: str | None = None
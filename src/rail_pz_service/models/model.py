@@ -55,3 +55,16 @@ class Model(ModelBase):
 
     #: foreign key into catalog_tag table
     catalog_tag_id: int
+
+    #: sha256 hex digest of the file
+    content_hash: str | None = None
+
+
+class ModelListQuery(BaseModel):
+    """Filters used to list Model rows"""
+
+    #: Only list models for this algorithm
+    algo_id: int | None = None
+
+    #: Only list models for this catalog tag
+    catalog_tag_id: int | None = None
@@ -1,10 +1,12 @@
 """Pydantic model for the Algorithm"""
 
 from datetime import datetime
-from typing import ClassVar
+from typing import Any, ClassVar, Literal
 
 from pydantic import BaseModel, ConfigDict
 
+from ..common.enums import RequestStatusEnum
+
 
 class RequestBase(BaseModel):
     """Request parameters that are in DB tables and also used to create new rows"""
@@ -23,6 +25,31 @@ class RequestCreate(RequestBase):
     dataset_name: str
 
 
+class RequestListQuery(BaseModel):
+    """Filters used to list Request rows"""
+
+    #: Only list requests from this user
+    user: str | None = None
+
+    #: Only list requests for this estimator
+    estimator_id: int | None = None
+
+    #: Only list requests for this dataset
+    dataset_id: int | None = None
+
+    #: Only list requests for this catalog tag
+    catalog_tag_id: int | None = None
+
+    #: Only list requests with this status
+    status: RequestStatusEnum | None = None
+
+    #: Only list requests created at or after this time
+    time_created_after: datetime | None = None
+
+    #: Only list requests created before this time
+    time_created_before: datetime | None = None
+
+
 class Request(RequestBase):
     """Basic processing unit in `rail_pz_service`.  A `Request` to generate
     per-galaxy p(z) for all of the object in a particular `Dataset`
@@ -34,7 +61,8 @@ class Request(RequestBase):
     who intiated the `Request`.
     """
 
-    model_config = ConfigDict(from_attributes=True)
+    # Keep the plain string, so that the yaml output stays readable
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
 
     #: column names to use when printing the table
     col_names_for_table: ClassVar[list[str]] = [
@@ -42,6 +70,7 @@ class Request(RequestBase):
         "user",
         "estimator_id",
         "dataset_id",
+        "status",
         "qp_file_path",
     ]
 
@@ -51,12 +80,18 @@ class Request(RequestBase):
     #: path to the output file
     qp_file_path: str | None = None
 
+    #: sha256 hex digest of the output file
+    qp_file_checksum: str | None = None
+
     #: foreign key into estimator table
     estimator_id: int
 
     #: foreign key into dataset table
     dataset_id: int
 
+    #: where the request is in its processing
+    status: RequestStatusEnum = RequestStatusEnum.queued
+
     #: timestamp of when the request was created in the DB
     time_created: datetime
 
@@ -65,3 +100,52 @@ class Request(RequestBase):
 
     #: timestamp of when the request processing was finished
     time_finished: datetime | None
+
+    #: Id of the worker that claimed this request
+    worker_id: str | None = None
+
+
+class RequestRowsQuery(BaseModel):
+    """Parameters needed to read some of the rows of the output of a `Request`"""
+
+    #: First row to read, defaults to the first row
+    start: int | None = None
+
+    #: One past the last row to read, defaults to the last row
+    stop: int | None = None
+
+    #: Specific rows to read, overrides start and stop
+    indices: list[int] | None = None
+
+    #: What to return, 'ancil' for the point estimates, 'params' for
+    #: the parameters of the qp.Ensemble, 'pdfs' for the PDFs on a grid
+    content: Literal["ancil", "params", "pdfs"] = "ancil"
+
+    #: Lower edge of the redshift grid for the PDFs
+    zmin: float = 0.0
+
+    #: Upper edge of the redshift grid for the PDFs
+    zmax: float = 3.0
+
+    #: Number of points in the redshift grid for the PDFs
+    nzbins: int = 301
+
+    #: Format of the response, 'json', 'npz' (binary numpy arrays)
+    #: or 'arrow' (Arrow IPC stream)
+    output_format: Literal["json", "npz", "arrow"] = "json"
+
+
+class RequestRows(BaseModel):
+    """Some of the rows of the output of a `Request`"""
+
+    #: Id of the request
+    request_id: int
+
+    #: Indices of the rows in the output file
+    rows: list[int]
+
+    #: Values shared by all the rows, e.g., the redshift grid
+    meta: dict[str, list[Any]] = {}
+
+    #: Per-row values, one list per column with one entry per row
+    columns: dict[str, list[Any]]
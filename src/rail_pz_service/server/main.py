@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
@@ -8,7 +9,7 @@ from safir.dependencies.http_client import http_client_dependency
 from safir.logging import configure_logging, configure_uvicorn_logging
 from safir.middleware.x_forwarded import XForwardedMiddleware
 
-from .. import __version__
+from .. import __version__, db
 from ..config import config
 from .logging import LOGGER
 from .routers import (
@@ -37,6 +38,11 @@ tags_metadata = [
         "description": "Operations with `Request`s. A `Request` runs a single `Estimator` or a single "
         "`Dataset` and keeps track of the resulting data products.",
     },
+    {
+        "name": "Estimate",
+        "description": "Run an `Estimator` directly on a few objects and get the p(z) back in the "
+        "response, without making any `Dataset` or `Request`.",
+    },
     {
         "name": "Algorithm",
         "description": "Operations with `Algorithms`s. An `Algorithm` is a particular python class "
@@ -88,6 +94,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     yield
 
     # Dependency cleanups after app is finished
+    await asyncio.to_thread(db.Cache.shared_cache(logger).shutdown)
     await db_session_dependency.aclose()
     await http_client_dependency.aclose()
 
@@ -22,7 +22,7 @@ router = APIRouter(
 
 
 # Attach functions to the router
-get_rows = wrappers.get_list_function(router, ResponseModelClass, DbClass)
+get_rows = wrappers.get_list_function(router, ResponseModelClass, DbClass, models.CatalogTagListQuery)
 get_row = wrappers.get_row_function(router, ResponseModelClass, DbClass)
 get_row_by_name = wrappers.get_row_by_name_function(router, ResponseModelClass, DbClass)
 
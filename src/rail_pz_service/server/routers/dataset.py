@@ -22,7 +22,7 @@ router = APIRouter(
 
 
 # Attach functions to the router
-get_rows = wrappers.get_list_function(router, ResponseModelClass, DbClass)
+get_rows = wrappers.get_list_function(router, ResponseModelClass, DbClass, models.DatasetListQuery)
 get_row = wrappers.get_row_function(router, ResponseModelClass, DbClass)
 get_row_by_name = wrappers.get_row_by_name_function(router, ResponseModelClass, DbClass)
 
@@ -30,4 +30,4 @@ get_requests = wrappers.get_row_attribute_list_function(
     router, ResponseModelClass, DbClass, "requests_", models.Request
 )
 
-download = wrappers.download_file_function(router, DbClass, "path")
+download = wrappers.download_file_function(router, DbClass, "path", "content_hash")
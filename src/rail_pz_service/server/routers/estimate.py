@@ -0,0 +1,90 @@
+"""http routers for running estimators directly on input values"""
+
+import io
+
+import numpy as np
+import qp
+from fastapi import APIRouter, Depends, HTTPException, Response
+from safir.dependencies.db_session import db_session_dependency
+from sqlalchemy.ext.asyncio import async_scoped_session
+from structlog import get_logger
+
+from ... import db, models
+from ...common.errors import (
+    RAILBadInputError,
+    RAILMissingIDError,
+    RAILMissingNameError,
+)
+from ...config import config
+
+logger = get_logger(__name__)
+
+# Specify the tag in the router documentation
+TAG_STRING = "Estimate"
+
+
+# Build the router
+router = APIRouter(
+    prefix="/estimate",
+    tags=[TAG_STRING],
+)
+
+
+def _summarize(qp_dist: qp.Ensemble, zgrid: np.ndarray) -> dict[str, np.ndarray]:
+    """Evaluate the PDFs and point estimates on a grid"""
+    pdfs = np.atleast_2d(qp_dist.pdf(zgrid))
+    norms = pdfs.sum(axis=1)
+    safe_norms = np.where(norms > 0, norms, 1.0)
+    cdfs = np.cumsum(pdfs, axis=1) / safe_norms[:, np.newaxis]
+    median_idx = np.minimum((cdfs < 0.5).sum(axis=1), zgrid.size - 1)
+    return dict(
+        zgrid=zgrid,
+        zmode=zgrid[np.argmax(pdfs, axis=1)],
+        zmean=(pdfs * zgrid).sum(axis=1) / safe_norms,
+        zmedian=zgrid[median_idx],
+        pdfs=pdfs,
+    )
+
+
+@router.post(
+    "",
+    response_model=models.EstimateResult,
+    summary="Run an estimator on some values and return the p(z) in the response",
+    responses={200: {"content": {"application/octet-stream": {}}}},
+)
+async def estimate(
+    query: models.EstimateQuery,
+    session: async_scoped_session = Depends(db_session_dependency),
+) -> models.EstimateResult | Response:
+    the_cache = db.Cache.shared_cache(logger)
+    try:
+        n_objects = len(next(iter(query.data.values()), []))
+        if n_objects > config.asgi.estimate_max_objects:
+            raise RAILBadInputError(
+                f"Too many objects {n_objects} > {config.asgi.estimate_max_objects}, use a Dataset instead"
+            )
+        estimator_ = await db.Estimator.get_row_by_name(session, query.estimator_name)
+        # No Dataset or Request rows, and no files, just the warm estimator
+        qp_dist = await the_cache.estimate_values(session, estimator_.id, query.data)
+        summary = _summarize(qp_dist, np.linspace(query.zmin, query.zmax, query.nzbins))
+    except (RAILMissingNameError, RAILMissingIDError) as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=404, detail=str(msg)) from msg
+    except RAILBadInputError as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=400, detail=str(msg)) from msg
+    except Exception as msg:
+        logger.error(msg, exc_info=True)
+        raise HTTPException(status_code=500, detail=str(msg)) from msg
+
+    if query.output_format == "npz":
+        buffer = io.BytesIO()
+        arrays: dict[str, np.ndarray] = {key: value.astype(np.float32) for key, value in summary.items()}
+        np.savez(buffer, allow_pickle=False, **arrays)
+        return Response(content=buffer.getvalue(), media_type="application/octet-stream")
+
+    return models.EstimateResult(
+        estimator_name=query.estimator_name,
+        n_objects=qp_dist.npdf,
+        **{key: value.tolist() for key, value in summary.items()},
+    )
@@ -24,7 +24,7 @@ router = APIRouter(
 # Attach functions to the router
 
 #: geat all the rows
-get_rows = wrappers.get_list_function(router, ResponseModelClass, DbClass)
+get_rows = wrappers.get_list_function(router, ResponseModelClass, DbClass, models.EstimatorListQuery)
 
 #: get a row
 get_row = wrappers.get_row_function(router, ResponseModelClass, DbClass)
@@ -1,15 +1,29 @@
 """http routers for managing Step tables"""
 
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from anyio import open_file
+from fastapi import APIRouter, Depends, HTTPException, Request
 from safir.dependencies.db_session import db_session_dependency
 from sqlalchemy.ext.asyncio import async_scoped_session
 from structlog import get_logger
 
 from ... import db, models
 from ...common.errors import (
+    RAILChecksumError,
     RAILMissingIDError,
     RAILMissingNameError,
 )
+from ...common.hashing import file_content_hash
+from ...config import config
 
 logger = get_logger(__name__)
 
@@ -54,6 +68,33 @@ async def load_dataset(
         raise HTTPException(status_code=500, detail=str(msg)) from msg
 
 
+@router.post(
+    "/datasets",
+    response_model=models.DatasetBulkResult,
+    summary="Load many datasets into the server in one go",
+)
+async def load_datasets(
+    queries: list[models.LoadDatasetQuery],
+    session: async_scoped_session = Depends(db_session_dependency),
+) -> models.DatasetBulkResult:
+    the_cache = db.Cache.shared_cache(logger)
+    try:
+        created, errors = await the_cache.load_datasets(
+            session,
+            [query.model_dump() for query in queries],
+        )
+        result = models.DatasetBulkResult(
+            created=[models.Dataset.model_validate(row) for _, row in created],
+            errors=[models.BulkError(index=idx, detail=detail) for idx, detail in errors],
+        )
+        await session.commit()
+        return result
+    except Exception as msg:
+        logger.error(msg, exc_info=True)
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(msg)) from msg
+
+
 @router.post(
     "/model",
     response_model=models.Model,
@@ -100,3 +141,297 @@ async def load_estimator(
     except Exception as msg:
         logger.error(msg, exc_info=True)
         raise HTTPException(status_code=500, detail=str(msg)) from msg
+
+
+class _UploadState:
+    """What this server process knows about an upload in progress"""
+
+    def __init__(self, digest: Any = None) -> None:
+        # Serializes the chunks, so that two of them can not both be appended
+        self.lock = asyncio.Lock()
+        # sha256 of the first `n_hashed` bytes, None if some chunks
+        # went to another server process
+        self.digest = digest
+        self.n_hashed = 0
+
+
+# Uploads seen by this process, keyed by upload id
+_uploads: dict[str, _UploadState] = {}
+
+
+async def _upload_state(upload_id: str) -> _UploadState:
+    """Return the state of an upload
+
+    Raises
+    ------
+    RAILMissingIDError
+        No upload with this id
+    """
+    state = _uploads.get(upload_id)
+    if state is not None:
+        return state
+    # The upload might have been started by another server process,
+    # but only keep track of the ones that exist
+    await asyncio.to_thread(_upload_dir, upload_id)
+    return _uploads.setdefault(upload_id, _UploadState())
+
+
+def _upload_dir(upload_id: str) -> str:
+    """Return the directory holding an upload
+
+    Raises
+    ------
+    RAILMissingIDError
+        No upload with this id
+    """
+    upload_dir = os.path.join(config.storage.import_area, "uploads", upload_id)
+    if not re.fullmatch("[0-9a-f]{32}", upload_id) or not os.path.isdir(upload_dir):
+        raise RAILMissingIDError(f"Upload {upload_id} not found")
+    return upload_dir
+
+
+def _upload_status(upload_id: str) -> tuple[str, models.UploadStatus]:
+    """Return the path to an uploaded file and the state of the upload"""
+    upload_dir = _upload_dir(upload_id)
+    filename = os.listdir(upload_dir)[0]
+    upload_path = os.path.join(upload_dir, filename)
+    return upload_path, models.UploadStatus(
+        upload_id=upload_id,
+        filename=filename,
+        offset=os.path.getsize(upload_path),
+    )
+
+
+def _expire_uploads(max_age: float, busy: set[str]) -> list[str]:
+    """Remove the uploads that have not received a chunk for `max_age` seconds
+
+    Returns the ids of the removed uploads
+    """
+    uploads_dir = os.path.join(config.storage.import_area, "uploads")
+    if not os.path.isdir(uploads_dir):
+        return []
+    expired: list[str] = []
+    now = time.time()
+    for upload_id in os.listdir(uploads_dir):
+        if upload_id in busy:
+            continue
+        upload_dir = os.path.join(uploads_dir, upload_id)
+        try:
+            # Each chunk touches the file, so its mtime is the last activity
+            last_active = max(
+                [os.path.getmtime(upload_dir)]
+                + [os.path.getmtime(os.path.join(upload_dir, name)) for name in os.listdir(upload_dir)]
+            )
+        except OSError:
+            continue
+        if now - last_active > max_age:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            expired.append(upload_id)
+    return expired
+
+
+async def _remove_upload(upload_id: str) -> None:
+    """Remove an upload, the caller should hold its lock"""
+    upload_dir = await asyncio.to_thread(_upload_dir, upload_id)
+    await asyncio.to_thread(shutil.rmtree, upload_dir)
+    _uploads.pop(upload_id, None)
+
+
+async def _finish_upload(upload_id: str, checksum: str | None) -> tuple[str, str]:
+    """Check the hash of an uploaded file against what the client sent,
+    the caller should hold its lock
+
+    Returns the path to the file and its sha256 hex digest
+    """
+    upload_path, status = await asyncio.to_thread(_upload_status, upload_id)
+    state = await _upload_state(upload_id)
+    if state.digest is not None and state.n_hashed == status.offset:
+        server_checksum = state.digest.hexdigest()
+    else:
+        # We did not see all the chunks, so hash the file itself
+        server_checksum = await asyncio.to_thread(file_content_hash, upload_path)
+    if checksum is not None and checksum != server_checksum:
+        raise RAILChecksumError(f"Upload {upload_id} has checksum {server_checksum} != {checksum}")
+    return upload_path, server_checksum
+
+
+@router.post(
+    "/upload",
+    response_model=models.UploadStatus,
+    summary="Start uploading a file to the server",
+)
+async def start_upload(
+    query: models.UploadStart,
+) -> models.UploadStatus:
+    if config.storage.upload_ttl is not None:
+        busy = {upload_id for upload_id, state in _uploads.items() if state.lock.locked()}
+        for expired_id in await asyncio.to_thread(_expire_uploads, config.storage.upload_ttl, busy):
+            logger.info(f"Removed abandoned upload {expired_id}")
+            _uploads.pop(expired_id, None)
+
+    upload_id = uuid.uuid4().hex
+    filename = os.path.basename(query.filename) or "upload"
+    upload_dir = os.path.join(config.storage.import_area, "uploads", upload_id)
+    await asyncio.to_thread(os.makedirs, upload_dir)
+    async with await open_file(os.path.join(upload_dir, filename), "wb"):
+        pass
+    _uploads[upload_id] = _UploadState(hashlib.sha256())
+    return models.UploadStatus(upload_id=upload_id, filename=filename, offset=0)
+
+
+@router.get(
+    "/upload/{upload_id}",
+    response_model=models.UploadStatus,
+    summary="Get the state of an upload, e.g., to resume it",
+)
+async def get_upload(
+    upload_id: str,
+) -> models.UploadStatus:
+    try:
+        return (await asyncio.to_thread(_upload_status, upload_id))[1]
+    except RAILMissingIDError as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=404, detail=str(msg)) from msg
+
+
+@router.put(
+    "/upload/{upload_id}",
+    response_model=models.UploadStatus,
+    summary="Add a chunk to an upload, the request body is the raw bytes",
+)
+async def put_upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+) -> models.UploadStatus:
+    try:
+        state = await _upload_state(upload_id)
+    except RAILMissingIDError as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=404, detail=str(msg)) from msg
+
+    async with state.lock:
+        # Check where the file is only once no other chunk is being written
+        try:
+            upload_path, status = await asyncio.to_thread(_upload_status, upload_id)
+        except RAILMissingIDError as msg:
+            logger.info(msg)
+            raise HTTPException(status_code=404, detail=str(msg)) from msg
+
+        if offset != status.offset:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload {upload_id} is at offset {status.offset}, not {offset}",
+            )
+
+        # Keep hashing as the chunks arrive, as long as we have seen all of them
+        digest = None
+        if state.digest is not None and state.n_hashed == status.offset:
+            digest = state.digest.copy()
+
+        # Write the body as it arrives, so that it is never all in memory
+        n_bytes = status.offset
+        async with await open_file(upload_path, "ab") as fout:
+            async for block in request.stream():
+                n_bytes += len(block)
+                if n_bytes > config.asgi.max_upload_size:
+                    await fout.truncate(status.offset)
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload {upload_id} is larger than {config.asgi.max_upload_size} bytes",
+                    )
+                if digest is not None:
+                    digest.update(block)
+                await fout.write(block)
+        state.digest = digest
+        state.n_hashed = n_bytes
+
+    status.offset = n_bytes
+    return status
+
+
+@router.delete(
+    "/upload/{upload_id}",
+    status_code=204,
+    summary="Abandon an upload",
+)
+async def delete_upload(
+    upload_id: str,
+) -> None:
+    try:
+        async with (await _upload_state(upload_id)).lock:
+            await _remove_upload(upload_id)
+    except RAILMissingIDError as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=404, detail=str(msg)) from msg
+
+
+@router.post(
+    "/upload/{upload_id}/dataset",
+    response_model=models.Dataset,
+    summary="Load an uploaded file into the server as a dataset",
+)
+async def load_uploaded_dataset(
+    upload_id: str,
+    query: models.UploadDatasetQuery,
+    session: async_scoped_session = Depends(db_session_dependency),
+) -> db.Dataset:
+    the_cache = db.Cache.shared_cache(logger)
+    try:
+        async with (await _upload_state(upload_id)).lock:
+            upload_path, checksum = await _finish_upload(upload_id, query.checksum)
+            new_dataset = await the_cache.load_dataset_from_file(
+                session,
+                name=query.name,
+                path=Path(upload_path),
+                catalog_tag_name=query.catalog_tag_name,
+                checksum=checksum,
+            )
+            # Keep the upload around on failure, so that the load can be retried
+            await _remove_upload(upload_id)
+        return new_dataset
+    except (RAILMissingNameError, RAILMissingIDError) as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=404, detail=str(msg)) from msg
+    except RAILChecksumError as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=400, detail=str(msg)) from msg
+    except Exception as msg:
+        logger.error(msg, exc_info=True)
+        raise HTTPException(status_code=500, detail=str(msg)) from msg
+
+
+@router.post(
+    "/upload/{upload_id}/model",
+    response_model=models.Model,
+    summary="Load an uploaded file into the server as a model",
+)
+async def load_uploaded_model(
+    upload_id: str,
+    query: models.UploadModelQuery,
+    session: async_scoped_session = Depends(db_session_dependency),
+) -> db.Model:
+    the_cache = db.Cache.shared_cache(logger)
+    try:
+        async with (await _upload_state(upload_id)).lock:
+            upload_path, checksum = await _finish_upload(upload_id, query.checksum)
+            new_model = await the_cache.load_model_from_file(
+                session,
+                name=query.name,
+                path=Path(upload_path),
+                algo_name=query.algo_name,
+                catalog_tag_name=query.catalog_tag_name,
+                checksum=checksum,
+            )
+            # Keep the upload around on failure, so that the load can be retried
+            await _remove_upload(upload_id)
+        return new_model
+    except (RAILMissingNameError, RAILMissingIDError) as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=404, detail=str(msg)) from msg
+    except RAILChecksumError as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=400, detail=str(msg)) from msg
+    except Exception as msg:
+        logger.error(msg, exc_info=True)
+        raise HTTPException(status_code=500, detail=str(msg)) from msg
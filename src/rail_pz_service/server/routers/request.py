@@ -1,15 +1,24 @@
 """http routers for managing Step tables"""
 
-from fastapi import APIRouter, Depends, HTTPException
+import io
+import json
+
+import numpy as np
+import pyarrow as pa
+import qp
+from fastapi import APIRouter, Depends, HTTPException, Response
 from safir.dependencies.db_session import db_session_dependency
 from sqlalchemy.ext.asyncio import async_scoped_session
 from structlog import get_logger
 
 from ... import db, models
 from ...common.errors import (
+    RAILBadInputError,
     RAILMissingIDError,
     RAILMissingNameError,
+    RAILRequestNotDoneError,
 )
+from ...config import config
 from . import wrappers
 
 logger = get_logger(__name__)
@@ -32,13 +41,71 @@ router = APIRouter(
 
 
 # Attach functions to the router
-get_rows = wrappers.get_list_function(router, ResponseModelClass, DbClass)
+get_rows = wrappers.get_list_function(router, ResponseModelClass, DbClass, models.RequestListQuery)
 get_row = wrappers.get_row_function(router, ResponseModelClass, DbClass)
 get_row_by_name = wrappers.get_row_by_name_function(router, ResponseModelClass, DbClass)
 
 create = wrappers.create_row_function(router, ResponseModelClass, models.RequestCreate, DbClass)
 delete = wrappers.delete_row_function(router, DbClass)
-download = wrappers.download_file_function(router, DbClass, "qp_file_path")
+download = wrappers.download_file_function(router, DbClass, "qp_file_path", "qp_file_checksum")
+
+
+def _extract_rows(
+    qp_dist: qp.Ensemble,
+    query: models.RequestRowsQuery,
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    """Pull the shared and per-row arrays asked for out of an ensemble"""
+    if query.content == "pdfs":
+        zgrid = np.linspace(query.zmin, query.zmax, query.nzbins)
+        return dict(zgrid=zgrid), dict(pdfs=np.atleast_2d(qp_dist.pdf(zgrid)))
+    if query.content == "params":
+        meta = {
+            key: np.char.decode(value) if value.dtype.kind == "S" else value
+            for key, value in qp_dist.metadata().items()
+        }
+        return meta, dict(qp_dist.objdata())
+    return {}, dict(qp_dist.ancil or {})
+
+
+def _to_arrow(rows: np.ndarray, meta: dict[str, np.ndarray], columns: dict[str, np.ndarray]) -> bytes:
+    """Write the rows as an Arrow IPC stream, shared arrays go in the metadata"""
+    arrays = {"row": pa.array(rows)}
+    for key, value in columns.items():
+        if value.ndim == 1:
+            arrays[key] = pa.array(value)
+        else:
+            flat = value.reshape(len(value), -1)
+            arrays[key] = pa.FixedSizeListArray.from_arrays(pa.array(flat.ravel()), flat.shape[1])
+    table = pa.table(arrays).replace_schema_metadata(
+        {key: json.dumps(value.tolist()) for key, value in meta.items()}
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+@router.post(
+    "/create_many",
+    response_model=models.RequestBulkResult,
+    summary="Create many requests in one go",
+)
+async def create_many(
+    rows_create: list[models.RequestCreate],
+    session: async_scoped_session = Depends(db_session_dependency),
+) -> models.RequestBulkResult:
+    try:
+        created, errors = await DbClass.create_rows(session, [row.model_dump() for row in rows_create])
+        result = models.RequestBulkResult(
+            created=[ResponseModelClass.model_validate(row) for _, row in created],
+            errors=[models.BulkError(index=idx, detail=detail) for idx, detail in errors],
+        )
+        await session.commit()
+        return result
+    except Exception as msg:
+        logger.error(msg, exc_info=True)
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(msg)) from msg
 
 
 @router.post(
@@ -64,3 +131,61 @@ async def run_request(
     except Exception as msg:
         logger.error(msg, exc_info=True)
         raise HTTPException(status_code=500, detail=str(msg)) from msg
+
+
+@router.post(
+    "/rows/{row_id}",
+    response_model=models.RequestRows,
+    summary="Read some of the rows of the output of a particular request",
+    responses={
+        200: {"content": {"application/octet-stream": {}, "application/vnd.apache.arrow.stream": {}}},
+    },
+)
+async def get_request_rows(
+    row_id: int,
+    query: models.RequestRowsQuery,
+    session: async_scoped_session = Depends(db_session_dependency),
+) -> models.RequestRows | Response:
+    the_cache = db.Cache.shared_cache(logger)
+    try:
+        rows, qp_dist = await the_cache.get_qp_rows(
+            session,
+            row_id,
+            start=query.start,
+            stop=query.stop,
+            indices=query.indices,
+            max_rows=config.asgi.rows_max_objects,
+        )
+        meta, columns = _extract_rows(qp_dist, query)
+    except (RAILMissingNameError, RAILMissingIDError) as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=404, detail=str(msg)) from msg
+    except RAILBadInputError as msg:
+        logger.info(msg)
+        raise HTTPException(status_code=400, detail=str(msg)) from msg
+    except RAILRequestNotDoneError as msg:
+        # Reading rows never starts the estimation, that is up to the worker
+        logger.info(msg)
+        raise HTTPException(status_code=409, detail=str(msg)) from msg
+    except Exception as msg:
+        logger.error(msg, exc_info=True)
+        raise HTTPException(status_code=500, detail=str(msg)) from msg
+
+    if query.output_format == "npz":
+        buffer = io.BytesIO()
+        arrays: dict[str, np.ndarray] = dict(rows=rows, **meta, **columns)
+        np.savez(buffer, allow_pickle=False, **arrays)
+        return Response(content=buffer.getvalue(), media_type="application/octet-stream")
+
+    if query.output_format == "arrow":
+        return Response(
+            content=_to_arrow(rows, meta, columns),
+            media_type="application/vnd.apache.arrow.stream",
+        )
+
+    return models.RequestRows(
+        request_id=row_id,
+        rows=rows.tolist(),
+        meta={key: value.tolist() for key, value in meta.items()},
+        columns={key: value.tolist() for key, value in columns.items()},
+    )
@@ -4,6 +4,7 @@ from . import (
     algorithm,
     catalog_tag,
     dataset,
+    estimate,
     estimator,
     load,
     model,
@@ -16,6 +17,7 @@ router = APIRouter(
 
 router.include_router(load.router)
 router.include_router(request.router)
+router.include_router(estimate.router)
 
 router.include_router(algorithm.router)
 router.include_router(catalog_tag.router)
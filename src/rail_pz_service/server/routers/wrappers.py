@@ -8,10 +8,13 @@ These make it easier to define router functions that
 apply to all RowMixin, NodeMixin and ElementMixin classes.
 """
 
+import asyncio
+import os
 from collections.abc import Callable, Sequence
-from typing import TypeAlias
+from email.utils import parsedate_to_datetime
+from typing import Literal, TypeAlias
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from safir.dependencies.db_session import db_session_dependency
@@ -20,6 +23,7 @@ from structlog import get_logger
 
 from ... import db
 from ...common.errors import (
+    RAILBadInputError,
     RAILMissingIDError,
     RAILMissingNameError,
 )
@@ -31,12 +35,14 @@ def get_list_function(
     router: APIRouter,
     response_model_class: TypeAlias = BaseModel,
     db_class: TypeAlias = db.RowMixin,
+    list_query_class: TypeAlias = BaseModel,
 ) -> Callable:
     """Return a function that gets all the rows from a table
     and attaches that function to a router.
 
-    This version will provide a function that always returns
-    all the rows
+    This version will provide a function that returns a page of the
+    matching rows, ordered by id.  Clients page through the table
+    by passing the id of the last row they got as `after`.
 
     Parameters
     ----------
@@ -49,6 +55,9 @@ def get_list_function(
     db_class
         Underlying database class
 
+    list_query_class
+        Pydantic class with the filters, passed as query parameters
+
     Returns
     -------
     Callable
@@ -63,6 +72,9 @@ def get_list_function(
     async def get_rows(
         skip: int = 0,
         limit: int = 100,
+        after: int | None = None,
+        order: Literal["asc", "desc"] = "asc",
+        filters: list_query_class = Depends(),
         session: async_scoped_session = Depends(db_session_dependency),
     ) -> Sequence[response_model_class]:
         """Return all the rows
@@ -75,6 +87,15 @@ def get_list_function(
         limit
             Number of rows to list
 
+        after
+            Only return rows after this id, i.e., the last id of the previous page
+
+        order
+            'asc' or 'desc', order of the rows by id
+
+        filters
+            Only return rows matching these
+
         session
             Database session
 
@@ -84,7 +105,19 @@ def get_list_function(
         """
         try:
             async with session.begin():
-                return await db_class.get_rows(session, skip=skip, limit=limit)
+                return await db_class.get_rows(
+                    session,
+                    skip=skip,
+                    limit=limit,
+                    after=after,
+                    descending=order == "desc",
+                    **filters.model_dump(exclude_none=True),
+                )
+        except RAILBadInputError as msg:
+            logger.info(msg)
+            await session.close()
+            await session.remove()
+            raise HTTPException(status_code=400, detail=str(msg)) from msg
         except Exception as msg:
             logger.error(msg, exc_info=True)
             await session.close()
@@ -358,13 +391,36 @@ def create_row_function(
     return create_row
 
 
+def _not_modified(request: Request, response: FileResponse) -> bool:
+    """Check the conditional GET headers against a file response"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence, and uses the weak comparison
+        etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+        return "*" in etags or response.headers["etag"].removeprefix("W/") in etags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(response.headers["last-modified"]) <= since
+    return False
+
+
 def download_file_function(
     router: APIRouter,
     db_class: TypeAlias = db.RowMixin,
     attr_name: str = "",
+    checksum_attr: str | None = None,
 ) -> Callable:
     """Return a function gets collection names associated to a Node.
 
+    The response has Last-Modified and ETag headers, the ETag is the
+    stored checksum if there is one, answers conditional GETs with 304,
+    and serves byte ranges.
+
     Parameters
     ----------
     router: APIRouter
@@ -376,28 +432,37 @@ def download_file_function(
     attr_name
         Requested attribute
 
+    checksum_attr
+        Attribute with the sha256 of the file, if any.  It is also sent
+        in the `X-Checksum-Sha256` header
+
     Returns
     -------
     Callable
         Function that gets the collection names associated to a Node
     """
 
-    @router.get(
+    @router.api_route(
         "/download/{row_id}",
+        methods=["GET", "HEAD"],
         summary="Downlaod a file",
     )
     async def download_file(
         row_id: int,
         filename: str,
+        request: Request,
         session: async_scoped_session = Depends(db_session_dependency),
-    ) -> FileResponse:
+    ) -> Response:
         try:
             async with session.begin():
                 the_node = await db_class.get_row(session, row_id)
                 await session.refresh(the_node, attribute_names=[attr_name])
                 the_path = getattr(the_node, attr_name)
-            return FileResponse(path=the_path, filename=filename)
-        except RAILMissingIDError as msg:
+                checksum = getattr(the_node, checksum_attr) if checksum_attr else None
+            if the_path is None:
+                raise RAILMissingIDError(f"No file for {db_class.class_string} {row_id}")
+            stat_result = await asyncio.to_thread(os.stat, the_path)
+        except (RAILMissingIDError, FileNotFoundError) as msg:
             logger.info(msg)
             await session.close()
             await session.remove()
@@ -408,4 +473,20 @@ def download_file_function(
             await session.remove()
             raise HTTPException(status_code=500, detail=str(msg)) from msg
 
+        headers: dict[str, str] = {}
+        if checksum:
+            # Strong validator, the same bytes always give the same ETag
+            headers["etag"] = f'"{checksum}"'
+            headers["x-checksum-sha256"] = checksum
+        # FileResponse adds Last-Modified and a fallback ETag, and handles Range
+        response = FileResponse(path=the_path, filename=filename, headers=headers, stat_result=stat_result)
+        if _not_modified(request, response):
+            not_modified_headers = {
+                key: value
+                for key, value in response.headers.items()
+                if key in ("etag", "last-modified", "x-checksum-sha256", "content-location")
+            }
+            return Response(status_code=304, headers=not_modified_headers)
+        return response
+
     return download_file
@@ -1,13 +1,15 @@
+import asyncio
+import hashlib
 import os
 import traceback
+import uuid
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, cast
 
 import numpy as np
-from anyio import open_file
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, UploadFile
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -15,12 +17,18 @@ from pydantic import BaseModel
 from safir.dependencies.db_session import db_session_dependency
 from safir.dependencies.http_client import http_client_dependency
 from safir.logging import configure_uvicorn_logging
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import async_scoped_session
+from sqlalchemy.orm import joinedload, selectinload
+from starlette.datastructures import FormData, Headers
+from starlette.formparsers import MultiPartException, MultiPartParser
 
 from .. import db, models
+from ..common.errors import RAILBadDatasetError, RAILFileNotFoundError
 from ..config import config
+from ..db.ingest import read_file_metadata
 from .logging import LOGGER
-from .routers.load import load_dataset, load_estimator, load_model
+from .routers.load import load_dataset, load_estimator
 from .routers.request import create as create_request
 from .routers.request import run_request
 
@@ -60,6 +68,24 @@ router = APIRouter(
 
 web_app.mount("/static", StaticFiles(directory=str(Path(BASE_DIR, "static"))), name="static")
 
+# Loader options to fetch the rows that a row points to in the same query,
+# later `get_row` calls for those rows are then served from the session
+ESTIMATOR_LOAD_OPTIONS = (
+    joinedload(db.Estimator.model_),
+    joinedload(db.Estimator.algo_),
+    joinedload(db.Estimator.catalog_tag_),
+)
+
+MODEL_LOAD_OPTIONS = (
+    joinedload(db.Model.algo_),
+    joinedload(db.Model.catalog_tag_),
+)
+
+REQUEST_LOAD_OPTIONS = (
+    joinedload(db.Request.dataset_),
+    joinedload(db.Request.estimator_).options(*ESTIMATOR_LOAD_OPTIONS),
+)
+
 
 async def _parse_request(
     session: async_scoped_session,
@@ -85,9 +111,11 @@ async def _parse_request(
         "data",
     ]
 
+    id_properties = [f"{field_}_id" for field_ in field_names]
+
     properties = []
     properties += extra_properties
-    properties += [f"{field_}_id" for field_ in field_names]
+    properties += id_properties
     properties += [f"{field_}_name" for field_ in field_names]
 
     params: dict[str, Any] = {}
@@ -97,7 +125,18 @@ async def _parse_request(
     }
 
     if use_form:
-        form_data = await request.form()
+        # Refuse oversized uploads before the form parser spools them to disk
+        content_length = request.headers.get("content-length")
+        try:
+            n_bytes = int(content_length) if content_length is not None else 0
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Bad Content-Length {content_length}") from e
+        if n_bytes > config.asgi.max_upload_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload of {content_length} bytes is larger than {config.asgi.max_upload_size}",
+            )
+        form_data = await _read_form(request)
         for field_ in properties:
             test_val = form_data.get(field_, request.query_params.get(field_))
             if test_val is not None:
@@ -111,22 +150,32 @@ async def _parse_request(
             if test_val is not None:
                 orig_context.setdefault(field_, test_val)
 
+    # Ids need to be ints to find rows that are already in the session
+    for id_property_ in id_properties:
+        id_value = orig_context.get(id_property_)
+        if id_value is not None:
+            orig_context[id_property_] = int(id_value)
+
+    # Each step eagerly loads the rows it points to, so walking up from
+    # a Request to its CatalogTag takes a single query
     request_id = orig_context.get("request_id")
     if request_id is not None:
-        request_ = await db.Request.get_row(session, request_id)
+        request_ = await db.Request.get_row(session, request_id, options=REQUEST_LOAD_OPTIONS)
         params["my_request"] = request_
         orig_context["dataset_id"] = request_.dataset_id
         orig_context["estimator_id"] = request_.estimator_id
 
     dataset_id = orig_context.get("dataset_id")
     if dataset_id is not None:
-        dataset_ = await db.Dataset.get_row(session, dataset_id)
+        dataset_ = await db.Dataset.get_row(
+            session, dataset_id, options=[joinedload(db.Dataset.catalog_tag_)]
+        )
         params["dataset"] = dataset_
         orig_context["catalog_tag_id"] = dataset_.catalog_tag_id
 
     estimator_id = orig_context.get("estimator_id")
     if estimator_id is not None:
-        estimator_ = await db.Estimator.get_row(session, estimator_id)
+        estimator_ = await db.Estimator.get_row(session, estimator_id, options=ESTIMATOR_LOAD_OPTIONS)
         params["estimator"] = estimator_
         orig_context["catalog_tag_id"] = estimator_.catalog_tag_id
         orig_context["algo_id"] = estimator_.algo_id
@@ -134,7 +183,7 @@ async def _parse_request(
 
     model_id = orig_context.get("model_id")
     if model_id is not None:
-        model_ = await db.Model.get_row(session, model_id)
+        model_ = await db.Model.get_row(session, model_id, options=MODEL_LOAD_OPTIONS)
         params["model"] = model_
         orig_context["catalog_tag_id"] = model_.catalog_tag_id
         orig_context["algo_id"] = model_.algo_id
@@ -210,10 +259,15 @@ async def _make_request_context(
     found_request: db.Request | None = None
 
     if dataset_ is not None:
-        await session.refresh(dataset_, attribute_names=["requests_"])
+        # One query for the requests and their estimators, however many there are
+        q_requests = (
+            select(db.Request)
+            .where(db.Request.dataset_id == dataset_.id)
+            .options(joinedload(db.Request.estimator_))
+        )
         selected_request_map: dict[str, db.Request] = {}
-        for request_ in dataset_.requests_:
-            estimator_ = await db.Estimator.get_row(session, request_.estimator_id)
+        for request_ in (await session.scalars(q_requests)).all():
+            estimator_ = request_.estimator_
             selected_request_map[estimator_.name] = request_
             if "my_request" not in kwargs:
                 if "estimator" in kwargs and kwargs["estimator"].id == estimator_.id:
@@ -222,12 +276,22 @@ async def _make_request_context(
         selected_request_map = {}
 
     if catalog_tag_ is not None:
-        await session.refresh(catalog_tag_, attribute_names=["estimators_", "models_", "datasets_"])
+        q_catalog_tag = (
+            select(db.CatalogTag)
+            .where(db.CatalogTag.id == catalog_tag_.id)
+            .options(
+                selectinload(db.CatalogTag.estimators_),
+                selectinload(db.CatalogTag.models_),
+                selectinload(db.CatalogTag.datasets_),
+            )
+            .execution_options(populate_existing=True)
+        )
+        catalog_tag_ = (await session.scalars(q_catalog_tag)).one()
         selected_datasets = catalog_tag_.datasets_
         selected_models = catalog_tag_.models_
         if model_ is not None:
-            await session.refresh(model_, attribute_names=["estimators_"])
-            selected_estimators = model_.estimators_
+            q_estimators = select(db.Estimator).where(db.Estimator.model_id == model_.id)
+            selected_estimators = list((await session.scalars(q_estimators)).all())
         else:
             selected_estimators = catalog_tag_.estimators_
     else:
@@ -235,7 +299,7 @@ async def _make_request_context(
         selected_models = []
         selected_estimators = []
 
-    context = dict(
+    context: dict[str, Any] = dict(
         all_catalog_tags=all_catalog_tags,
         all_algos=all_algos,
         all_models=all_models,
@@ -267,6 +331,128 @@ async def _get_request_context(
     return context
 
 
+class _ImportAreaFile:
+    """Where the web app writes an uploaded file, directly in the import area
+
+    The bytes are counted and hashed as they arrive, so that oversized
+    uploads are refused early and the file is never read again for its
+    checksum.  `write` is called from a worker thread by `UploadFile`.
+    """
+
+    def __init__(self, filename: str | None) -> None:
+        # Don't trust the client with the directory, and don't clobber other uploads
+        self.filename = os.path.basename(filename or "upload")
+        self.path = os.path.join(config.storage.import_area, f"{uuid.uuid4().hex}_{self.filename}")
+        self.digest = hashlib.sha256()
+        self.n_bytes = 0
+        self._file: BinaryIO | None = None
+
+    def _open(self) -> BinaryIO:
+        if self._file is None:
+            os.makedirs(config.storage.import_area, exist_ok=True)
+            self._file = open(self.path, "wb")
+        return self._file
+
+    def write(self, data: bytes) -> int:
+        self.n_bytes += len(data)
+        if self.n_bytes > config.asgi.max_upload_size:
+            # Chunked uploads have no Content-Length to check up front
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload {self.filename} is larger than {config.asgi.max_upload_size} bytes",
+            )
+        self.digest.update(data)
+        return self._open().write(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # The parser rewinds each file once it is complete
+        return self._open().seek(offset, whence)
+
+    def close(self) -> None:
+        self._open().close()
+
+    def discard(self) -> None:
+        """Close and remove the file, if it is still in the import area"""
+        if self._file is not None:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _ImportAreaParser(MultiPartParser):
+    """Multipart form parser that writes uploaded files to the import area,
+    rather than spooling them to a temporary file that we would then copy
+    """
+
+    def __init__(self, headers: Headers, stream: AsyncGenerator[bytes, None]) -> None:
+        super().__init__(headers, stream)
+        self.uploads: list[_ImportAreaFile] = []
+
+    def on_headers_finished(self) -> None:
+        super().on_headers_finished()
+        upload = self._current_part.file
+        if upload is not None:
+            upload.file.close()
+            import_file = _ImportAreaFile(upload.filename)
+            self.uploads.append(import_file)
+            upload.file = cast(BinaryIO, import_file)
+
+
+async def _read_form(request: Request) -> FormData:
+    """Parse the form of a request, uploaded files go to the import area
+
+    The form is kept on the request, as the body can only be read once
+    """
+    form_data = getattr(request.state, "form_data", None)
+    if form_data is not None:
+        return form_data
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form_data = await request.form()
+    else:
+        parser = _ImportAreaParser(request.headers, request.stream())
+        request.state.uploads = parser.uploads
+        try:
+            form_data = await parser.parse()
+        except MultiPartException as msg:
+            raise HTTPException(status_code=400, detail=str(msg)) from msg
+    request.state.form_data = form_data
+    return form_data
+
+
+async def _finish_upload(file_to_load: UploadFile) -> tuple[str, str]:
+    """Close an uploaded file
+
+    Returns the path to the file and the sha256 hex digest of its contents
+    """
+    import_file = cast(_ImportAreaFile, file_to_load.file)
+    await asyncio.to_thread(import_file.close)
+    return import_file.path, import_file.digest.hexdigest()
+
+
+async def _validate_upload_rows(temp_filename: str, checksum: str) -> models.FileMetadata:
+    """Count the rows of an uploaded catalog, as soon as it is complete
+
+    The row counts live in the file headers or footers, so this can only
+    be done once the last block is written.
+    """
+    try:
+        file_metadata = await asyncio.to_thread(read_file_metadata, temp_filename, checksum)
+    except (RAILBadDatasetError, RAILFileNotFoundError) as msg:
+        raise HTTPException(status_code=400, detail=str(msg)) from msg
+    if file_metadata.n_objects == 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Upload {os.path.basename(temp_filename)} has no rows",
+        )
+    return file_metadata
+
+
+def _remove_upload(temp_filename: str) -> None:
+    """Remove an upload from the import area, if it was not moved away"""
+    if os.path.exists(temp_filename):
+        os.remove(temp_filename)
+
+
 async def _load_dataset(
     request: Request,
     catalog_tag_id: int | None = None,
@@ -279,30 +465,26 @@ async def _load_dataset(
     dataset_name = request_params["dataset_name"]
     catalog_tag_ = request_params["catalog_tag"]
 
-    contents = await file_to_load.read()
+    temp_filename, checksum = await _finish_upload(file_to_load)
 
-    temp_filename = os.path.join(config.storage.import_area, file_to_load.filename)
-    os.makedirs(config.storage.import_area, exist_ok=True)
-    async with await open_file(temp_filename, "wb") as f:
-        await f.write(contents)
-
-    # Now validate the model and register it
-    load_dataset_query = models.LoadDatasetQuery(
-        name=dataset_name,
-        catalog_tag_name=catalog_tag_.name,
-        path=temp_filename,
-    )
+    # Now validate the dataset and register it, reusing what we learned from the upload
     try:
-        new_dataset = await load_dataset(
-            load_dataset_query,
+        file_metadata = await _validate_upload_rows(temp_filename, checksum)
+        new_dataset = await db.Cache.shared_cache(logger).load_dataset_from_file(
             session,
+            name=dataset_name,
+            path=Path(temp_filename),
+            catalog_tag_name=catalog_tag_.name,
+            checksum=checksum,
+            file_metadata=file_metadata,
         )
         return dict(dataset=new_dataset)
     except Exception as e:
         logger.info(e)
         logger.warn(f"Failed to load dataset, removing temp file {temp_filename}")
-        os.remove(temp_filename)
         raise e
+    finally:
+        _remove_upload(temp_filename)
 
 
 async def _load_dataset_from_values(
@@ -350,24 +532,17 @@ async def _load_model(
     catalog_tag_ = request_params["catalog_tag"]
     algo_ = request_params["algo"]
 
-    contents = await file_to_load.read()
+    temp_filename, checksum = await _finish_upload(file_to_load)
 
-    temp_filename = os.path.join(config.storage.import_area, file_to_load.filename)
-    os.makedirs(config.storage.import_area, exist_ok=True)
-    async with await open_file(temp_filename, "wb") as f:
-        await f.write(contents)
-
-    # Now validate the model and register it
-    load_model_query = models.LoadModelQuery(
-        name=model_name,
-        path=temp_filename,
-        algo_name=algo_.name,
-        catalog_tag_name=catalog_tag_.name,
-    )
+    # Now validate the model and register it, reusing the checksum from the upload
     try:
-        new_model = await load_model(
-            load_model_query,
+        new_model = await db.Cache.shared_cache(logger).load_model_from_file(
             session,
+            name=model_name,
+            path=Path(temp_filename),
+            algo_name=algo_.name,
+            catalog_tag_name=catalog_tag_.name,
+            checksum=checksum,
         )
         ret_dict: dict[str, Any] = dict(model=new_model)
         skip_estimator = request_params.get("skip_estimator", None)
@@ -385,9 +560,10 @@ async def _load_model(
     except Exception as e:
         logger.info(e)
         logger.warn(f"Failed to load model, removing temp file {temp_filename}")
-        os.remove(temp_filename)
         model_name = None
         raise e
+    finally:
+        _remove_upload(temp_filename)
 
 
 async def _load_estimator(
@@ -477,12 +653,30 @@ async def _explore_request(
     return dict(control_type="explore")
 
 
+def _discard_uploads(request: Request) -> None:
+    """Remove the files uploaded with a request that are still in the import area"""
+    for import_file in getattr(request.state, "uploads", []):
+        import_file.discard()
+
+
 @web_app.post("/", response_class=HTMLResponse)
 @web_app.post("/{catalog_tag_id:int}", response_class=HTMLResponse)
 async def post_tree(
     request: Request,
     catalog_tag_id: int | None = None,
     session: async_scoped_session = Depends(db_session_dependency),
+) -> HTMLResponse:
+    try:
+        return await _post_tree(request, catalog_tag_id, session)
+    finally:
+        # Uploads that did not make it to the archive should not pile up
+        await asyncio.to_thread(_discard_uploads, request)
+
+
+async def _post_tree(
+    request: Request,
+    catalog_tag_id: int | None,
+    session: async_scoped_session,
 ) -> HTMLResponse:
     # get info from request
     request_params = await _parse_request(session, request, catalog_tag_id=catalog_tag_id, use_form=True)
@@ -505,6 +699,8 @@ async def post_tree(
                 update_pars = await the_func(request=request, catalog_tag_id=catalog_tag_id, session=session)
                 request_params.update(**update_pars)
                 break
+            except HTTPException:
+                raise
             except Exception as e:
                 logger.warn(e)
                 logger.warn("\n".join(traceback.format_tb(e.__traceback__)))
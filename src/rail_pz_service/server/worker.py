@@ -1,15 +1,18 @@
 """Request processing worker task"""
 
-from asyncio import create_task
+import asyncio
+import os
+import socket
+from asyncio import Task, create_task
 from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 import uvicorn
-from anyio import current_time, sleep_until
+from anyio import current_time
 from fastapi import FastAPI
 from safir.database import create_async_session, create_database_engine
 from safir.logging import configure_uvicorn_logging
-from sqlalchemy.ext.asyncio import async_scoped_session
+from sqlalchemy.ext.asyncio import AsyncEngine, async_scoped_session
 
 from .. import __version__, db
 from ..config import config
@@ -25,45 +28,246 @@ logger = LOGGER.bind(module=__name__)
 async def lifespan(app: FastAPI) -> AsyncGenerator:
     # start
     app.state.tasks = set()
-    worker = create_task(main_loop(), name="worker")
+    request_worker = RequestWorker()
+    app.state.request_worker = request_worker
+    worker = create_task(request_worker.main_loop(), name="worker")
     app.state.tasks.add(worker)
     yield
     # stop
+    await request_worker.shutdown(worker)
+    # This waits for the pool, keep it off of the event loop
+    await asyncio.to_thread(db.Cache.shared_cache(logger).shutdown)
 
 
-async def worker_iteration(
-    session: async_scoped_session,
-    cache: db.Cache,
-) -> None:
-    open_requests = await db.Request.get_open_requests(session)
-    for open_request_ in open_requests:
-        await cache.run_request(session, open_request_.id)
+class RequestWorker:
+    """Runs open requests concurrently
 
+    At most `max_concurrent_requests` requests are in flight at any time,
+    each one in its own task with its own DB session.
 
-async def main_loop() -> None:
-    """Worker execution loop.
+    Requests are claimed atomically, so several workers, possibly on
+    different nodes, can share the same Request queue.
 
-    With a database session, perform a single daemon interation and then sleep
-    until the next daemon appointment.
+    Requests are claimed one Estimator at a time, and the pool sends the
+    requests for an Estimator to the process that has its model loaded.
+    Other processes only take some of them if they are idle and already
+    have the model, or have room to load it without evicting another one.
     """
-    engine = create_database_engine(config.db.url, config.db.password)
-    sleep_time = config.daemon.processing_interval
-    cache = db.Cache.shared_cache(logger)
 
-    async with engine.begin():
+    def __init__(
+        self,
+        max_concurrent_requests: int | None = None,
+        worker_id: str | None = None,
+    ) -> None:
+        self._cache = db.Cache.shared_cache(logger)
+        if worker_id is None:
+            worker_id = config.daemon.worker_id
+        if worker_id is None:
+            worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._worker_id = worker_id
+        if max_concurrent_requests is None:
+            max_concurrent_requests = config.daemon.max_concurrent_requests
+        if max_concurrent_requests is None:
+            max_concurrent_requests = self._cache.executor.pool_size
+        self._max_concurrent_requests = max_concurrent_requests
+        # Task running each request, keyed by request id
+        self._running: dict[int, Task] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._engine: AsyncEngine | None = None
+
+    @property
+    def worker_id(self) -> str:
+        """Return the id used to claim requests"""
+        return self._worker_id
+
+    @property
+    def max_concurrent_requests(self) -> int:
+        """Return the maximum number of requests to run at once"""
+        return self._max_concurrent_requests
+
+    @property
+    def in_flight(self) -> list[int]:
+        """Return the ids of the requests currently running"""
+        return list(self._running.keys())
+
+    async def run_one_request(
+        self,
+        engine: AsyncEngine,
+        request_id: int,
+    ) -> None:
+        """Run a single request with its own DB session
+
+        Parameters
+        ----------
+        engine
+            DB engine used to make the session
+
+        request_id
+            Id of the request in the Request table
+        """
         session = await create_async_session(engine, logger)
-        logger.info("Worker starting.")
-        iteration_count = 0
-
-        while True:
-            iteration_count += 1
-            logger.info("Worker starting iteration.")
-            await worker_iteration(session, cache)
-            iteration_time = current_time()
-            logger.info(f"Worker completed {iteration_count} iterations at {iteration_time}.")
-            next_wakeup = iteration_time + sleep_time
-            logger.info(f"Worker next iteration at {next_wakeup}.")
-            await sleep_until(next_wakeup)
+        try:
+            await self._cache.run_request(session, request_id, worker_id=self._worker_id)
+            await session.commit()
+            logger.info(f"Worker finished request {request_id}.")
+        except asyncio.CancelledError:
+            await session.rollback()
+            raise
+        except Exception as msg:
+            logger.error(f"Worker failed request {request_id}: {msg}", exc_info=True)
+            await session.rollback()
+        finally:
+            await session.remove()
+
+    def _dispatch(
+        self,
+        engine: AsyncEngine,
+        request_id: int,
+    ) -> None:
+        task = create_task(self.run_one_request(engine, request_id), name=f"request_{request_id}")
+        self._running[request_id] = task
+        task.add_done_callback(lambda _task: self._request_done(request_id))
+
+    def _request_done(self, request_id: int) -> None:
+        self._running.pop(request_id, None)
+        # A slot is free, wake up the main loop to refill it
+        self._wakeup.set()
+
+    async def worker_iteration(
+        self,
+        session: async_scoped_session,
+        engine: AsyncEngine,
+    ) -> int:
+        """Claim open requests to fill the free slots and dispatch them
+
+        Parameters
+        ----------
+        session
+            DB session manager used to find open requests
+
+        engine
+            DB engine used to make the per-request sessions
+
+        Returns
+        -------
+        int
+            Number of requests dispatched
+        """
+        n_free = self._max_concurrent_requests - len(self._running)
+        if n_free <= 0:
+            return 0
+
+        claimed_requests: list[db.Request] = []
+        claimed_estimator_ids: set[int] = set()
+        while len(claimed_requests) < n_free:
+            # Claim the requests for one Estimator at a time, so that they
+            # reach the pool together and run with the same warm estimator
+            estimator_requests = await db.Request.claim_open_requests(
+                session,
+                self._worker_id,
+                limit=n_free - len(claimed_requests),
+                exclude_estimator_ids=claimed_estimator_ids,
+                single_estimator=True,
+            )
+            if not estimator_requests:
+                break
+            claimed_estimator_ids.add(estimator_requests[0].estimator_id)
+            claimed_requests.extend(estimator_requests)
+        await session.commit()
+
+        for claimed_request_ in claimed_requests:
+            self._dispatch(engine, claimed_request_.id)
+        return len(claimed_requests)
+
+    async def main_loop(self) -> None:
+        """Worker execution loop.
+
+        With a database session, fill the free request slots and then sleep
+        until a request finishes, a new request is created or the next daemon
+        appointment.  On PostgreSQL new requests are announced with
+        LISTEN/NOTIFY, so polling is only a safety net.
+        """
+        engine = create_database_engine(config.db.url, config.db.password)
+        self._engine = engine
+        sleep_time = config.daemon.processing_interval
+
+        notifier = db.RequestNotifier.shared_notifier(logger)
+        notifier.subscribe(self._wakeup)
+
+        async with engine.begin(), notifier.listen(engine) as listening:
+            session = await create_async_session(engine, logger)
+            if not listening:
+                logger.info(f"Worker polling for new requests every {sleep_time} s.")
+            logger.info(
+                f"Worker {self._worker_id} starting, max_concurrent_requests={self._max_concurrent_requests}."
+            )
+            iteration_count = 0
+
+            while not self._stopping:
+                iteration_count += 1
+                self._wakeup.clear()
+                n_dispatched = await self.worker_iteration(session, engine)
+                iteration_time = current_time()
+                logger.info(
+                    f"Worker completed {iteration_count} iterations at {iteration_time}, "
+                    f"dispatched {n_dispatched}, {len(self._running)} in flight."
+                )
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=sleep_time)
+
+    async def shutdown(
+        self,
+        main_task: Task | None = None,
+    ) -> None:
+        """Stop dispatching, drain the in-flight requests and requeue
+        any that do not finish within `config.daemon.shutdown_timeout`
+
+        The estimations of the requeued requests are stopped first, so that
+        they can not keep writing to the output file once another worker
+        has claimed the request.
+
+        Parameters
+        ----------
+        main_task
+            Task running `main_loop`, it will be cancelled
+        """
+        self._stopping = True
+        db.RequestNotifier.shared_notifier(logger).unsubscribe(self._wakeup)
+        self._wakeup.set()
+        if main_task is not None:
+            main_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await main_task
+
+        requeue: list[int] = []
+        if self._running:
+            logger.info(f"Worker draining {len(self._running)} requests.")
+            tasks = dict(self._running)
+            _done, pending = await asyncio.wait(tasks.values(), timeout=config.daemon.shutdown_timeout)
+            for request_id, task in tasks.items():
+                if task in pending:
+                    task.cancel()
+                    requeue.append(request_id)
+            await asyncio.gather(*pending, return_exceptions=True)
+            if requeue:
+                # Cancelling the tasks leaves their jobs running in the pool
+                await asyncio.to_thread(self._cache.abort)
+
+        if self._engine is None:
+            return
+
+        if requeue:
+            logger.info(f"Worker requeueing requests {requeue}.")
+            session = await create_async_session(self._engine, logger)
+            try:
+                await db.Request.requeue_requests(session, requeue)
+                await session.commit()
+            finally:
+                await session.remove()
+
+        await self._engine.dispose()
+        self._engine = None
 
 
 def the_app() -> FastAPI:
@@ -0,0 +1,106 @@
+import uuid
+
+import pytest
+import structlog
+from safir.database import create_async_session
+from safir.testing.uvicorn import UvicornProcess
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from rail_pz_service import db
+from rail_pz_service.client import AsyncPZRailClient
+from rail_pz_service.client.clientconfig import client_config
+from rail_pz_service.config import config
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("api_version", ["v1"])
+async def test_async_client(uvicorn: UvicornProcess, api_version: str, engine: AsyncEngine) -> None:
+    """Test `AsyncPZRailClient` and its bulk helpers"""
+
+    client_config.service_url = f"{uvicorn.url}{config.asgi.prefix}/{api_version}"
+
+    logger = structlog.get_logger(__name__)
+
+    # generate a uuid to avoid collisions
+    uuid_int = uuid.uuid1().int
+
+    async with engine.begin():
+        session = await create_async_session(engine, logger)
+
+        algorithm_ = await db.Algorithm.create_row(
+            session,
+            name=f"algorithm_{uuid_int}",
+            class_name="not.really.a.class",
+        )
+        catalog_tag_ = await db.CatalogTag.create_row(
+            session,
+            name=f"catalog_{uuid_int}",
+            class_name="not.really.a.class",
+        )
+        model_ = await db.Model.create_row(
+            session,
+            name=f"model_{uuid_int}",
+            path="not/really/a/path",
+            algo_name=algorithm_.name,
+            catalog_tag_name=catalog_tag_.name,
+            validate_file=False,
+        )
+        estimator_ = await db.Estimator.create_row(
+            session,
+            name=f"estimator_{uuid_int}",
+            model_name=model_.name,
+        )
+        datasets_ = [
+            await db.Dataset.create_row(
+                session,
+                name=f"dataset_{uuid_int}_{i}",
+                n_objects=2,
+                path="not/really/a/path",
+                data=None,
+                catalog_tag_name=catalog_tag_.name,
+                validate_file=False,
+            )
+            for i in range(5)
+        ]
+        await session.commit()
+
+        async with AsyncPZRailClient() as pz_client:
+            check_algorithm = await pz_client.algorithm.get_row_by_name(algorithm_.name)
+            assert check_algorithm.id == algorithm_.id
+
+            # the test DB is SQLite, which can not take concurrent writes
+            new_requests = await pz_client.request.create_many(
+                [dict(estimator_name=estimator_.name, dataset_name=dataset_.name) for dataset_ in datasets_],
+                concurrency=1,
+            )
+            assert [request_.dataset_id for request_ in new_requests] == [
+                dataset_.id for dataset_ in datasets_
+            ]
+
+            request_ids = [request_.id for request_ in new_requests]
+            check_requests = await pz_client.request.get_many(reversed(request_ids))
+            assert [request_.id for request_ in check_requests] == request_ids[::-1]
+
+            paged_ids = [request_.id async for request_ in pz_client.request.iter_rows(page_size=2)]
+            assert paged_ids == sorted(request_ids)
+
+            filtered = await pz_client.request.get_rows(dataset_id=datasets_[0].id)
+            assert [request_.id for request_ in filtered] == [request_ids[0]]
+
+            check_datasets = await pz_client.dataset.get_rows(catalog_tag_id=catalog_tag_.id)
+            assert len(check_datasets) == len(datasets_)
+
+            await pz_client.request.delete(request_ids[0])
+            assert len(await pz_client.request.get_rows()) == len(request_ids) - 1
+
+        # delete everything we just made in the session
+        for request_id in request_ids[1:]:
+            await db.Request.delete_row(session, request_id)
+        for dataset_ in datasets_:
+            await db.Dataset.delete_row(session, dataset_.id)
+        await db.Estimator.delete_row(session, estimator_.id)
+        await db.Model.delete_row(session, model_.id)
+        await db.Algorithm.delete_row(session, algorithm_.id)
+        await db.CatalogTag.delete_row(session, catalog_tag_.id)
+        await session.commit()
+        await session.remove()
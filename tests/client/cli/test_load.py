@@ -2,6 +2,7 @@ import os
 
 import pytest
 import qp
+import yaml
 from click.testing import CliRunner
 from safir.testing.uvicorn import UvicornProcess
 from sqlalchemy.ext.asyncio import AsyncEngine
@@ -63,6 +64,15 @@ def test_load_client(
     the_dataset = check_and_parse_result(result, models.Dataset)
     assert the_dataset.name == "com_cam_test"
 
+    # the same file, sent over the wire rather than by path
+    result = runner.invoke(
+        top,
+        "load dataset --name com_cam_test_upload "
+        f"--path {dataset_path} --catalog-tag-name com_cam --upload --output yaml",
+    )
+    uploaded_dataset = check_and_parse_result(result, models.Dataset)
+    assert uploaded_dataset.content_hash == the_dataset.content_hash
+
     result = runner.invoke(
         top,
         "load estimator --name com_cam_trainz_base --model-name com_cam_trainz_base --output yaml",
@@ -70,6 +80,28 @@ def test_load_client(
     the_estimator = check_and_parse_result(result, models.Estimator)
     assert the_estimator.name == "com_cam_trainz_base"
 
+    # bulk create from yaml files
+    datasets_file = os.path.join("tests", "temp_data", "bulk_datasets.yaml")
+    with open(datasets_file, "w", encoding="utf-8") as fout:
+        yaml.dump(
+            [
+                dict(name="com_cam_test_bulk", path=dataset_path, catalog_tag_name="com_cam"),
+                dict(name="com_cam_test", path=dataset_path, catalog_tag_name="com_cam"),
+            ],
+            fout,
+        )
+    result = runner.invoke(top, f"load datasets --input-file {datasets_file} --output yaml")
+    bulk_datasets = check_and_parse_result(result, models.DatasetBulkResult)
+    assert [dataset_.name for dataset_ in bulk_datasets.created] == ["com_cam_test_bulk"]
+    assert [error.index for error in bulk_datasets.errors] == [1]
+
+    requests_file = os.path.join("tests", "temp_data", "bulk_requests.yaml")
+    with open(requests_file, "w", encoding="utf-8") as fout:
+        yaml.dump([dict(dataset_name="com_cam_test_bulk", estimator_name=the_estimator.name)], fout)
+    result = runner.invoke(top, f"request create-bulk --input-file {requests_file} --output yaml")
+    bulk_requests = check_and_parse_result(result, models.RequestBulkResult)
+    assert [request_.dataset_id for request_ in bulk_requests.created] == [bulk_datasets.created[0].id]
+
     result = runner.invoke(
         top,
         "request create "
@@ -6,6 +6,7 @@ from safir.testing.uvicorn import UvicornProcess
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 from rail_pz_service import models
+from rail_pz_service.client import PZRailClient
 from rail_pz_service.client.cli.main import top
 from rail_pz_service.client.clientconfig import client_config
 from rail_pz_service.config import config
@@ -83,6 +84,12 @@ def test_request_client(uvicorn: UvicornProcess, api_version: str, engine: Async
     requests_ = check_and_parse_result(result, list[models.Request])
     entry = requests_[0]
 
+    # page through with the cursor, and filter on the server
+    pz_client = PZRailClient()
+    assert [row.id for row in pz_client.request.iter_rows(page_size=1)] == [row.id for row in requests_]
+    assert len(pz_client.request.get_rows(dataset_id=dataset_.id, status="queued")) == 1
+    assert len(pz_client.request.get_rows(time_created_before=entry.time_created)) == 0
+
     # test other output cases
     # result = runner.invoke(top, "request list --output json")
     # assert result.exit_code == 0
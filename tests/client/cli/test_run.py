@@ -7,6 +7,7 @@ from safir.testing.uvicorn import UvicornProcess
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 from rail_pz_service import models
+from rail_pz_service.client import PZRailClient
 from rail_pz_service.client.cli.main import top
 from rail_pz_service.client.clientconfig import client_config
 from rail_pz_service.config import config
@@ -89,5 +90,48 @@ def test_run_client(
     qp_ens = qp.read(out_path)
     assert qp_ens.npdf != 0
 
+    # pick up an interrupted download where it left off
+    pz_client = PZRailClient()
+    results = pz_client.request.download(the_request.id, out_path)
+    with open(out_path, "rb") as fin:
+        full_contents = fin.read()
+    half = len(full_contents) // 2
+    with open(f"{out_path}.part", "wb") as fout:
+        fout.write(full_contents[:half])
+    with open(f"{out_path}.part.validator", "w") as fout:
+        fout.write(results.headers["etag"])
+    os.remove(out_path)
+
+    offsets: list[int] = []
+    pz_client.request.download(
+        the_request.id,
+        out_path,
+        chunk_size=1024,
+        progress=lambda offset, _total: offsets.append(offset),
+    )
+    assert offsets[0] == half + 1024
+    with open(out_path, "rb") as fin:
+        assert fin.read() == full_contents
+    assert not os.path.exists(f"{out_path}.part")
+
+    # a partial download longer than the file is thrown away
+    with open(f"{out_path}.part", "wb") as fout:
+        fout.write(full_contents + full_contents)
+    with open(f"{out_path}.part.validator", "w") as fout:
+        fout.write(results.headers["etag"])
+    os.remove(out_path)
+
+    pz_client.request.download(the_request.id, out_path)
+    with open(out_path, "rb") as fin:
+        assert fin.read() == full_contents
+    assert not os.path.exists(f"{out_path}.part")
+    assert not os.path.exists(f"{out_path}.part.validator")
+
+    # read rows without downloading the file
+    output_rows = pz_client.request.get_output_rows(the_request.id, content="pdfs", nzbins=11)
+    assert output_rows.rows == [0]
+    assert len(output_rows.meta["zgrid"]) == 11
+    assert len(output_rows.columns["pdfs"][0]) == 11
+
     # delete everything we just made in the session
     cleanup(runner, admin_top)
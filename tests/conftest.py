@@ -1,5 +1,6 @@
 import os
-from collections.abc import AsyncIterator, Iterator
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
 from typing import Any
 
 import pytest
@@ -11,6 +12,7 @@ from httpx import ASGITransport, AsyncClient
 from pytest import TempPathFactory
 from safir.database import create_database_engine, initialize_database
 from safir.testing.uvicorn import UvicornProcess, spawn_uvicorn
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 from rail_pz_service import db
@@ -25,10 +27,32 @@ async def engine_fixture() -> AsyncIterator[AsyncEngine]:
     logger = structlog.get_logger(__name__)
     the_engine = create_database_engine(config_.db.url, config_.db.password)
     await initialize_database(the_engine, logger, schema=db.Base.metadata, reset=True)
+    # The ids are reused once the DB is reset
+    db.RowCache.shared_cache().clear()
     yield the_engine
     await the_engine.dispose()
 
 
+@pytest.fixture(name="count_queries")
+def count_queries_fixture(engine: AsyncEngine) -> Callable[[], AbstractContextManager[list[str]]]:
+    """Return a context manager that collects the statements sent to the DB"""
+
+    @contextmanager
+    def _count_queries() -> Iterator[list[str]]:
+        statements: list[str] = []
+
+        def _before_cursor_execute(*args: Any) -> None:
+            statements.append(args[2])
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+
+    return _count_queries
+
+
 @pytest_asyncio.fixture(name="app")
 async def app_fixture() -> AsyncIterator[FastAPI]:
     """Return a configured test application.
@@ -58,15 +58,20 @@ def test_run_cli_db(engine: AsyncEngine, setup_test_area: int) -> None:
     data += "u_cModelMagErr:0.5;g_cModelMagErr:0.5;r_cModelMagErr:0.5;"
     data += "i_cModelMagErr:0.5;z_cModelMagErr:0.5;y_cModelMagErr:0.5;"
 
+    output_path = os.path.join("tests", "temp_data", "single_estimate.hdf5")
     result = runner.invoke(
         admin_top,
-        f"dataset run --data {data} --catalog-tag-name com_cam "
-        f"--estimator-name {the_estimator.name} --output yaml",
+        f"dataset run --data {data} --estimator-name {the_estimator.name} --filename {output_path}",
     )
-    the_request = check_and_parse_result(result, models.Request)
+    assert not result.exit_code, result.output
+    assert result.output.strip() == output_path
 
-    qp_ens = qp.read(the_request.qp_file_path)
-    assert qp_ens.npdf != 0
+    # No dataset or request is made for a single estimate
+    result = runner.invoke(admin_top, "dataset list --output yaml")
+    assert not check_and_parse_result(result, list[models.Dataset])
+
+    qp_ens = qp.read(output_path)
+    assert qp_ens.npdf == 1
 
     # delete everything we just made in the session
     cleanup(runner, admin_top)
@@ -1,19 +1,25 @@
+import asyncio
 import os
 import pathlib
 
 import pytest
+import qp
 import structlog
 from safir.database import create_async_session
 from sqlalchemy.ext.asyncio import AsyncEngine, async_scoped_session
 
 from rail_pz_service import db
+from rail_pz_service.common import errors
+from rail_pz_service.common.enums import RequestStatusEnum
+from rail_pz_service.common.hashing import file_content_hash
+from rail_pz_service.db.batcher import EstimateBatcher
 
 from .util_functions import (
     cleanup,
 )
 
 
-async def _test_cache(session: async_scoped_session) -> None:
+async def _test_cache(engine: AsyncEngine, session: async_scoped_session) -> None:
     """Test the db.Cache object"""
 
     cache = db.Cache()
@@ -44,6 +50,7 @@ async def _test_cache(session: async_scoped_session) -> None:
         )
 
         assert the_model.name == "com_cam_trainz_base"
+        assert the_model.content_hash == file_content_hash(the_model.path)
 
         the_dataset = await cache.load_dataset_from_file(
             session,
@@ -89,16 +96,121 @@ async def _test_cache(session: async_scoped_session) -> None:
         cached_estim = await cache.get_estimator(session, estimators[0].id)
         assert cached_estim
 
+        check_estim = await cache.get_estimator(session, estimators[0].id)
+        assert check_estim is cached_estim
+        assert cache.estimator_stats.hits == 1
+        assert cache.estimator_stats.n_entries == 1
+        assert cache.estimator_stats.n_bytes > 0
+
+        cache.pin_estimator(estimators[0].id)
+        cache.unpin_estimator(estimators[0].id)
+
+        # single object estimates are batched together
+        single_ests = await asyncio.gather(
+            *[
+                cache.estimate_values(
+                    session,
+                    estimators[0].id,
+                    {key: value + 0.1 * i for key, value in data.items()},
+                )
+                for i in range(3)
+            ]
+        )
+        assert all(single_est_.npdf == 1 for single_est_ in single_ests)
+
+        with pytest.raises(errors.RAILBadInputError):
+            await cache.estimate_values(
+                session,
+                estimators[0].id,
+                {"u_cModelMag": [24.4, 24.5], "g_cModelMag": [24.4]},
+            )
+
+        multi_est = await cache.estimate_values(
+            session,
+            estimators[0].id,
+            {key: [value, value + 0.1] for key, value in data.items()},
+        )
+        assert multi_est.npdf == 2
+
+        # the estimator was built once, in the pool, and then reused
+        assert cache.executor.estimator_stats.n_entries >= 1
+        assert cache.executor.estimator_stats.n_bytes > 0
+        assert cache.executor.estimator_stats.hits >= 1
+        assert cache.executor.has_estimator(estimators[0].id, cache.executor.lane_for(estimators[0].id))
+
         check_request = await cache.run_request(session, request.id)
 
         qp_file_path = await cache.get_qp_file(session, check_request.id)
         check_qp_file_path = await cache.get_qp_file(session, check_request.id)
 
         assert qp_file_path == check_qp_file_path
+
+        # a worker claim on a request whose file is already there is closed
+        await check_request.update_values(
+            session, status=RequestStatusEnum.running, worker_id="worker_a", time_finished=None
+        )
+        await session.commit()
+        assert await cache.get_qp_file(session, check_request.id, worker_id="worker_a") == qp_file_path
+        await session.refresh(check_request)
+        assert check_request.status == RequestStatusEnum.done
+        assert check_request.time_finished is not None
+
         qp_ens = await cache.get_qp_dist(session, check_request.id)
 
         assert qp_ens.npdf != 0
 
+        # the second read comes from memory
+        check_qp_ens = await cache.get_qp_dist(session, check_request.id)
+        assert check_qp_ens is qp_ens
+        assert cache.qp_dist_stats.hits == 1
+        assert cache.qp_dist_stats.n_bytes > 0
+
+        # re-writing the file invalidates the cached ensemble
+        os.utime(qp_file_path, ns=(0, 0))
+        check_qp_ens = await cache.get_qp_dist(session, check_request.id)
+        assert check_qp_ens is not qp_ens
+
+        # run the same thing in chunks spread over the pool
+        chunked_estimator = await cache.load_estimator(
+            session,
+            name="com_cam_trainz_chunked",
+            model_name="com_cam_trainz_base",
+            # a different config, so that the output of the first run is not reused
+            config=dict(chunk_size=5000),
+            chunk_size=300,
+        )
+        assert chunked_estimator.chunk_size == 300
+        chunked_request = await cache.create_request(
+            session,
+            dataset_name=the_dataset.name,
+            estimator_name=chunked_estimator.name,
+        )
+        await session.refresh(chunked_request)
+        await cache.run_request(session, chunked_request.id)
+        chunked_qp_ens = await cache.get_qp_dist(session, chunked_request.id)
+        assert chunked_qp_ens.npdf == qp_ens.npdf
+
+        # the same file under another name reuses the existing output
+        copy_dataset = await cache.load_dataset_from_file(
+            session,
+            name="com_cam_test_copy",
+            path=pathlib.Path(os.path.join("tests", "temp_data", "inputs", "minimal_gold_test.hdf5")),
+            catalog_tag_name="com_cam",
+        )
+        assert copy_dataset.content_hash == the_dataset.content_hash
+        assert chunked_estimator.content_hash != the_estimator.content_hash
+        copy_request = await cache.create_request(
+            session,
+            dataset_name=copy_dataset.name,
+            estimator_name=the_estimator.name,
+        )
+        copy_request = await cache.run_request(session, copy_request.id)
+        assert copy_request.qp_file_path is not None
+        assert copy_request.qp_file_path != qp_file_path
+        assert copy_request.qp_file_checksum == file_content_hash(qp_file_path)
+        # each request has its own file, so the outputs do not depend on each other
+        assert os.path.exists(copy_request.qp_file_path)
+
         cache.clear()
 
         qp_ens_check = await cache.get_qp_dist(session, check_request.id)
@@ -111,7 +223,15 @@ async def _test_cache(session: async_scoped_session) -> None:
         )
         await session.refresh(request2)
 
+        # requests that are already running are not run a second time
+        assert await db.Request.start_request(session, request2.id)
+        assert not await db.Request.start_request(session, request2.id)
+        with pytest.raises(errors.RAILRequestError):
+            await cache.run_request(session, request2.id)
+        await db.Request.requeue_requests(session, [request2.id])
+
         check_request2 = await cache.run_request(session, request2.id)
+        assert check_request2.status == RequestStatusEnum.done
 
         qp_file_path2 = await cache.get_qp_file(session, check_request2.id)
         check_qp_file_path2 = await cache.get_qp_file(session, check_request2.id)
@@ -121,6 +241,73 @@ async def _test_cache(session: async_scoped_session) -> None:
 
         assert qp_ens2.npdf != 0
 
+        # concurrent requests on values run as a single batch
+        cache._batcher = EstimateBatcher(cache.executor, max_wait=5.0, max_batch_size=2)
+        batched_request_ids: list[int] = []
+        for i in range(2):
+            batched_dataset = await cache.load_dataset_from_values(
+                session,
+                name=f"com_cam_values_batched_{i}",
+                data={key: value + 0.2 * (i + 1) for key, value in data.items()},
+                catalog_tag_name="com_cam",
+            )
+            batched_request = await cache.create_request(
+                session,
+                dataset_name=batched_dataset.name,
+                estimator_name=the_estimator.name,
+            )
+            batched_request_ids.append(batched_request.id)
+
+        async def _run_request(request_id: int) -> str | None:
+            async with engine.begin():
+                run_session = await create_async_session(engine, structlog.get_logger(__name__))
+            try:
+                return (await cache.run_request(run_session, request_id)).qp_file_path
+            finally:
+                await run_session.remove()
+
+        batched_paths = await asyncio.gather(*[_run_request(id_) for id_ in batched_request_ids])
+        assert cache.batcher.n_batches == 1
+        assert len(set(batched_paths)) == 2
+        assert all(path is not None and qp.read(path).npdf == 1 for path in batched_paths)
+
+        # files of a batch that fails half way are not left in the archive
+        input_path = os.path.join("tests", "temp_data", "inputs", "minimal_gold_test.hdf5")
+        archive_path = cache._dataset_archive_path("com_cam_batch", input_path, "com_cam")
+        with pytest.raises(TypeError):
+            await cache.load_datasets(
+                session,
+                [
+                    dict(name="com_cam_batch", path=input_path, catalog_tag_name="com_cam"),
+                    dict(name="com_cam_batch_bad", data=dict(u_cModelMag=None), catalog_tag_name="com_cam"),
+                ],
+            )
+        assert os.path.exists(input_path)
+        assert not os.path.exists(archive_path)
+
+        # all failures are recorded
+        bad_dataset = await db.Dataset.create_row(
+            session,
+            name="com_cam_missing",
+            n_objects=2,
+            path="not/really/a/path",
+            data=None,
+            catalog_tag_name="com_cam",
+            validate_file=False,
+        )
+        bad_request = await cache.create_request(
+            session,
+            dataset_name=bad_dataset.name,
+            estimator_name=the_estimator.name,
+        )
+        bad_request_id = bad_request.id
+        # this comes from the estimator itself, in the pool
+        with pytest.raises(KeyError):
+            await cache.run_request(session, bad_request_id)
+        bad_request = await db.Request.get_row(session, bad_request_id)
+        assert bad_request.status == RequestStatusEnum.failed
+        assert bad_request.time_finished is not None
+
         # cleanup
         await cleanup(session)
 
@@ -135,8 +322,46 @@ async def test_cache(engine: AsyncEngine, setup_test_area: int) -> None:
     async with engine.begin():
         session = await create_async_session(engine, logger)
     try:
-        await _test_cache(session)
+        await _test_cache(engine, session)
     except Exception as e:
         await session.rollback()
         await cleanup(session)
         raise e
+
+
+@pytest.mark.asyncio()
+async def test_cache_single_flight() -> None:
+    """Test that concurrent callers share a single build"""
+    cache = db.Cache()
+    n_calls = 0
+
+    async def _build() -> int:
+        nonlocal n_calls
+        n_calls += 1
+        await asyncio.sleep(0.05)
+        return n_calls
+
+    results = await asyncio.gather(*[cache._single_flight("thing", 1, _build) for _ in range(5)])
+    assert results == [1] * 5
+    assert n_calls == 1
+
+    # Once it is done, the next call builds again
+    assert await cache._single_flight("thing", 1, _build) == 2
+
+    # Estimators are loaded once per lane
+    n_calls = 0
+    results = await asyncio.gather(
+        *[cache._single_flight("estimator", (1, lane), _build) for lane in (0, 0, 1, 1)]
+    )
+    assert results == [1, 1, 2, 2]
+    assert n_calls == 2
+
+    async def _fail() -> int:
+        await asyncio.sleep(0.05)
+        raise errors.RAILRequestError("failed")
+
+    failures = await asyncio.gather(
+        *[cache._single_flight("thing", 1, _fail) for _ in range(3)],
+        return_exceptions=True,
+    )
+    assert all(isinstance(failure_, errors.RAILRequestError) for failure_ in failures)
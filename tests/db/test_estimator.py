@@ -38,6 +38,7 @@ async def _test_estimator_db(session: async_scoped_session) -> None:
             algo_name=algorithm_.name,
             catalog_tag_name=catalog_tag_.name,
             validate_file=False,
+            content_hash=f"model_hash_{uuid_int}",
         )
 
         await db.Estimator.create_row(
@@ -88,6 +89,17 @@ async def _test_estimator_db(session: async_scoped_session) -> None:
 
         rows = await db.Estimator.get_rows(session)
         assert len(rows) == 2
+        assert rows[0].content_hash == rows[1].content_hash
+
+        # the hash follows configuration changes
+        old_hash = check.content_hash
+        assert old_hash is not None
+        check = await db.Estimator.update_row(session, check.id, config=dict(nzbins=11))
+        new_hash = check.content_hash
+        assert new_hash not in (None, old_hash)
+        # the chunk size does not change the results
+        check = await db.Estimator.update_row(session, check.id, chunk_size=300)
+        assert check.content_hash == new_hash
 
         # cleanup
         await cleanup(session)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from rail_pz_service import db
+from rail_pz_service.common import errors
+from rail_pz_service.config import config
+from rail_pz_service.db import executor as executor_module
+from rail_pz_service.db.executor import (
+    EstimationExecutor,
+    load_algorithm_class,
+    load_catalog_tag_class,
+)
+from rail_pz_service.db.lru import CacheStats
+
+
+@pytest.mark.asyncio()
+async def test_executor() -> None:
+    """Test the db.executor.EstimationExecutor object"""
+
+    with pytest.raises(ValueError):
+        EstimationExecutor(executor_type="not_a_pool")
+
+    with pytest.raises(errors.RAILImportError):
+        load_algorithm_class("not.really.a.class")
+
+    with pytest.raises(errors.RAILImportError):
+        load_catalog_tag_class("not.really.a.class")
+
+    executor = EstimationExecutor(executor_type="thread", pool_size=2)
+    assert executor.executor_type == "thread"
+    assert executor.pool_size == 2
+
+    # The event loop should keep running while the pool is busy
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    await asyncio.gather(executor.run(time.sleep, 0.2), ticker())
+    assert ticks == 5
+
+    # Pins reach the estimator cache with the next job
+    executor.pin_estimator(3)
+    await executor.run(time.sleep, 0)
+    assert executor_module._local_estimators.is_pinned(3)
+    executor.unpin_estimator(3)
+    await executor.run(time.sleep, 0)
+    assert not executor_module._local_estimators.is_pinned(3)
+    assert executor.estimator_stats.n_entries == len(executor_module._local_estimators)
+
+    # Cancelled jobs that already started can be waited for
+    sleeper = asyncio.create_task(executor.run(time.sleep, 0.5, wait_on_cancel=True))
+    await asyncio.sleep(0.1)
+    sleeper.cancel()
+    start_time = time.monotonic()
+    with pytest.raises(asyncio.CancelledError):
+        await sleeper
+    assert time.monotonic() - start_time > 0.2
+
+    executor.shutdown()
+    # shutting down twice is fine
+    executor.shutdown()
+
+    # Each process gets the whole estimator budget
+    process_executor = EstimationExecutor(executor_type="process", pool_size=3)
+    assert process_executor._lane_max_entries == config.cache.estimator_max_entries
+    assert process_executor._lane_max_bytes == config.cache.estimator_max_bytes
+
+    # Jobs for the same estimator stick to the same process
+    first_lane = process_executor.lane_for(7)
+    assert process_executor.lane_for(7) == first_lane
+    assert 0 <= process_executor.lane_for(None) < 3
+
+    # unless that process is busy while another is idle and has room for it
+    process_executor._lane_loads[first_lane] += 1
+    spill_lane = process_executor.lane_for(7)
+    assert spill_lane != first_lane
+    process_executor._lane_loads[first_lane] -= 1
+    assert process_executor.lane_for(7) == first_lane
+
+    # idle processes that are full only help if they have the estimator already
+    process_executor._lane_loads[first_lane] += 1
+    process_executor._lane_max_entries = 1
+    for lane in range(3):
+        process_executor._lane_stats[lane] = CacheStats(n_entries=1)
+    assert process_executor.lane_for(7) == first_lane
+    process_executor._lane_estimators[spill_lane] = frozenset([7])
+    assert process_executor.lane_for(7) == spill_lane
+    process_executor._lane_loads[first_lane] -= 1
+    process_executor.shutdown()
+
+    # Aborting stops jobs that are still running in the pool
+    process_executor = EstimationExecutor(executor_type="process", pool_size=1)
+    sleeper = asyncio.create_task(process_executor.run(time.sleep, 60))
+    await asyncio.sleep(2)
+    sleeper.cancel()
+    old_lane = process_executor._lanes[0]
+    start_time = time.monotonic()
+    await asyncio.to_thread(process_executor.abort, 10)
+    assert time.monotonic() - start_time < 30
+    assert process_executor._lanes[0] is not old_lane
+
+    # and a new lane takes over
+    assert await process_executor.run(abs, -1) == 1
+    process_executor.shutdown()
+
+    cache = db.Cache()
+    assert cache.executor is cache.executor
+    cache.shutdown()
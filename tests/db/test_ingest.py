@@ -0,0 +1,71 @@
+import os
+import pathlib
+
+import h5py
+import numpy as np
+import pytest
+
+from rail_pz_service.common import errors
+from rail_pz_service.common.hashing import file_content_hash
+from rail_pz_service.db.ingest import copy_file, ingest_file, read_file_metadata
+
+
+def test_ingest_file(tmp_path: pathlib.Path) -> None:
+    """Test putting files in the archive area"""
+    source = tmp_path / "source.hdf5"
+    source.write_bytes(os.urandom(100000))
+    checksum = file_content_hash(source)
+
+    # same filesystem, so no bytes need to be copied
+    assert ingest_file(source, tmp_path / "auto.hdf5") == "hardlink"
+    assert os.stat(tmp_path / "auto.hdf5").st_ino == os.stat(source).st_ino
+
+    assert ingest_file(source, tmp_path / "copy.hdf5", strategy="copy", checksum=checksum) == "copy"
+    assert os.stat(tmp_path / "copy.hdf5").st_ino != os.stat(source).st_ino
+    assert file_content_hash(tmp_path / "copy.hdf5") == checksum
+
+    # re-ingesting replaces the existing file
+    assert ingest_file(source, tmp_path / "copy.hdf5", strategy="copy") == "copy"
+
+    with pytest.raises(errors.RAILChecksumError):
+        copy_file(str(source), str(tmp_path / "bad.hdf5"), checksum="not_the_checksum")
+    assert not os.path.exists(tmp_path / "bad.hdf5")
+
+    with pytest.raises(errors.RAILFileNotFoundError):
+        ingest_file(tmp_path / "missing.hdf5", tmp_path / "missing_out.hdf5")
+
+    with pytest.raises(ValueError):
+        ingest_file(source, tmp_path / "bad.hdf5", strategy="teleport")
+
+    moved = tmp_path / "moved.hdf5"
+    assert ingest_file(source, moved, strategy="move") == "move"
+    assert not os.path.exists(source)
+    assert file_content_hash(moved) == checksum
+
+
+def test_read_file_metadata(tmp_path: pathlib.Path) -> None:
+    """Test describing a file before putting it in the archive area"""
+    source = tmp_path / "source.hdf5"
+    with h5py.File(source, "w") as hdf5_file:
+        hdf5_file.create_dataset("mag_i", data=np.arange(10, dtype=np.float32))
+        hdf5_file.create_group("photometry").create_dataset("mag_u", data=np.arange(4))
+        # scalars are not columns
+        hdf5_file.create_dataset("version", data=3)
+        hdf5_file.create_group("info").create_dataset("survey", data=b"com_cam")
+
+    file_metadata = read_file_metadata(str(source))
+    assert file_metadata.layout == "hdf5"
+    assert file_metadata.n_objects == 10
+    assert file_metadata.columns == {"mag_i": "float32"}
+    assert file_metadata.group_lengths == {"": 10, "photometry": 4}
+    assert file_metadata.checksum == file_content_hash(source)
+
+    # a known checksum is used as is
+    assert read_file_metadata(str(source), "known").checksum == "known"
+
+    with pytest.raises(errors.RAILFileNotFoundError):
+        read_file_metadata(str(tmp_path / "missing.hdf5"))
+
+    (tmp_path / "bad.hdf5").write_bytes(b"not an hdf5 file")
+    with pytest.raises(errors.RAILBadDatasetError):
+        read_file_metadata(str(tmp_path / "bad.hdf5"))
@@ -0,0 +1,73 @@
+from rail_pz_service.db.lru import LRUCache
+
+
+def test_lru_cache() -> None:
+    """Test the db.lru.LRUCache object"""
+
+    lru: LRUCache[int, str] = LRUCache(max_entries=2)
+    lru.put(1, "a")
+    lru.put(2, "b")
+    assert lru.get(1) == "a"
+
+    # 2 is now the least recently used
+    lru.put(3, "c")
+    assert 2 not in lru
+    assert lru.get(2) is None
+    assert len(lru) == 2
+
+    stats = lru.stats
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.evictions == 1
+
+    # pinned entries survive
+    lru.pin(1)
+    lru.put(4, "d")
+    lru.put(5, "e")
+    assert 1 in lru
+    assert 3 not in lru
+    assert 4 not in lru
+    assert lru.is_pinned(1)
+
+    lru.unpin(1)
+    lru.put(6, "f")
+    assert 1 not in lru
+
+    # byte budget
+    sized: LRUCache[str, str] = LRUCache(max_bytes=100)
+    sized.put("x", "x", 60)
+    sized.put("y", "y", 30)
+    assert sized.stats.n_bytes == 90
+    sized.put("z", "z", 30)
+    assert "x" not in sized
+    assert sized.stats.n_bytes == 60
+
+    # an entry larger than the budget is kept until the next one
+    sized.put("big", "big", 1000)
+    assert "big" in sized
+    assert len(sized) == 1
+    sized.put("x", "x", 60)
+    assert "big" not in sized
+
+    sized.put("y", "y", 30)
+    sized.put("z", "z", 30)
+
+    # replacing an entry does not count twice
+    sized.put("z", "z", 40)
+    assert sized.stats.n_bytes == 70
+
+    assert sized.pop("y") == "y"
+    assert sized.pop("y") is None
+    sized.clear()
+    assert len(sized) == 0
+    assert sized.stats.n_bytes == 0
+
+    # evicted entries are reported
+    evicted: list[tuple[int, str]] = []
+    reporting: LRUCache[int, str] = LRUCache(
+        max_entries=1, on_evict=lambda key, value: evicted.append((key, value))
+    )
+    reporting.put(1, "a")
+    reporting.put(2, "b")
+    reporting.pop(2)
+    assert evicted == [(1, "a")]
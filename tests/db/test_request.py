@@ -1,3 +1,5 @@
+import asyncio
+import pathlib
 import uuid
 from datetime import datetime
 
@@ -8,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncEngine, async_scoped_session
 
 from rail_pz_service import db
 from rail_pz_service.common import errors
+from rail_pz_service.common.enums import RequestStatusEnum
 
 from .util_functions import (
     cleanup,
@@ -95,21 +98,58 @@ async def _test_request_db(session: async_scoped_session) -> None:
             model_name=model_.name,
         )
 
+        notifier = db.RequestNotifier.shared_notifier()
+        wakeup = notifier.subscribe()
+
         await db.Request.create_row(
             session,
             estimator_id=estimator2_.id,
             dataset_id=dataset_.id,
         )
 
+        # workers are only woken up once the new request is committed
+        assert not wakeup.is_set()
+        await session.commit()
+        assert wakeup.is_set()
+        notifier.unsubscribe(wakeup)
+
         rows = await db.Request.get_rows(session)
         assert len(rows) == 2
 
         open_requests_ = await db.Request.get_open_requests(session)
         assert len(open_requests_) == 2
 
-        check_update = await db.Request.update_row(session, check.id, time_started=datetime.now())
+        assert check.status == RequestStatusEnum.queued
+        check_update = await db.Request.update_row(
+            session, check.id, status=RequestStatusEnum.running, time_started=datetime.now()
+        )
         assert check_update.time_started is not None
 
+        # keyset pagination and filters
+        rows = await db.Request.get_rows(session, limit=1)
+        assert len(rows) == 1
+        next_rows = await db.Request.get_rows(session, after=rows[0].id)
+        assert [row.id for row in next_rows] == [row.id for row in await db.Request.get_rows(session)][1:]
+        desc_rows = await db.Request.get_rows(session, descending=True)
+        assert desc_rows[0].id > desc_rows[1].id
+
+        rows = await db.Request.get_rows(session, status="running")
+        assert [row.id for row in rows] == [check.id]
+        rows = await db.Request.get_rows(session, status="queued")
+        assert check.id not in [row.id for row in rows]
+        rows = await db.Request.get_rows(session, estimator_id=estimator2_.id)
+        assert len(rows) == 1
+        rows = await db.Request.get_rows(session, catalog_tag_id=estimator2_.catalog_tag_id, user=check.user)
+        assert len(rows) == 2
+        rows = await db.Request.get_rows(session, time_created_after=datetime.now())
+        assert len(rows) == 0
+
+        with pytest.raises(errors.RAILBadInputError):
+            await db.Request.get_rows(session, no_such_column=1)
+
+        with pytest.raises(errors.RAILBadInputError):
+            await db.Request.get_rows(session, status="lost")
+
         with pytest.raises(errors.RAILIDMismatchError):
             await db.Request.update_row(session, check.id, id=113413, time_started=datetime.now())
 
@@ -120,21 +160,243 @@ async def _test_request_db(session: async_scoped_session) -> None:
         # with pytest.raises(errors.RAILStatementError):
         #    await db.Request.update_row(session, row_id=check.id, time_started="aaa")
 
-        check_update = await db.Request.update_row(session, check.id, time_finished=datetime.now())
+        check_update = await db.Request.update_row(
+            session, check.id, status=RequestStatusEnum.done, time_finished=datetime.now()
+        )
         assert check_update.time_finished is not None
 
         open_requests_ = await db.Request.get_open_requests(session)
         assert len(open_requests_) == 1
 
-        await check.update_values(session, time_started=None)
+        await check.update_values(session, status=RequestStatusEnum.queued, time_started=None)
 
         open_requests_ = await db.Request.get_open_requests(session)
         assert len(open_requests_) == 2
 
+        claimed_ = await db.Request.claim_open_requests(session, "worker_a", limit=1)
+        assert len(claimed_) == 1
+        assert claimed_[0].worker_id == "worker_a"
+        assert claimed_[0].time_started is not None
+
+        claimed_2_ = await db.Request.claim_open_requests(session, "worker_b", limit=5)
+        assert len(claimed_2_) == 1
+        assert claimed_2_[0].id != claimed_[0].id
+        assert claimed_2_[0].worker_id == "worker_b"
+
+        assert claimed_2_[0].status == RequestStatusEnum.running
+
+        claimed_3_ = await db.Request.claim_open_requests(session, "worker_a", limit=5)
+        assert len(claimed_3_) == 0
+
+        open_requests_ = await db.Request.get_open_requests(session)
+        assert len(open_requests_) == 0
+
+        # finished requests are not put back in the queue
+        await check.update_values(session, status=RequestStatusEnum.done, time_finished=datetime.now())
+        await db.Request.requeue_requests(session, [claimed_[0].id, claimed_2_[0].id])
+        open_requests_ = await db.Request.get_open_requests(session)
+        assert len(open_requests_) == 1
+        assert open_requests_[0].id != check.id
+        assert open_requests_[0].worker_id is None
+        assert open_requests_[0].status == RequestStatusEnum.queued
+
+        # bulk create, with per-item errors
+        estimator3_ = await db.Estimator.create_row(
+            session,
+            name=f"estimator_{uuid_int}_3",
+            model_name=model_.name,
+        )
+        by_name = await db.Estimator.get_rows_by_name(session, [estimator3_.name, "no_such_estimator"])
+        assert list(by_name.keys()) == [estimator3_.name]
+
+        created_, bulk_errors_ = await db.Request.create_rows(
+            session,
+            [
+                dict(estimator_name=estimator3_.name, dataset_name=dataset_.name),
+                dict(estimator_name=estimator_.name, dataset_name=dataset_.name),
+                dict(estimator_name=estimator3_.name),
+                dict(estimator_name="no_such_estimator", dataset_name=dataset_.name),
+                dict(estimator_name=estimator3_.name, dataset_name=dataset_.name),
+            ],
+        )
+        assert [idx for idx, _ in created_] == [0]
+        assert created_[0][1].id is not None
+        assert created_[0][1].estimator_id == estimator3_.id
+        assert [idx for idx, _ in bulk_errors_] == [1, 2, 3, 4]
+
+        created_, bulk_errors_ = await db.Request.create_rows(session, [])
+        assert not created_ and not bulk_errors_
+
+        # requests can be claimed one Estimator at a time
+        dataset2_ = await db.Dataset.create_row(
+            session,
+            name=f"dataset_{uuid_int}_2",
+            n_objects=2,
+            path="not/really/a/path",
+            data=None,
+            catalog_tag_name=catalog_tag_.name,
+            validate_file=False,
+        )
+        await db.Request.create_row(session, estimator_id=estimator3_.id, dataset_id=dataset2_.id)
+        claimed_4_ = await db.Request.claim_open_requests(session, "worker_c", limit=5, single_estimator=True)
+        assert [(row.estimator_id, row.dataset_id) for row in claimed_4_] == [
+            (estimator3_.id, dataset2_.id),
+            (estimator3_.id, dataset_.id),
+        ]
+        claimed_5_ = await db.Request.claim_open_requests(
+            session, "worker_c", limit=5, exclude_estimator_ids=[estimator2_.id], single_estimator=True
+        )
+        assert not claimed_5_
+        open_requests_ = await db.Request.get_open_requests(session)
+        assert [row.estimator_id for row in open_requests_] == [estimator2_.id]
+
         # cleanup
         await cleanup(session)
 
 
+async def _test_concurrent_claims(engine: AsyncEngine, session: async_scoped_session) -> None:
+    """Test that concurrent claimers never claim the same request"""
+    uuid_int = uuid.uuid1().int
+    logger = structlog.get_logger(__name__)
+
+    algorithm_ = await db.Algorithm.create_row(
+        session,
+        name=f"algorithm_{uuid_int}",
+        class_name="not.really.a.class",
+    )
+    catalog_tag_ = await db.CatalogTag.create_row(
+        session,
+        name=f"catalog_{uuid_int}",
+        class_name="not.really.a.class",
+    )
+    model_ = await db.Model.create_row(
+        session,
+        name=f"model_{uuid_int}",
+        path="not/really/a/path",
+        algo_name=algorithm_.name,
+        catalog_tag_name=catalog_tag_.name,
+        validate_file=False,
+    )
+    estimator_ = await db.Estimator.create_row(
+        session,
+        name=f"estimator_{uuid_int}",
+        model_name=model_.name,
+    )
+    n_requests = 12
+    for i in range(n_requests):
+        dataset_ = await db.Dataset.create_row(
+            session,
+            name=f"dataset_{uuid_int}_{i}",
+            n_objects=2,
+            path="not/really/a/path",
+            data=None,
+            catalog_tag_name=catalog_tag_.name,
+            validate_file=False,
+        )
+        await db.Request.create_row(session, estimator_id=estimator_.id, dataset_id=dataset_.id)
+    await session.commit()
+
+    async def _claim(worker_id: str) -> list[int]:
+        async with engine.begin():
+            claim_session = await create_async_session(engine, logger)
+        try:
+            claimed_ids: list[int] = []
+            while claimed_ := await db.Request.claim_open_requests(claim_session, worker_id, limit=2):
+                claimed_ids += [row.id for row in claimed_]
+                await claim_session.commit()
+            return claimed_ids
+        finally:
+            await claim_session.remove()
+
+    claimed_ids = await asyncio.gather(*[_claim(f"worker_{i}") for i in range(4)])
+    all_claimed = [request_id for ids in claimed_ids for request_id in ids]
+    assert len(all_claimed) == n_requests
+    assert len(set(all_claimed)) == n_requests
+
+    await cleanup(session)
+
+
+async def _test_find_computed_output(session: async_scoped_session, tmp_path: pathlib.Path) -> None:
+    """Test that only the outputs of finished requests are reused"""
+    uuid_int = uuid.uuid1().int
+
+    algorithm_ = await db.Algorithm.create_row(
+        session,
+        name=f"algorithm_{uuid_int}",
+        class_name="not.really.a.class",
+    )
+    catalog_tag_ = await db.CatalogTag.create_row(
+        session,
+        name=f"catalog_{uuid_int}",
+        class_name="not.really.a.class",
+    )
+    model_ = await db.Model.create_row(
+        session,
+        name=f"model_{uuid_int}",
+        path="not/really/a/path",
+        algo_name=algorithm_.name,
+        catalog_tag_name=catalog_tag_.name,
+        validate_file=False,
+        content_hash=f"model_hash_{uuid_int}",
+    )
+    estimator_ = await db.Estimator.create_row(
+        session,
+        name=f"estimator_{uuid_int}",
+        model_name=model_.name,
+    )
+    assert estimator_.content_hash is not None
+
+    # the same data under two names
+    datasets_ = [
+        await db.Dataset.create_row(
+            session,
+            name=f"dataset_{uuid_int}_{i}",
+            n_objects=2,
+            path="not/really/a/path",
+            data=None,
+            catalog_tag_name=catalog_tag_.name,
+            validate_file=False,
+            content_hash=f"dataset_hash_{uuid_int}",
+        )
+        for i in range(2)
+    ]
+    running_ = await db.Request.create_row(
+        session,
+        estimator_id=estimator_.id,
+        dataset_id=datasets_[0].id,
+    )
+    pending_ = await db.Request.create_row(
+        session,
+        estimator_id=estimator_.id,
+        dataset_id=datasets_[1].id,
+    )
+
+    # the output of a running request might still be being written
+    qp_file_path = tmp_path / "output.hdf5"
+    qp_file_path.write_bytes(b"partial output")
+    await running_.update_values(
+        session,
+        status=RequestStatusEnum.running,
+        time_started=datetime.now(),
+        qp_file_path=str(qp_file_path),
+    )
+    assert await db.Request.find_computed_output(session, pending_.dataset_id, pending_.estimator_id) is None
+
+    await running_.update_values(session, status=RequestStatusEnum.failed)
+    assert await db.Request.find_computed_output(session, pending_.dataset_id, pending_.estimator_id) is None
+
+    await running_.update_values(session, status=RequestStatusEnum.done, time_finished=datetime.now())
+    assert await db.Request.find_computed_output(session, pending_.dataset_id, pending_.estimator_id) == str(
+        qp_file_path
+    )
+
+    # outputs that were cleaned up are not reused
+    qp_file_path.unlink()
+    assert await db.Request.find_computed_output(session, pending_.dataset_id, pending_.estimator_id) is None
+
+    await cleanup(session)
+
+
 @pytest.mark.asyncio()
 async def test_request_db(engine: AsyncEngine) -> None:
     """Test `Request` db table."""
@@ -148,3 +410,33 @@ async def test_request_db(engine: AsyncEngine) -> None:
         await session.rollback()
         await cleanup(session)
         raise e
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_claims(engine: AsyncEngine) -> None:
+    """Test claiming requests from several workers at once"""
+    logger = structlog.get_logger(__name__)
+
+    async with engine.begin():
+        session = await create_async_session(engine, logger)
+    try:
+        await _test_concurrent_claims(engine, session)
+    except Exception as e:
+        await session.rollback()
+        await cleanup(session)
+        raise e
+
+
+@pytest.mark.asyncio()
+async def test_find_computed_output(engine: AsyncEngine, tmp_path: pathlib.Path) -> None:
+    """Test reusing the outputs of identical requests"""
+    logger = structlog.get_logger(__name__)
+
+    async with engine.begin():
+        session = await create_async_session(engine, logger)
+    try:
+        await _test_find_computed_output(session, tmp_path)
+    except Exception as e:
+        await session.rollback()
+        await cleanup(session)
+        raise e
@@ -0,0 +1,144 @@
+import uuid
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+
+import pytest
+import structlog
+from safir.database import create_async_session
+from sqlalchemy.ext.asyncio import AsyncEngine, async_scoped_session
+
+from rail_pz_service import db
+from rail_pz_service.common import errors
+
+from .util_functions import (
+    cleanup,
+)
+
+
+async def _test_row_cache_db(
+    session: async_scoped_session,
+    count_queries: Callable[[], AbstractContextManager[list[str]]],
+) -> None:
+    """Test `RowCache` with the `Algorithm` db table."""
+    # generate a uuid to avoid collisions
+    uuid_int = uuid.uuid1().int
+    row_cache = db.RowCache.shared_cache()
+
+    if session:
+        algorithm_ = await db.Algorithm.create_row(
+            session,
+            name=f"algo_{uuid_int}",
+            class_name="not.really.a.class",
+        )
+        algo_id = algorithm_.id
+        await session.commit()
+        session.expunge_all()
+
+        # first read goes to the DB, the next ones do not
+        check = await db.Algorithm.get_row_by_name(session, f"algo_{uuid_int}")
+        assert check.id == algo_id
+        session.expunge_all()
+
+        with count_queries() as statements:
+            check = await db.Algorithm.get_row_by_name(session, f"algo_{uuid_int}")
+            assert check.class_name == "not.really.a.class"
+            session.expunge_all()
+            check = await db.Algorithm.get_row(session, algo_id)
+            assert check.name == f"algo_{uuid_int}"
+        assert len(statements) == 0
+
+        # the session copy is used once loaded
+        assert await db.Algorithm.get_row(session, algo_id) is check
+
+        # renaming drops the old name
+        await db.Algorithm.update_row(session, algo_id, name=f"algo_{uuid_int}_renamed")
+        await session.commit()
+        session.expunge_all()
+
+        with pytest.raises(errors.RAILMissingNameError):
+            await db.Algorithm.get_row_by_name(session, f"algo_{uuid_int}")
+        check = await db.Algorithm.get_row_by_name(session, f"algo_{uuid_int}_renamed")
+        assert check.id == algo_id
+        session.expunge_all()
+
+        # a change that is rolled back drops the row too
+        await db.Algorithm.update_row(session, algo_id, class_name="some_other_class")
+        await session.rollback()
+        assert row_cache.get_id(db.Algorithm, f"algo_{uuid_int}_renamed") is None
+        session.expunge_all()
+
+        # so the next read goes back to the DB
+        with count_queries() as statements:
+            check = await db.Algorithm.get_row(session, algo_id)
+            assert check.id == algo_id
+        assert len(statements) == 1
+        session.expunge_all()
+
+        # deleted rows are gone
+        await db.Algorithm.delete_row(session, algo_id)
+        await session.commit()
+        session.expunge_all()
+
+        with pytest.raises(errors.RAILMissingIDError):
+            await db.Algorithm.get_row(session, algo_id)
+        with pytest.raises(errors.RAILMissingNameError):
+            await db.Algorithm.get_row_by_name(session, f"algo_{uuid_int}_renamed")
+
+        # deleting a row drops the cached rows that refer to it
+        catalog_tag_ = await db.CatalogTag.create_row(
+            session,
+            name=f"catalog_{uuid_int}",
+            class_name="not.really.a.class",
+        )
+        algorithm_ = await db.Algorithm.create_row(
+            session,
+            name=f"algo_{uuid_int}",
+            class_name="not.really.a.class",
+        )
+        model_ = await db.Model.create_row(
+            session,
+            name=f"model_{uuid_int}",
+            path="not/really/a/path",
+            algo_name=algorithm_.name,
+            catalog_tag_name=catalog_tag_.name,
+            validate_file=False,
+        )
+        estimator_ = await db.Estimator.create_row(
+            session,
+            name=f"estimator_{uuid_int}",
+            model_name=model_.name,
+        )
+        await session.commit()
+        session.expunge_all()
+
+        await db.Model.get_row_by_name(session, model_.name)
+        await db.Estimator.get_row_by_name(session, estimator_.name)
+        await db.CatalogTag.get_row_by_name(session, catalog_tag_.name)
+        assert row_cache.get_id(db.Estimator, estimator_.name) == estimator_.id
+
+        await db.Algorithm.delete_row(session, algorithm_.id)
+        await session.commit()
+        assert row_cache.get_id(db.Model, model_.name) is None
+        assert row_cache.get_id(db.Estimator, estimator_.name) is None
+        assert row_cache.get_id(db.CatalogTag, catalog_tag_.name) == catalog_tag_.id
+
+        # cleanup
+        await cleanup(session)
+
+
+@pytest.mark.asyncio()
+async def test_row_cache_db(
+    engine: AsyncEngine,
+    count_queries: Callable[[], AbstractContextManager[list[str]]],
+) -> None:
+    """Test `RowCache` with the `Algorithm` db table."""
+    logger = structlog.get_logger(__name__)
+
+    async with engine.begin():
+        session = await create_async_session(engine, logger)
+    try:
+        await _test_row_cache_db(session, count_queries)
+    except Exception as e:
+        await session.rollback()
+        await cleanup(session)
+        raise e
@@ -0,0 +1,105 @@
+import io
+import os
+import pathlib
+
+import numpy as np
+import pytest
+import structlog
+from httpx import AsyncClient
+from safir.database import create_async_session
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from rail_pz_service import db, models
+from rail_pz_service.config import config
+
+from .util_functions import (
+    check_and_parse_response,
+    cleanup,
+    expect_failed_response,
+)
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("api_version", ["v1"])
+async def test_estimate_routes(
+    client: AsyncClient,
+    api_version: str,
+    engine: AsyncEngine,
+    setup_test_area: int,
+) -> None:
+    """Test `/estimate` API endpoint."""
+    assert setup_test_area == 0
+
+    logger = structlog.get_logger(__name__)
+
+    cache = db.Cache()
+
+    async with engine.begin():
+        session = await create_async_session(engine, logger)
+
+        await cache.load_algorithms_from_rail_env(session)
+        await cache.load_catalog_tags_from_rail_env(session)
+
+        await cache.load_model_from_file(
+            session,
+            name="com_cam_trainz_base",
+            path=pathlib.Path(os.path.join("tests", "temp_data", "inputs", "model_com_cam_trainz_base.pkl")),
+            algo_name="TrainZEstimator",
+            catalog_tag_name="com_cam",
+        )
+        the_estimator = await cache.load_estimator(
+            session,
+            name="com_cam_trainz_base",
+            model_name="com_cam_trainz_base",
+        )
+        await session.commit()
+
+        bands = ["u", "g", "r", "i", "z", "y"]
+        data = {f"{band}_cModelMag": [24.4, 23.0, 22.0] for band in bands}
+        data.update({f"{band}_cModelMagErr": [0.5, 0.2, 0.1] for band in bands})
+
+        query = models.EstimateQuery(
+            estimator_name=the_estimator.name,
+            data=data,
+            nzbins=51,
+        )
+        response = await client.post(
+            f"{config.asgi.prefix}/{api_version}/estimate",
+            content=query.model_dump_json(),
+        )
+        result = check_and_parse_response(response, models.EstimateResult)
+        assert result.n_objects == 3
+        assert len(result.zgrid) == 51
+        assert len(result.pdfs) == 3
+        assert len(result.pdfs[0]) == 51
+        assert len(result.zmode) == 3
+
+        query.output_format = "npz"
+        response = await client.post(
+            f"{config.asgi.prefix}/{api_version}/estimate",
+            content=query.model_dump_json(),
+        )
+        assert response.is_success
+        with np.load(io.BytesIO(response.content)) as arrays:
+            assert arrays["pdfs"].shape == (3, 51)
+            assert np.allclose(arrays["zmode"], result.zmode)
+
+        query = models.EstimateQuery(estimator_name="no_such_estimator", data=data)
+        response = await client.post(
+            f"{config.asgi.prefix}/{api_version}/estimate",
+            content=query.model_dump_json(),
+        )
+        expect_failed_response(response, 404)
+
+        query = models.EstimateQuery(
+            estimator_name=the_estimator.name,
+            data={key: value * (config.asgi.estimate_max_objects + 1) for key, value in data.items()},
+        )
+        response = await client.post(
+            f"{config.asgi.prefix}/{api_version}/estimate",
+            content=query.model_dump_json(),
+        )
+        expect_failed_response(response, 400)
+
+        # delete everything we just made in the session
+        await cleanup(session)
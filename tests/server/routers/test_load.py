@@ -1,17 +1,28 @@
+import asyncio
+import hashlib
+import io
 import os
+import pathlib
 
+import numpy as np
+import pyarrow as pa
 import pytest
+import qp
 import structlog
 from httpx import AsyncClient
+from pydantic import TypeAdapter
 from safir.database import create_async_session
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 from rail_pz_service import db, models
+from rail_pz_service.common.enums import RequestStatusEnum
 from rail_pz_service.config import config
+from rail_pz_service.server.routers import load as load_router
 
 from .util_functions import (
     check_and_parse_response,
     cleanup,
+    expect_failed_response,
 )
 
 
@@ -59,6 +70,98 @@ async def test_load_routes(
         )
         the_dataset = check_and_parse_response(response, models.Dataset)
         assert the_dataset.name == "com_cam_test"
+        assert the_dataset.file_metadata is not None
+        assert the_dataset.file_metadata.layout == "hdf5"
+        assert the_dataset.file_metadata.n_objects == the_dataset.n_objects
+        assert "u_cModelMag" in the_dataset.file_metadata.columns
+
+        # upload the same file in chunks
+        dataset_bytes = pathlib.Path(dataset_path).read_bytes()
+        response = await client.post(
+            f"{config.asgi.prefix}/{api_version}/load/upload",
+            content=models.UploadStart(filename=dataset_path).model_dump_json(),
+        )
+        upload_status = check_and_parse_response(response, models.UploadStatus)
+        assert upload_status.filename == "minimal_gold_test.hdf5"
+        upload_url = f"{config.asgi.prefix}/{api_version}/load/upload/{upload_status.upload_id}"
+
+        half = len(dataset_bytes) // 2
+        response = await client.put(upload_url, params={"offset": 0}, content=dataset_bytes[:half])
+        upload_status = check_and_parse_response(response, models.UploadStatus)
+        assert upload_status.offset == half
+
+        # out of step with the server
+        response = await client.put(upload_url, params={"offset": 0}, content=dataset_bytes[half:])
+        assert response.status_code == 409
+
+        # two chunks for the same offset can not both be appended
+        responses = await asyncio.gather(
+            *[client.put(upload_url, params={"offset": half}, content=dataset_bytes[half:]) for _ in range(2)]
+        )
+        assert sorted(response.status_code for response in responses) == [200, 409]
+
+        response = await client.get(upload_url)
+        upload_status = check_and_parse_response(response, models.UploadStatus)
+        response = await client.put(
+            upload_url,
+            params={"offset": upload_status.offset},
+            content=dataset_bytes[upload_status.offset :],
+        )
+        upload_status = check_and_parse_response(response, models.UploadStatus)
+        assert upload_status.offset == len(dataset_bytes)
+
+        response = await client.post(
+            f"{upload_url}/dataset",
+            content=models.UploadDatasetQuery(
+                name="com_cam_test_upload",
+                catalog_tag_name="com_cam",
+                checksum="not_the_checksum",
+            ).model_dump_json(),
+        )
+        assert response.status_code == 400
+
+        response = await client.post(
+            f"{upload_url}/dataset",
+            content=models.UploadDatasetQuery(
+                name="com_cam_test_upload",
+                catalog_tag_name="com_cam",
+                checksum=hashlib.sha256(dataset_bytes).hexdigest(),
+            ).model_dump_json(),
+        )
+        uploaded_dataset = check_and_parse_response(response, models.Dataset)
+        assert uploaded_dataset.content_hash == the_dataset.content_hash
+
+        response = await client.get(upload_url)
+        assert response.status_code == 404
+
+        # abandoned uploads are removed when another upload starts
+        start_url = f"{config.asgi.prefix}/{api_version}/load/upload"
+        response = await client.post(
+            start_url, content=models.UploadStart(filename="a.hdf5").model_dump_json()
+        )
+        abandoned_status = check_and_parse_response(response, models.UploadStatus)
+        abandoned_dir = os.path.join(config.storage.import_area, "uploads", abandoned_status.upload_id)
+        os.utime(os.path.join(abandoned_dir, abandoned_status.filename), (0, 0))
+        os.utime(abandoned_dir, (0, 0))
+        response = await client.post(
+            start_url, content=models.UploadStart(filename="b.hdf5").model_dump_json()
+        )
+        fresh_status = check_and_parse_response(response, models.UploadStatus)
+        response = await client.get(f"{start_url}/{abandoned_status.upload_id}")
+        assert response.status_code == 404
+        response = await client.delete(f"{start_url}/{fresh_status.upload_id}")
+        assert response.status_code == 204
+
+        response = await client.get(f"{config.asgi.prefix}/{api_version}/load/upload/../../etc")
+        assert response.status_code == 404
+
+        # ids that were never handed out are not tracked
+        unknown_id = "0" * 32
+        response = await client.put(f"{start_url}/{unknown_id}", params={"offset": 0}, content=b"data")
+        assert response.status_code == 404
+        response = await client.delete(f"{start_url}/{unknown_id}")
+        assert response.status_code == 404
+        assert unknown_id not in load_router._uploads
 
         estimator_params = models.LoadEstimatorQuery(
             name="com_cam_trainz_base",
@@ -71,6 +174,36 @@ async def test_load_routes(
         the_estimator = check_and_parse_response(response, models.Estimator)
         assert the_estimator.name == "com_cam_trainz_base"
 
+        # bulk loading, items that fail are reported, the others are loaded
+        bulk_params = [
+            models.LoadDatasetQuery(name="com_cam_test_bulk", path=dataset_path, catalog_tag_name="com_cam"),
+            models.LoadDatasetQuery(name="com_cam_test", path=dataset_path, catalog_tag_name="com_cam"),
+            models.LoadDatasetQuery(
+                name="com_cam_missing", path="no/such/file.hdf5", catalog_tag_name="com_cam"
+            ),
+            models.LoadDatasetQuery(name="com_cam_no_tag", path=dataset_path, catalog_tag_name="no_such_tag"),
+        ]
+        response = await client.post(
+            f"{config.asgi.prefix}/{api_version}/load/datasets",
+            content=TypeAdapter(list[models.LoadDatasetQuery]).dump_json(bulk_params),
+        )
+        bulk_datasets = check_and_parse_response(response, models.DatasetBulkResult)
+        assert [dataset_.name for dataset_ in bulk_datasets.created] == ["com_cam_test_bulk"]
+        assert bulk_datasets.created[0].content_hash == the_dataset.content_hash
+        assert [error.index for error in bulk_datasets.errors] == [1, 2, 3]
+
+        bulk_requests = [
+            models.RequestCreate(dataset_name="com_cam_test_bulk", estimator_name=the_estimator.name),
+            models.RequestCreate(dataset_name="com_cam_missing", estimator_name=the_estimator.name),
+        ]
+        response = await client.post(
+            f"{config.asgi.prefix}/{api_version}/request/create_many",
+            content=TypeAdapter(list[models.RequestCreate]).dump_json(bulk_requests),
+        )
+        bulk_result = check_and_parse_response(response, models.RequestBulkResult)
+        assert [request_.dataset_id for request_ in bulk_result.created] == [bulk_datasets.created[0].id]
+        assert [error.index for error in bulk_result.errors] == [1]
+
         request_create = models.RequestCreate(
             dataset_name=the_dataset.name,
             estimator_name=the_estimator.name,
@@ -82,6 +215,7 @@ async def test_load_routes(
 
         response = await client.post(f"{config.asgi.prefix}/{api_version}/request/run/{the_request.id}")
         check_request = check_and_parse_response(response, models.Request)
+        assert check_request.status == RequestStatusEnum.done
 
         params = models.DownloadQuery(filename="tests/temp_data/model_check.pkl").model_dump()
         response = await client.get(
@@ -98,6 +232,7 @@ async def test_load_routes(
         )
         filename = response.headers["content-disposition"].split("=")[1].replace('"', "")
         assert filename == "tests/temp_data/dataset_check.hdf5"
+        assert response.headers["x-checksum-sha256"] == the_dataset.file_metadata.checksum
 
         params = models.DownloadQuery(filename="tests/temp_data/qp_out.hdf5").model_dump()
         response = await client.get(
@@ -106,6 +241,74 @@ async def test_load_routes(
         )
         filename = response.headers["content-disposition"].split("=")[1].replace('"', "")
         assert filename == "tests/temp_data/qp_out.hdf5"
+        assert response.headers["etag"] == f'"{check_request.qp_file_checksum}"'
+        assert response.headers["x-checksum-sha256"] == check_request.qp_file_checksum
+        qp_bytes = response.content
+
+        # unchanged files are not sent again
+        request_url = f"{config.asgi.prefix}/{api_version}/request/download/{check_request.id}"
+        response = await client.get(
+            request_url, params=params, headers={"if-none-match": response.headers["etag"]}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = await client.get(
+            request_url, params=params, headers={"if-modified-since": response.headers["last-modified"]}
+        )
+        assert response.status_code == 304
+
+        response = await client.get(request_url, params=params, headers={"if-none-match": '"something_else"'})
+        assert response.status_code == 200
+
+        # byte ranges
+        response = await client.get(request_url, params=params, headers={"range": "bytes=10-19"})
+        assert response.status_code == 206
+        assert response.content == qp_bytes[10:20]
+
+        response = await client.head(request_url, params=params)
+        assert response.status_code == 200
+        assert int(response.headers["content-length"]) == len(qp_bytes)
+
+        # reading some of the rows
+        pathlib.Path("tests/temp_data/qp_out.hdf5").write_bytes(qp_bytes)
+        full_dist = qp.read("tests/temp_data/qp_out.hdf5")
+        rows_url = f"{config.asgi.prefix}/{api_version}/request/rows/{check_request.id}"
+
+        query = models.RequestRowsQuery(start=2, stop=5)
+        response = await client.post(rows_url, content=query.model_dump_json())
+        output_rows = check_and_parse_response(response, models.RequestRows)
+        assert output_rows.rows == [2, 3, 4]
+        assert np.allclose(output_rows.columns["zmode"], full_dist.ancil["zmode"][2:5].ravel())
+
+        query = models.RequestRowsQuery(indices=[7, 1, 7], content="params")
+        response = await client.post(rows_url, content=query.model_dump_json())
+        output_rows = check_and_parse_response(response, models.RequestRows)
+        assert output_rows.rows == [7, 1, 7]
+        assert output_rows.meta["pdf_name"] == [full_dist.metadata()["pdf_name"][0].decode()]
+        for key, value in full_dist.objdata().items():
+            assert np.allclose(output_rows.columns[key], value[[7, 1, 7]])
+
+        query = models.RequestRowsQuery(start=0, stop=4, content="pdfs", nzbins=21, output_format="npz")
+        response = await client.post(rows_url, content=query.model_dump_json())
+        assert response.is_success
+        with np.load(io.BytesIO(response.content)) as arrays:
+            assert arrays["pdfs"].shape == (4, 21)
+            assert np.allclose(arrays["pdfs"], full_dist[0:4].pdf(arrays["zgrid"]))
+
+        query = models.RequestRowsQuery(start=3, stop=6, output_format="arrow")
+        response = await client.post(rows_url, content=query.model_dump_json())
+        assert response.is_success
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.column("row").to_pylist() == [3, 4, 5]
+
+        query = models.RequestRowsQuery(indices=[full_dist.npdf])
+        response = await client.post(rows_url, content=query.model_dump_json())
+        expect_failed_response(response, 400)
+
+        query = models.RequestRowsQuery(start=5, stop=5)
+        response = await client.post(rows_url, content=query.model_dump_json())
+        expect_failed_response(response, 400)
 
         # delete everything we just made in the session
         await cleanup(session)
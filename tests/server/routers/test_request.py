@@ -7,6 +7,7 @@ from safir.database import create_async_session
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 from rail_pz_service import db, models
+from rail_pz_service.common.enums import RequestStatusEnum
 from rail_pz_service.config import config
 
 from .util_functions import (
@@ -88,6 +89,32 @@ async def test_request_routes(
 
         assert check.id == request_.id
 
+        list_url = f"{config.asgi.prefix}/{api_version}/request/list"
+        response = await client.get(list_url, params=dict(user=request_.user, status="queued"))
+        requests = check_and_parse_response(response, list[models.Request])
+        assert [entry.id for entry in requests] == [request_.id]
+
+        response = await client.get(list_url, params=dict(catalog_tag_id=catalog_tag_.id, order="desc"))
+        requests = check_and_parse_response(response, list[models.Request])
+        assert [entry.id for entry in requests] == [request_.id]
+
+        response = await client.get(list_url, params=dict(after=request_.id))
+        requests = check_and_parse_response(response, list[models.Request])
+        assert len(requests) == 0
+
+        response = await client.get(list_url, params=dict(status="done"))
+        requests = check_and_parse_response(response, list[models.Request])
+        assert len(requests) == 0
+
+        # the output of a queued request is not ready, and reading it does not run it
+        rows_url = f"{config.asgi.prefix}/{api_version}/request/rows/{request_.id}"
+        query = models.RequestRowsQuery(start=0, stop=1)
+        response = await client.post(rows_url, content=query.model_dump_json())
+        assert response.status_code == 409
+        assert "queued" in response.json()["detail"]
+        response = await client.get(f"{config.asgi.prefix}/{api_version}/request/get/{request_.id}")
+        assert check_and_parse_response(response, models.Request).status == RequestStatusEnum.queued
+
         response = await client.delete(f"{config.asgi.prefix}/{api_version}/request/{request_.id}")
         assert response.status_code == 204
 
@@ -0,0 +1,185 @@
+import hashlib
+import os
+import pathlib
+import uuid
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+
+import pytest
+import structlog
+from fastapi import HTTPException, Request
+from safir.database import create_async_session
+from sqlalchemy.ext.asyncio import AsyncEngine, async_scoped_session
+
+from rail_pz_service import db
+from rail_pz_service.config import config
+from rail_pz_service.server.web_app import _discard_uploads, _finish_upload, _get_request_context, _read_form
+
+from .util_functions import (
+    cleanup,
+)
+
+
+async def _count_context_queries(
+    session: async_scoped_session,
+    count_queries: Callable[[], AbstractContextManager[list[str]]],
+    query_string: str,
+) -> tuple[dict, int]:
+    """Build the context for a page from scratch, and count the queries"""
+    await session.commit()
+    session.expunge_all()
+    request = Request({"type": "http", "method": "GET", "query_string": query_string.encode(), "headers": []})
+    with count_queries() as statements:
+        context = await _get_request_context(session, request)
+    return context, len(statements)
+
+
+@pytest.mark.asyncio()
+async def test_web_app_queries(
+    engine: AsyncEngine,
+    count_queries: Callable[[], AbstractContextManager[list[str]]],
+) -> None:
+    """Test that web app pages take a fixed number of queries"""
+
+    logger = structlog.get_logger(__name__)
+
+    # generate a uuid to avoid collisions
+    uuid_int = uuid.uuid1().int
+
+    async with engine.begin():
+        session = await create_async_session(engine, logger)
+
+        algorithm_ = await db.Algorithm.create_row(
+            session,
+            name=f"algorithm_{uuid_int}",
+            class_name="not.really.a.class",
+        )
+
+        catalog_tag_ = await db.CatalogTag.create_row(
+            session,
+            name=f"catalog_{uuid_int}",
+            class_name="not.really.a.class",
+        )
+
+        model_ = await db.Model.create_row(
+            session,
+            name=f"model_{uuid_int}",
+            path="not/really/a/path",
+            algo_name=algorithm_.name,
+            catalog_tag_name=catalog_tag_.name,
+            validate_file=False,
+        )
+
+        dataset_ = await db.Dataset.create_row(
+            session,
+            name=f"dataset_{uuid_int}",
+            n_objects=2,
+            path="not/really/a/path",
+            data=None,
+            catalog_tag_name=catalog_tag_.name,
+            validate_file=False,
+        )
+
+        estimator_ids: list[int] = []
+        request_ids: list[int] = []
+
+        async def _add_request(idx: int) -> None:
+            estimator_ = await db.Estimator.create_row(
+                session,
+                name=f"estimator_{uuid_int}_{idx}",
+                model_name=model_.name,
+            )
+            request_ = await db.Request.create_row(
+                session,
+                estimator_id=estimator_.id,
+                dataset_id=dataset_.id,
+            )
+            estimator_ids.append(estimator_.id)
+            request_ids.append(request_.id)
+
+        await _add_request(0)
+
+        context, n_request_queries = await _count_context_queries(
+            session, count_queries, f"request_id={request_ids[0]}"
+        )
+        assert context["my_request"].id == request_ids[0]
+        assert context["algo"].id == algorithm_.id
+        assert context["catalog_tag"].id == catalog_tag_.id
+        assert list(context["selected_request_map"].keys()) == [f"estimator_{uuid_int}_0"]
+        # 1 to walk up from the Request, 3 for the lists of CatalogTags,
+        # Algorithms and Models, 1 for the Requests of the Dataset,
+        # 4 for the CatalogTag and its contents and 1 for the Estimators
+        assert n_request_queries == 10
+
+        context, n_dataset_queries = await _count_context_queries(
+            session, count_queries, f"dataset_id={dataset_.id}"
+        )
+        assert len(context["selected_datasets"]) == 1
+
+        for idx in range(1, 5):
+            await _add_request(idx)
+
+        context, n_check = await _count_context_queries(
+            session, count_queries, f"request_id={request_ids[-1]}"
+        )
+        assert len(context["selected_request_map"]) == 5
+        assert len(context["selected_estimators"]) == 5
+        assert n_check == n_request_queries
+
+        context, n_check = await _count_context_queries(session, count_queries, f"dataset_id={dataset_.id}")
+        assert len(context["selected_request_map"]) == 5
+        assert n_check == n_dataset_queries
+
+        # delete everything we just made in the session
+        await cleanup(session)
+
+
+def _form_request(body: bytes, boundary: str) -> Request:
+    """Make a request that sends a multipart form in small pieces"""
+    pieces = [body[i : i + 65536] for i in range(0, len(body), 65536)]
+
+    async def receive() -> dict:
+        if not pieces:
+            return {"type": "http.disconnect"}
+        return {"type": "http.request", "body": pieces.pop(0), "more_body": bool(pieces)}
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={boundary}".encode())]
+    return Request({"type": "http", "method": "POST", "query_string": b"", "headers": headers}, receive)
+
+
+@pytest.mark.asyncio()
+async def test_web_app_upload(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that uploaded files go straight to the import area"""
+    payload = os.urandom(3000000)
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="dataset_name"\r\n\r\nmy_dataset\r\n'
+        f'--{boundary}\r\nContent-Disposition: form-data; name="fileToUpload"; filename="../up.hdf5"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    body += payload + f"\r\n--{boundary}--\r\n".encode()
+
+    request = _form_request(body, boundary)
+    form_data = await _read_form(request)
+    # the body can only be read once, the form is kept
+    assert await _read_form(request) is form_data
+    assert form_data["dataset_name"] == "my_dataset"
+
+    temp_filename, checksum = await _finish_upload(form_data["fileToUpload"])
+    assert os.path.dirname(temp_filename) == config.storage.import_area
+    assert temp_filename.endswith("_up.hdf5")
+    assert checksum == hashlib.sha256(payload).hexdigest()
+    assert pathlib.Path(temp_filename).read_bytes() == payload
+
+    _discard_uploads(request)
+    assert not os.path.exists(temp_filename)
+
+    # oversized uploads are refused while they stream in
+    monkeypatch.setattr(config.asgi, "max_upload_size", len(payload) // 2)
+    request = _form_request(body, boundary)
+    with pytest.raises(HTTPException) as excinfo:
+        await _read_form(request)
+    assert excinfo.value.status_code == 413
+    upload_paths = [upload.path for upload in request.state.uploads]
+    _discard_uploads(request)
+    assert not any(os.path.exists(path) for path in upload_paths)